@@ -18,7 +18,14 @@ def has_tracking_params(url):
     lower = url.lower()
     return any(k in lower for k in TRACKING_KEYWORDS)
 
-def auto_label_url(url):
+# Domain profiles scoring below this are treated as phishing suspects
+RISKY_PROFILE_SCORE = 0.4
+
+def auto_label_url(url, profile=None):
+    """
+    Heuristic label for a URL. `profile` is the stored domain_profiles row for
+    the URL's domain (if any), so domain facts are not re-derived per link.
+    """
     dom = domain_of(url)
     if not dom:
         return None
@@ -26,6 +33,9 @@ def auto_label_url(url):
     for t in TRUSTED_DOMAINS:
         if dom.endswith(t):
             return "trusted"
+    # Disposable, freshly registered or badly configured domains
+    if profile and profile.get("score") is not None and profile["score"] < RISKY_PROFILE_SCORE:
+        return "phishing"
     # If has known tracking keywords => marketing
     if has_tracking_params(url):
         return "marketing"
@@ -2,6 +2,7 @@
 import sqlite3
 from urllib.parse import urlparse
 from datetime import datetime
+from backend.app.services.metrics import instrumented
 
 DB_PATH = "backend\\app\\ML\\url_classifier\\training\\training_links.db"
 
@@ -26,6 +27,7 @@ def init_db_url_trainer():
     conn.commit()
     conn.close()
 
+@instrumented("insert_or_update_link")
 def insert_or_update_link(url, domain=None, source_email=None, subject=None, auto_label=None):
     conn = sqlite3.connect(DB_PATH)
     cur = conn.cursor()
@@ -49,6 +51,28 @@ def insert_or_update_link(url, domain=None, source_email=None, subject=None, aut
     conn.commit()
     conn.close()
 
+@instrumented("insert_or_update_links")
+def insert_or_update_links(rows):
+    """
+    Batched insert_or_update_link for one email: rows are dicts with url, domain,
+    source_email, subject and auto_label, written in a single transaction.
+    """
+    if not rows:
+        return
+    conn = sqlite3.connect(DB_PATH)
+    cur = conn.cursor()
+    now = datetime.utcnow().isoformat()
+    cur.executemany("""
+    INSERT INTO training_links (url, domain, source_email, subject, auto_label, last_seen)
+    VALUES (?, ?, ?, ?, ?, ?)
+    ON CONFLICT(url) DO UPDATE SET
+        last_seen = excluded.last_seen,
+        scan_count = training_links.scan_count + 1,
+        auto_label = COALESCE(training_links.auto_label, excluded.auto_label)
+    """, [(r["url"], r.get("domain"), r.get("source_email"), r.get("subject"), r.get("auto_label"), now) for r in rows])
+    conn.commit()
+    conn.close()
+
 def set_label_by_id(link_id, label):
     conn = sqlite3.connect(DB_PATH)
     cur = conn.cursor()
@@ -1,8 +1,8 @@
 
-import joblib
-import pandas as pd
 from urllib.parse import urlparse
 import re
+from backend.app.services.model_registry import register_model, get_model
+from backend.app.services.metrics import instrumented
 
 MODEL_PATH = "backend/app/ML/url_classifier/training/db/url_classifier_pipeline.pkl"
 
@@ -19,14 +19,18 @@ def numeric_features_from_url(url):
     }
 
 # Lazy load model
-_pipeline = None
+def _load_pipeline():
+    import joblib
+    return joblib.load(MODEL_PATH)
+
+register_model("url_classifier", _load_pipeline)
+
 def load_pipeline():
-    global _pipeline
-    if _pipeline is None:
-        _pipeline = joblib.load(MODEL_PATH)
-    return _pipeline
+    return get_model("url_classifier")
 
+@instrumented("predict_url_category")
 def predict_url_category(url: str):
+    import pandas as pd
     pipeline = load_pipeline()
     nums = numeric_features_from_url(url)
     df = pd.DataFrame([{"url": url, **nums}])
@@ -1,20 +1,33 @@
+import asyncio
 import os
 from dotenv import load_dotenv
 import aiohttp
-import joblib
-import pandas as pd
+from backend.app.services.model_registry import register_model, get_model, ModelUnavailable
+from backend.app.services.metrics import instrumented
 from backend.app.services.gmail_reader import extract_features   # reuse your feature extractor
 from backend.app.ML.url_classifier.training.predict import predict_url_category
 # Load environment variables
 load_dotenv()
 GSB_API_KEY = os.getenv("GSB_API_KEY")
 
-# Load ML model once (not inside function, so it doesn’t reload every request)
-model = joblib.load("backend\\app\\ML\\url_classifier\\url_model.pkl")
+# Loaded once, on first use or by the startup warm-up, instead of at import
+URL_MODEL_PATH = "backend\\app\\ML\\url_classifier\\url_model.pkl"
+
+
+def load_url_model():
+    import joblib
+    return joblib.load(URL_MODEL_PATH)
+
+
+register_model("url_model", load_url_model)
 
 # ---------- ML SCANNER OLD ONLY SCAM OR BEGNIN----------
+@instrumented("scan_url_with_ml", outcome=lambda result: result["status"])
 def scan_url_with_ml(url: str) -> dict:
     """Scan a URL with the trained ML model"""
+    model = get_model("url_model")
+    import pandas as pd
+
     features = extract_features(url)
     X = pd.DataFrame([features])
 
@@ -50,6 +63,7 @@ def scan_url_with_ml_new(url: str) -> dict:
 
 
 # ---------- GSB SCANNER ----------
+@instrumented("scan_url_with_gsb", outcome=lambda result: result["status"])
 async def scan_url_with_gsb(url: str) -> dict:
     """Scan a URL with Google Safe Browsing API"""
     if not GSB_API_KEY:
@@ -91,7 +105,11 @@ async def scan_url_with_gsb(url: str) -> dict:
 
 # ---------- HYBRID SCANNER ----------
 async def scan_url_hybrid(url: str) -> dict:
-    ml_result = scan_url_with_ml(url)
+    try:
+        # Off the event loop: the first call loads the model, and get_model blocks on its lock
+        ml_result = await asyncio.to_thread(scan_url_with_ml, url)
+    except ModelUnavailable as e:
+        ml_result = {"status": "error", "details": [str(e)]}
     gsb_result = await scan_url_with_gsb(url)
 
     return {
@@ -5,10 +5,13 @@ from urllib.parse import urlparse
 import dns.asyncresolver
 from email.utils import parseaddr
 from email import message_from_bytes
+from email.parser import BytesHeaderParser
 from typing import Dict, Any, List, Tuple
 import time
 import hashlib
 from backend.app.analyzers.LinkScanner import scan_url_with_gsb
+from backend.app.analyzers.link_extractor import extract_all_links
+from backend.app.services.metrics import instrumented, stage_timer
 
 # Store email data and authenticity results
 email_store = {
@@ -45,8 +48,12 @@ def validate_email_syntax(email_address: str) -> bool:
     
     return re.match(email_regex, parsed_email) is not None
 
+@instrumented("dns_lookup", outcome=lambda result: "ok" if result[1] else "fail")
 async def dns_lookup(record_type: str, name: str) -> Tuple[List[str], bool]:
-    """Perform DNS lookup without caching."""
+    """
+    Perform DNS lookup without caching. ok is True when the resolver gave an
+    answer, including "no such name" or "no records of that type".
+    """
     resolver = dns.asyncresolver.Resolver()
     resolver.nameservers = ["1.1.1.1", "8.8.8.8", "9.9.9.9"]
     
@@ -57,13 +64,17 @@ async def dns_lookup(record_type: str, name: str) -> Tuple[List[str], bool]:
         )
         records = [str(r) for r in answers]
         return records, True
-    except (dns.resolver.NXDOMAIN, dns.resolver.NoAnswer, 
-            dns.resolver.NoNameservers, dns.exception.Timeout,
-            asyncio.TimeoutError):
+    except (dns.resolver.NXDOMAIN, dns.resolver.NoAnswer):
+        return [], True
+    except (dns.resolver.NoNameservers, dns.exception.Timeout, asyncio.TimeoutError):
         return [], False
     except Exception as e:
         return [f"Lookup failed: {str(e)}"], False
 
+async def stored_records(records: List[str]) -> Tuple[List[str], bool]:
+    """Wrap already-known records so they can be awaited like dns_lookup()."""
+    return records, True
+
 def has_valid_spf(records: List[str]) -> bool:
     """Check if SPF records are valid."""
     if not records:
@@ -106,41 +117,14 @@ def get_dmarc_policy(records: List[str]) -> str:
                 return "none"
     return "none"
 
-def extract_links(html_content):
-    """Extract all hyperlinks from HTML content with enhanced validation."""
-    if not html_content:
+def extract_links(html_content, text_content=None):
+    """
+    Extract all links from HTML content (and an optional plain-text body),
+    deduplicated by canonical URL with redirect wrappers unwrapped.
+    """
+    if not html_content and not text_content:
         return []
-
-    link_pattern = re.compile(
-        r'<a\s+(?:[^>]*?\s+)?href=(["\'])(.*?)\1',
-        re.IGNORECASE | re.MULTILINE,
-    )
-
-    links = []
-    for match in link_pattern.finditer(html_content):
-        url = match.group(2)
-
-        if url.startswith(("javascript:", "data:", "vbscript:")):
-            continue
-
-        try:
-            parsed = urlparse(url)
-            if parsed.scheme in ("http", "https", "mailto", "ftp"):
-                links.append(
-                    {
-                        "url": url,
-                        "domain": parsed.netloc,
-                        "is_external": bool(parsed.netloc),
-                        "scheme": parsed.scheme,
-                        "path": parsed.path,
-                        "query": parsed.query,
-                        "fragment": parsed.fragment,
-                    }
-                )
-        except Exception:
-            continue
-
-    return links
+    return extract_all_links(html_content, text_content)
 
 def get_email_parts(msg):
     """Extract both HTML and plain text parts from an email message."""
@@ -167,11 +151,21 @@ def get_email_parts(msg):
 # ----------------------------
 # Authenticity analyzer
 # ----------------------------
-async def get_gmail_authenticity(raw_email_bytes: bytes):
+HEADER_END_PATTERN = re.compile(rb"\r?\n\r?\n")
+
+
+def parse_headers(raw_email):
+    """Parse only the header block; raw_email may be bytes or a memory-mapped upload."""
+    end = HEADER_END_PATTERN.search(raw_email)
+    return BytesHeaderParser().parsebytes(bytes(raw_email[:end.start()] if end else raw_email))
+
+
+async def get_gmail_authenticity(raw_email_bytes):
     """
     Check SPF, DKIM, DMARC, Email Syntax, Domain, and MX records for a Gmail message.
+    raw_email_bytes can be bytes or any buffer (e.g. a memoryview of an mmap).
     """
-    msg = message_from_bytes(raw_email_bytes)
+    msg = parse_headers(raw_email_bytes)
     from_header = msg.get("From", "")
     domain = extract_domain(from_header)
 
@@ -187,15 +181,36 @@ async def get_gmail_authenticity(raw_email_bytes: bytes):
         "request_id": hashlib.md5(f"{time.time()}{from_header}".encode()).hexdigest()[:12]
     }
 
-    spf_task = asyncio.create_task(dns_lookup("TXT", domain))
-    dmarc_task = asyncio.create_task(dns_lookup("TXT", f"_dmarc.{domain}"))
-    mx_task = asyncio.create_task(dns_lookup("MX", domain))
+    # SPF/DMARC/MX posture is read from the domain profile row while it is fresh;
+    # otherwise fall back to live DNS lookups
+    from backend.app.services.domain_profiles import get_fresh_profile, touch_domain
+    touch_domain(domain)
+    profile = await asyncio.to_thread(get_fresh_profile, domain) if domain else None
+
+    stored = profile["dns_records"] if profile is not None else {}
+    # Only answers the resolver actually gave are reused; failed lookups are retried live
+    stored_ok = stored.get("ok", {})
+
+    def lookup(kind, record_type, name):
+        if stored_ok.get(kind) is True:
+            return asyncio.create_task(stored_records(stored.get(kind, [])))
+        return asyncio.create_task(dns_lookup(record_type, name))
+
+    spf_task = lookup("spf", "TXT", domain)
+    dmarc_task = lookup("dmarc", "TXT", f"_dmarc.{domain}")
+    mx_task = lookup("mx", "MX", domain)
+    if profile is not None:
+        results["domain_score"] = profile["score"]
     
     results["email_syntax"] = validate_email_syntax(from_header)
 
     # DKIM check
     try:
-        if dkim.verify(raw_email_bytes):
+        with stage_timer("dkim.verify") as timer:
+            # Fetches the signer's key from DNS: keep it off the event loop
+            verified = await asyncio.to_thread(dkim.verify, raw_email_bytes)
+            timer.outcome = "pass" if verified else "fail"
+        if verified:
             results["dkim"]["status"] = "pass"
             results["dkim"]["records"] = ["DKIM verification passed"]
         else:
@@ -210,7 +225,9 @@ async def get_gmail_authenticity(raw_email_bytes: bytes):
         spf_records, success = await spf_task
         results["spf"]["records"] = spf_records
         
-        if has_valid_spf(spf_records):
+        if not success:
+            results["spf"]["status"] = "error"
+        elif has_valid_spf(spf_records):
             results["spf"]["status"] = "configured"
         else:
             results["spf"]["status"] = "not_configured"
@@ -226,7 +243,9 @@ async def get_gmail_authenticity(raw_email_bytes: bytes):
         dmarc_policy = get_dmarc_policy(dmarc_records)
         results["dmarc"]["policy"] = dmarc_policy
         
-        if dmarc_policy == "reject":
+        if not success:
+            results["dmarc"]["status"] = "error"
+        elif dmarc_policy == "reject":
             results["dmarc"]["status"] = "reject"
         elif dmarc_policy == "quarantine":
             results["dmarc"]["status"] = "quarantine"
@@ -243,7 +262,9 @@ async def get_gmail_authenticity(raw_email_bytes: bytes):
         mx_records, success = await mx_task
         results["mx"]["records"] = mx_records
         
-        if mx_records:
+        if not success:
+            results["mx"]["status"] = "error"
+        elif mx_records:
             results["mx"]["status"] = "configured"
         else:
             results["mx"]["status"] = "not_configured"
@@ -278,7 +299,7 @@ async def analyze_gmail_message(raw_email: bytes) -> Dict[str, Any]:
     date = msg.get("Date", "")
     
     html_body, text_body = get_email_parts(msg)
-    links = extract_links(html_body) if html_body else []
+    links = extract_links(html_body, text_body)
 
     scanned_links = []
     
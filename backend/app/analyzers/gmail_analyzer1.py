@@ -3,11 +3,26 @@ from backend.app.db.models import Domain,AliasDomain
 from backend.app.analyzers.gmail_analyzer import extract_domain
 import whois
 from datetime import datetime
+import re
 import socket
 import time
 from backend.app.db import crud
+from backend.app.services.metrics import instrumented
 
-def check_domain(email: str, db: Session) -> dict:
+try:
+    from whois.exceptions import PywhoisError   # python-whois >= 0.9
+except ImportError:
+    from whois.parser import PywhoisError
+
+WHOIS_PORT = 43
+IANA_WHOIS_SERVER = "whois.iana.org"
+# IANA names the registry server for a TLD; thin registries (.com, .net) name the registrar's
+TLD_REFERRAL_PATTERN = re.compile(r"^refer:\s*(\S+)", re.IGNORECASE | re.MULTILINE)
+REGISTRAR_REFERRAL_PATTERN = re.compile(r"^\s*Registrar WHOIS Server:\s*(\S+)", re.IGNORECASE | re.MULTILINE)
+# tld -> registry WHOIS server
+_tld_servers = {}
+
+async def check_domain(email: str, db: Session) -> dict:
     """
     Comprehensive domain check including disposable validation and WHOIS information
     """
@@ -22,16 +37,16 @@ def check_domain(email: str, db: Session) -> dict:
             "status": "Invalid email"
         }
 
-    # Check if domain is disposable
-    match_disposable = db.query(Domain).filter_by(domain_name=domain).first()
-    is_disposable = match_disposable is not None
-
-    # Check if domain is an alias
-    match_alias = db.query(AliasDomain).filter_by(domain_name=domain).first()
-    is_alias = match_alias is not None
+    # Disposable/alias/age/DNS posture come from one domain_profiles row,
+    # re-derived live only when the row is stale
+    from backend.app.services.domain_profiles import get_or_refresh_profile
+    from backend.app.services.whois_service import lookup_whois
+    profile = await get_or_refresh_profile(domain)
+    is_disposable = profile["is_disposable"]
+    is_alias = profile["is_alias"]
 
-    # Get WHOIS information
-    whois_info = get_whois_info(domain)
+    # Full WHOIS details (served from the WHOIS cache the profile refresh filled)
+    whois_info = await lookup_whois(domain)
     
     # Build comprehensive result
     result = {
@@ -40,7 +55,8 @@ def check_domain(email: str, db: Session) -> dict:
         "valid": not is_disposable,
         "status": "Disposable email" if is_disposable else "Legit email",
         "reason": "Domain is disposable/banned" if is_disposable else "Domain is Alias" if is_alias else "Domain is allowed",
-        "whois_info": whois_info if whois_info["success"] else {"error": whois_info["error"]}
+        "whois_info": whois_info if whois_info["success"] else {"error": whois_info["error"]},
+        "domain_score": profile["score"],
     }
     
     # Add domain age analysis if WHOIS was successful
@@ -51,13 +67,58 @@ def check_domain(email: str, db: Session) -> dict:
     
     return result
 
-def get_whois_info(domain: str) -> dict:
+def whois_query(server: str, query: str, deadline: float) -> str:
+    """One WHOIS request on its own socket, bounded by the time left until deadline."""
+    with socket.create_connection((server, WHOIS_PORT), timeout=max(deadline - time.monotonic(), 0.01)) as sock:
+        sock.sendall(query.encode("idna") + b"\r\n")
+        chunks = []
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise socket.timeout("WHOIS lookup timed out")
+            sock.settimeout(remaining)
+            chunk = sock.recv(4096)
+            if not chunk:
+                break
+            chunks.append(chunk)
+    return b"".join(chunks).decode("utf-8", errors="replace")
+
+
+def fetch_whois_text(domain: str, timeout: float) -> str:
+    """
+    Raw WHOIS record: the registry server comes from IANA (cached per TLD),
+    and a registrar referral is followed when the registry is thin. Every
+    request shares one deadline, so timeout bounds the whole lookup.
+    """
+    deadline = time.monotonic() + timeout
+    tld = domain.rsplit(".", 1)[-1]
+    server = _tld_servers.get(tld)
+    if server is None:
+        match = TLD_REFERRAL_PATTERN.search(whois_query(IANA_WHOIS_SERVER, tld, deadline))
+        if match is None:
+            raise PywhoisError(f"No WHOIS server known for .{tld}")
+        server = _tld_servers[tld] = match.group(1).lower()
+
+    text = whois_query(server, domain, deadline)
+    referral = REGISTRAR_REFERRAL_PATTERN.search(text)
+    if referral and referral.group(1).lower() != server:
+        try:
+            text = whois_query(referral.group(1), domain, deadline)
+        except OSError:
+            pass    # the registry's record still has the dates
+    return text
+
+
+@instrumented("get_whois_info", outcome=lambda result: "ok" if result["success"] else "fail")
+def get_whois_info(domain: str, timeout: float = 10) -> dict:
     """
-    Get WHOIS information for a domain with error handling and timeout protection
+    Get WHOIS information for a domain with error handling and timeout protection.
+    The query is made on sockets bounded by timeout (no process-wide default);
+    python-whois only parses the record.
+    Blocking: call it through whois_service.lookup_whois from async code.
     """
     try:
-        socket.setdefaulttimeout(10)
-        whois_data = whois.whois(domain)
+        whois_data = whois.parser.WhoisEntry.load(domain, fetch_whois_text(domain, timeout))
         
         whois_info = {
             "domain_name": whois_data.domain_name,
@@ -104,7 +165,7 @@ def get_whois_info(domain: str) -> dict:
         
         return {"success": True, "data": whois_info, "error": None}
         
-    except whois.parser.PywhoisError as e:
+    except PywhoisError as e:
         return {"success": False, "data": None, "error": f"WHOIS lookup failed: {str(e)}"}
     except socket.timeout:
         return {"success": False, "data": None, "error": "WHOIS lookup timed out"}
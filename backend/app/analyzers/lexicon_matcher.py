@@ -0,0 +1,135 @@
+# backend/app/analyzers/lexicon_matcher.py
+import json
+import os
+import re
+from collections import deque
+
+from backend.app.services.model_registry import register_model, get_model
+
+LEXICON_PATH = os.getenv("LEXICON_PATH", "backend/app/data/honeytrap_lexicon.json")
+# Letters and digits, with apostrophes kept inside words ("don't", "c'est")
+WORD_PATTERN = re.compile(r"\w+(?:'\w+)*")
+
+
+def words(text: str) -> list:
+    """Unicode case-folded words; phrases and messages are both split this way."""
+    return WORD_PATTERN.findall(text.casefold().replace("\u2019", "'"))
+
+
+class Lexicon:
+    """
+    Aho-Corasick automaton over every phrase of the lexicon, stepping one word
+    at a time: a message is scanned once whatever the number of phrases, and
+    phrases only match whole words ("meet" does not hit "meeting").
+    Matches are leftmost-longest and do not overlap, so a phrase that contains
+    another listed phrase counts once ("let's meet" is not also "meet").
+    """
+
+    def __init__(self, version, phrases):
+        # phrases: [(phrase, category, weight)], deduplicated
+        self.version = version
+        self.phrases = phrases
+        self.categories = sorted({category for _, category, _ in phrases})
+        self.goto = [{}]
+        self.fail = [0]
+        self.depth = [0]
+        # indexes of the phrases ending exactly at a node (one phrase, several categories)
+        self.own = [()]
+        # nodes whose phrases end at a node: itself and its suffixes, longest first
+        self.output = [()]
+        for index, (phrase, _, _) in enumerate(phrases):
+            self._add(words(phrase), index)
+        self._link()
+
+    def _add(self, phrase_words, index):
+        node = 0
+        for word in phrase_words:
+            child = self.goto[node].get(word)
+            if child is None:
+                child = len(self.goto)
+                self.goto[node][word] = child
+                self.goto.append({})
+                self.fail.append(0)
+                self.depth.append(self.depth[node] + 1)
+                self.own.append(())
+                self.output.append(())
+            node = child
+        self.own[node] += (index,)
+
+    def _link(self):
+        """Breadth-first failure links; each node's output includes its suffixes' outputs."""
+        queue = deque(self.goto[0].values())
+        for node in queue:
+            self.output[node] = (node,) if self.own[node] else ()
+        while queue:
+            node = queue.popleft()
+            for word, child in self.goto[node].items():
+                queue.append(child)
+                fallback = self.fail[node]
+                while fallback and word not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[child] = self.goto[fallback].get(word, 0)
+                self.output[child] = ((child,) if self.own[child] else ()) + self.output[self.fail[child]]
+
+    def find(self, text: str) -> dict:
+        """{phrase index: occurrences} in text, leftmost-longest and non-overlapping."""
+        goto, fail, output, depth = self.goto, self.fail, self.output, self.depth
+        spans = []      # (start word, -length, end node) of every match
+        node = 0
+        for position, word in enumerate(words(text)):
+            while node and word not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(word, 0)
+            for end in output[node]:
+                spans.append((position + 1 - depth[end], -depth[end], end))
+
+        counts = {}
+        covered = 0     # first word not yet inside a chosen match
+        for start, length, end in sorted(spans):
+            if start < covered:
+                continue
+            covered = start - length
+            for index in self.own[end]:
+                counts[index] = counts.get(index, 0) + 1
+        return counts
+
+    def match(self, text: str) -> dict:
+        """Weighted hits per category plus the phrases that matched."""
+        categories = {category: {"count": 0, "score": 0.0} for category in self.categories}
+        hits = []
+        for index, count in sorted(self.find(text).items()):
+            phrase, category, weight = self.phrases[index]
+            categories[category]["count"] += count
+            categories[category]["score"] += weight * count
+            hits.append({"phrase": phrase, "category": category, "count": count, "weight": weight})
+        return {
+            "version": self.version,
+            "hits": hits,
+            "categories": {name: stats for name, stats in categories.items() if stats["count"]},
+            "score": round(sum(stats["score"] for stats in categories.values()), 3),
+        }
+
+
+def load_lexicon(path=LEXICON_PATH) -> Lexicon:
+    """Build the automaton from a lexicon file (see backend/app/data/honeytrap_lexicon.json)."""
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+
+    phrases, seen = [], set()
+    for category, spec in data["categories"].items():
+        default_weight = float(spec.get("weight", 1.0))
+        for entry in spec["phrases"]:
+            if isinstance(entry, str):
+                entry = {"phrase": entry}
+            phrase = " ".join(words(entry["phrase"]))
+            if phrase and (phrase, category) not in seen:
+                seen.add((phrase, category))
+                phrases.append((phrase, category, float(entry.get("weight", default_weight))))
+    return Lexicon(str(data.get("version", "unversioned")), phrases)
+
+
+register_model("honeytrap_lexicon", load_lexicon)
+
+
+def match_lexicon(text: str) -> dict:
+    return get_model("honeytrap_lexicon").match(text)
@@ -0,0 +1,199 @@
+# backend/app/analyzers/link_extractor.py
+import html
+import re
+from functools import lru_cache
+from operator import itemgetter
+from urllib.parse import urlsplit, urlunsplit, parse_qs
+
+ALLOWED_SCHEMES = ("http", "https", "mailto", "ftp")
+DEFAULT_PORTS = {"http": 80, "https": 443, "ftp": 21}
+# Characters that end a bare URL in prose more often than they belong to it
+TRAILING_PUNCTUATION = ".,;:!?)]}'\""
+
+# Anchor tags, image maps and forms: href / action, quoted or not
+TAG_LINK_PATTERN = re.compile(
+    r"""<(?:a|area|form)\b[^>]*?\b(?:href|action)\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s>"']+))""",
+    re.IGNORECASE,
+)
+# Bare URLs are found by their "://" and the scheme is checked by looking back;
+# starting the pattern at the scheme letters makes the scan several times slower.
+BARE_URL_PATTERN = re.compile(r"""://[^\s<>"'`]+""")
+# Scheme-less hosts, only looked for in plain-text bodies
+WWW_PATTERN = re.compile(r"""\b[wW][wW][wW]\.[^\s<>"'`]+""")
+
+# host -> query parameters that carry the real destination
+REDIRECT_WRAPPERS = {
+    "google.com": ("q", "url"),
+    "www.google.com": ("q", "url"),
+    "l.facebook.com": ("u",),
+    "lm.facebook.com": ("u",),
+    "l.instagram.com": ("u",),
+    "out.reddit.com": ("url",),
+    "slack-redir.net": ("url",),
+}
+SAFELINKS_SUFFIX = ".safelinks.protection.outlook.com"
+MAX_UNWRAP_DEPTH = 3
+
+
+@lru_cache(maxsize=4096)
+def host_and_port(netloc):
+    """(lower-case host, port) of a netloc; emails reuse a handful of hosts, so this is cached."""
+    parts = urlsplit("//" + netloc)
+    try:
+        port = parts.port
+    except ValueError:
+        port = None
+    return (parts.hostname or "").rstrip("."), port
+
+
+def unwrap_redirect(parts):
+    """Return the destination hidden in a known redirect wrapper, or None."""
+    host = host_and_port(parts.netloc)[0]
+
+    if host == "urldefense.com" and parts.path.startswith("/v3/__"):
+        # urldefense v3: https://urldefense.com/v3/__<url>__;...
+        return parts.path[len("/v3/__"):].split("__", 1)[0] or None
+    if host.endswith(SAFELINKS_SUFFIX):
+        keys = ("url",)
+    elif host in REDIRECT_WRAPPERS:
+        if host.endswith("google.com") and parts.path != "/url":
+            return None
+        keys = REDIRECT_WRAPPERS[host]
+    else:
+        return None
+
+    params = parse_qs(parts.query)
+    for key in keys:
+        target = params.get(key, [""])[0]
+        if target.lower().startswith(("http://", "https://")):
+            return target
+    return None
+
+
+def canonicalize(parts):
+    """Canonical form: lower-case scheme and host, no default port, no fragment. None if unusable."""
+    scheme = parts.scheme.lower()
+    if scheme not in ALLOWED_SCHEMES:
+        return None
+    if scheme == "mailto":
+        return f"mailto:{parts.path.lower()}"
+
+    host, port = host_and_port(parts.netloc)
+    if not host:
+        return None
+    netloc = host if port is None or port == DEFAULT_PORTS.get(scheme) else f"{host}:{port}"
+    return urlunsplit((scheme, netloc, parts.path or "/", parts.query, ""))
+
+
+def resolve(url):
+    """Unwrap redirect wrappers and canonicalize: (final_url, canonical, wrapper_url, parts)."""
+    wrapper = None
+    try:
+        parts = urlsplit(url)
+        for _ in range(MAX_UNWRAP_DEPTH):
+            target = unwrap_redirect(parts)
+            if not target:
+                break
+            wrapper = wrapper or url
+            url = target
+            parts = urlsplit(url)
+        return url, canonicalize(parts), wrapper, parts
+    except ValueError:
+        return url, None, None, None
+
+
+def iter_bare_urls(body, in_html):
+    """(position, url) for each bare http(s)/ftp URL in body."""
+    for match in BARE_URL_PATTERN.finditer(body):
+        start = match.start()
+        head = body[start - 5:start].lower() if start >= 5 else body[:start].lower()
+        if head.endswith("http"):
+            scheme_start = start - 4
+        elif head.endswith(("https", "ftp")):
+            scheme_start = start - (5 if head[-1] == "s" else 3)
+        else:
+            continue
+        before = body[scheme_start - 1] if scheme_start else " "
+        # Part of a longer word, or (in HTML) an attribute value such as <img src="...">
+        if before.isalnum() or (in_html and before in "=\"'"):
+            continue
+        yield scheme_start, body[scheme_start:match.end()].rstrip(TRAILING_PUNCTUATION)
+
+
+def iter_html_candidates(html_body):
+    for match in TAG_LINK_PATTERN.finditer(html_body):
+        quoted, single, unquoted = match.groups()
+        yield match.start(), quoted if quoted is not None else single if single is not None else unquoted
+    yield from iter_bare_urls(html_body, in_html=True)
+
+
+def iter_text_candidates(text_body):
+    yield from iter_bare_urls(text_body, in_html=False)
+    for match in WWW_PATTERN.finditer(text_body):
+        if text_body[match.start() - 3:match.start()] != "://":
+            yield match.start(), "http://" + match.group().rstrip(TRAILING_PUNCTUATION)
+
+
+def extract_all_links(html_body=None, text_body=None) -> list:
+    """
+    Extract links from an HTML body and a plain-text body.
+
+    Not a single pass: each body is scanned once per pattern in C (tags and
+    bare URLs for HTML, bare URLs and www. hosts for text) and the candidates
+    are sorted back into document order. One combined alternation would be a
+    single scan, but Python's re runs it slower than the separate patterns.
+    Everything after the scan (entity decoding, unwrapping known redirect
+    wrappers such as Google, Safe Links, urldefense and Facebook,
+    canonicalization) runs once per distinct candidate. Links are
+    deduplicated by canonical URL with an occurrence count, in order of
+    first appearance.
+    """
+    found = {}      # canonical url -> link entry
+    resolved = {}   # raw candidate -> canonical url (or None), so repeats cost a dict lookup
+
+    def add(raw, source):
+        if raw in resolved:
+            key = resolved[raw]
+        else:
+            url = html.unescape(raw).strip() if "&" in raw else raw.strip()
+            key = None
+            if url and not url.lower().startswith(("javascript:", "data:", "vbscript:")):
+                url, key, wrapper, parts = resolve(url)
+                if key is not None and key not in found:
+                    found[key] = link_entry(url, key, wrapper, parts)
+            resolved[raw] = key
+        if key is None:
+            return
+        entry = found[key]
+        entry["occurrences"] += 1
+        if source not in entry["sources"]:
+            entry["sources"].append(source)
+
+    for body, source, candidates in ((html_body, "html", iter_html_candidates),
+                                     (text_body, "text", iter_text_candidates)):
+        if body:
+            # Patterns are scanned one after the other; sort back into document order
+            for _, raw in sorted(candidates(body), key=itemgetter(0)):
+                add(raw, source)
+
+    return list(found.values())
+
+
+def link_entry(url, canonical_url, wrapper, parts):
+    scheme = parts.scheme.lower()
+    domain = "" if scheme == "mailto" else canonical_url.split("/", 3)[2]
+    entry = {
+        "url": url,
+        "canonical_url": canonical_url,
+        "occurrences": 0,
+        "sources": [],
+        "domain": domain,
+        "is_external": bool(domain),
+        "scheme": scheme,
+        "path": parts.path,
+        "query": parts.query,
+        "fragment": parts.fragment,
+    }
+    if wrapper:
+        entry["wrapper_url"] = wrapper
+    return entry
@@ -0,0 +1,95 @@
+# backend/app/analyzers/perceptual_hash.py
+import numpy as np
+
+# pHash: DCT of a 32x32 grayscale thumbnail, 8x8 lowest frequencies vs their median
+PHASH_SIZE = 32
+PHASH_LOW = 8
+# dHash: sign of horizontal gradients on a 9x8 thumbnail
+DHASH_SIZE = 8
+
+
+def dct_matrix(n):
+    """Orthonormal DCT-II matrix: coefficients = D @ x (and D @ X @ D.T in 2-D)."""
+    k = np.arange(n)[:, None]
+    i = np.arange(n)[None, :]
+    matrix = np.cos(np.pi * (2 * i + 1) * k / (2 * n)) * np.sqrt(2.0 / n)
+    matrix[0] /= np.sqrt(2.0)
+    return matrix
+
+
+DCT = dct_matrix(PHASH_SIZE)
+
+
+def resize_area(gray, height, width):
+    """Shrink a 2-D array by averaging blocks (nearest sampling for axes that are too small)."""
+    gray = np.asarray(gray, dtype=np.float64)
+    rows, cols = gray.shape
+    if rows < height:
+        gray, rows = gray[np.arange(height) * rows // height], height
+    if cols < width:
+        gray, cols = gray[:, np.arange(width) * cols // width], width
+    row_edges = np.arange(height) * rows // height
+    col_edges = np.arange(width) * cols // width
+    sums = np.add.reduceat(np.add.reduceat(gray, row_edges, axis=0), col_edges, axis=1)
+    counts = np.outer(np.diff(np.append(row_edges, rows)), np.diff(np.append(col_edges, cols)))
+    return sums / counts
+
+
+def to_gray(pixels):
+    """Luma of an (H, W, 3|4) RGB(A) array; 2-D arrays are returned as they are."""
+    pixels = np.asarray(pixels)
+    if pixels.ndim == 2:
+        return pixels
+    return pixels[..., :3] @ np.array([0.299, 0.587, 0.114])
+
+
+def bits_to_int(bits):
+    return int.from_bytes(np.packbits(bits.ravel()).tobytes(), "big")
+
+
+def phash_batch(thumbnails):
+    """pHashes of an (N, 32, 32) stack of grayscale thumbnails, in one vectorized DCT."""
+    coeffs = DCT @ thumbnails @ DCT.T
+    low = coeffs[:, :PHASH_LOW, :PHASH_LOW].reshape(len(thumbnails), -1)
+    medians = np.median(low[:, 1:], axis=1, keepdims=True)  # the DC term would skew the median
+    return [bits_to_int(row) for row in low > medians]
+
+
+def dhash_batch(thumbnails):
+    """dHashes of an (N, 8, 9) stack of grayscale thumbnails."""
+    return [bits_to_int(row) for row in thumbnails[:, :, 1:] > thumbnails[:, :, :-1]]
+
+
+def hash_pixels(frames):
+    """(phash, dhash) for each image given as pixel arrays (e.g. decoded video frames)."""
+    grays = [to_gray(frame) for frame in frames]
+    if not grays:
+        return []
+    phashes = phash_batch(np.stack([resize_area(g, PHASH_SIZE, PHASH_SIZE) for g in grays]))
+    dhashes = dhash_batch(np.stack([resize_area(g, DHASH_SIZE, DHASH_SIZE + 1) for g in grays]))
+    return list(zip(phashes, dhashes))
+
+
+def load_pixels(path):
+    """Decode an image file to a grayscale array (first frame, EXIF rotation applied)."""
+    from PIL import Image, ImageOps
+
+    try:
+        with Image.open(path) as image:
+            # Decoding at reduced size is much cheaper for large photos; hashes only need 32x32.
+            # draft() only works before the first decode, and exif_transpose decodes
+            image.draft("L", (PHASH_SIZE * 4, PHASH_SIZE * 4))
+            image = ImageOps.exif_transpose(image)
+            return np.asarray(image.convert("L"), dtype=np.float64)
+    except OSError as e:
+        # UnidentifiedImageError and truncated data are OSErrors: a bad upload, not a server error
+        raise ValueError(f"Could not decode image: {e}")
+
+
+def hash_image(path):
+    """(phash, dhash) of an image file as 64-bit ints."""
+    return hash_pixels([load_pixels(path)])[0]
+
+
+def hamming(a, b):
+    return (a ^ b).bit_count()
@@ -0,0 +1,102 @@
+# Add a directory of known scam images (e.g. recycled honeytrap profile photos) to the
+# perceptual-hash index. Hashing runs on a process pool; images already indexed
+# (same SHA-256) are skipped, so re-running on a grown directory only adds new files.
+#
+#   python -m backend.app.cli.build_image_index known_scams/ --label scam_profile --workers 8
+
+import argparse
+import hashlib
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from backend.app.analyzers.perceptual_hash import hash_image
+from backend.app.db.database import SessionLocal
+from backend.app.db.init_db import init_db
+from backend.app.db.models import KnownImage
+from backend.app.services.image_index import to_signed
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp", ".gif", ".bmp", ".tif", ".tiff")
+
+
+def iter_images(directory):
+    for root, _, names in os.walk(directory):
+        for name in sorted(names):
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                yield os.path.join(root, name)
+
+
+def hash_file(path):
+    """(path, sha256, phash, dhash), or (path, None, None, error) if the image cannot be decoded."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(1024 * 1024):
+            digest.update(chunk)
+    try:
+        phash, dhash = hash_image(path)
+    except Exception as e:
+        return path, None, None, str(e)
+    return path, digest.hexdigest(), phash, dhash
+
+
+def batches(items, size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def store(results, label):
+    """Insert new hashes; returns how many were added (duplicates by SHA-256 are skipped)."""
+    db = SessionLocal()
+    try:
+        shas = [sha for _, sha, _, _ in results]
+        known = {row[0] for row in db.query(KnownImage.sha256).filter(KnownImage.sha256.in_(shas))}
+        rows, seen = [], set(known)
+        for path, sha, phash, dhash in results:
+            if sha in seen:
+                continue
+            seen.add(sha)
+            rows.append({"phash": to_signed(phash), "dhash": to_signed(dhash), "sha256": sha,
+                         "source": path, "label": label})
+        db.bulk_insert_mappings(KnownImage, rows)
+        db.commit()
+        return len(rows)
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Add a directory of images to the perceptual-hash index.")
+    parser.add_argument("directory")
+    parser.add_argument("--label", default="scam_profile")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    init_db()
+    added = skipped = failed = 0
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        for batch in batches(iter_images(args.directory), args.batch_size):
+            hashed = list(pool.map(hash_file, batch, chunksize=max(1, len(batch) // (args.workers * 4))))
+            good = [result for result in hashed if result[1] is not None]
+            for path, _, _, error in (result for result in hashed if result[1] is None):
+                print(f"❌ {path}: {error}")
+            failed += len(hashed) - len(good)
+            new = store(good, args.label) if good else 0
+            added += new
+            skipped += len(good) - new
+            elapsed = time.perf_counter() - started
+            print(f"progress: {added} added, {skipped} already indexed, {failed} failed "
+                  f"| {(added + skipped + failed) / elapsed:,.1f} images/s", flush=True)
+
+    print(f"done: {added} added, {skipped} already indexed, {failed} failed")
+
+
+if __name__ == "__main__":
+    main()
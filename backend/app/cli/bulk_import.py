@@ -0,0 +1,279 @@
+# Back-scan archived mail: stream an mbox file or a directory of .eml/.msg files,
+# parse on a process pool, scan the links and write one verdict per message.
+#
+#   python -m backend.app.cli.bulk_import archive.mbox --output verdicts.jsonl
+#   python -m backend.app.cli.bulk_import exports/ --output verdicts.db --workers 8 --scan ml
+#
+# Progress is checkpointed after every batch; re-running the same command resumes.
+
+import argparse
+import asyncio
+import json
+import os
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from backend.app.services.email_reader import extract_email_content, extract_msg_content_fast
+from backend.app.analyzers.gmail_Analyzer import extract_links
+
+STAGES = ("read", "parse", "scan", "write")
+
+
+# ---------- SOURCES ----------
+def iter_mbox(path, offset=0):
+    """
+    Yield (key, end_offset, "eml", raw_bytes) per message, reading the mbox line by
+    line. end_offset is where the next message starts, which is what resume seeks to.
+    """
+    with open(path, "rb") as f:
+        f.seek(offset)
+        lines, start, position, previous_blank = [], None, offset, True
+        for line in f:
+            line_start = position
+            position += len(line)
+            if line.startswith(b"From ") and previous_blank:
+                if start is not None:
+                    yield f"{path}:{start}", line_start, "eml", b"".join(lines)
+                lines, start = [], line_start
+            elif start is not None:
+                # mboxrd quoting: ">From " at the start of a body line
+                if line.startswith(b">") and line.lstrip(b">").startswith(b"From "):
+                    line = line[1:]
+                lines.append(line)
+            previous_blank = line.strip() == b""
+        if start is not None:
+            yield f"{path}:{start}", position, "eml", b"".join(lines)
+
+
+def iter_directory(path, skip=0):
+    """Yield (key, index, kind, raw_bytes) for every .eml/.msg file, in a stable order."""
+    files = []
+    for root, dirs, names in os.walk(path):
+        dirs.sort()
+        files.extend(os.path.join(root, n) for n in sorted(names) if n.lower().endswith((".eml", ".msg")))
+    for index, file_path in enumerate(files[skip:], start=skip + 1):
+        with open(file_path, "rb") as f:
+            raw = f.read()
+        yield os.path.relpath(file_path, path), index, "msg" if file_path.lower().endswith(".msg") else "eml", raw
+
+
+# ---------- WORKERS ----------
+def parse_message(kind, raw):
+    """Runs in a pool process: parse and extract links, returning only what is needed."""
+    # Any failure here is one bad message, never a reason to stop the run
+    try:
+        parsed = extract_msg_content_fast(raw) if kind == "msg" else extract_email_content(raw)
+        links = [link["url"] for link in extract_links(parsed.get("html"), parsed.get("text"))]
+    except Exception as e:
+        return {"error": f"parse failed: {e}"}
+    return {
+        "from": parsed.get("from", ""),
+        "to": parsed.get("to", ""),
+        "subject": parsed.get("subject", ""),
+        "date": str(parsed.get("date", "")),
+        "attachments": len(parsed.get("attachments", [])),
+        "links": links,
+    }
+
+
+async def scan_urls(urls, mode, concurrency):
+    """
+    Scan each distinct URL of a batch once: ({url: final_status}, {url: error}).
+    A URL that fails to scan gets status "error"; it never stops the batch.
+    """
+    statuses, errors = {}, {}
+    if mode == "none" or not urls:
+        return statuses, errors
+    from backend.app.analyzers.LinkScanner import scan_url_hybrid, scan_url_with_ml
+
+    if mode == "ml":
+        for url in urls:
+            try:
+                statuses[url] = scan_url_with_ml(url)["status"]
+            except Exception as e:
+                statuses[url], errors[url] = "error", f"scan failed: {e}"
+        return statuses, errors
+
+    slots = asyncio.Semaphore(concurrency)
+
+    async def scan(url):
+        async with slots:
+            try:
+                statuses[url] = (await scan_url_hybrid(url))["final_status"]
+            except Exception as e:
+                statuses[url], errors[url] = "error", f"scan failed: {e}"
+
+    await asyncio.gather(*(scan(url) for url in urls))
+    return statuses, errors
+
+
+# ---------- OUTPUT ----------
+class VerdictWriter:
+    """Append verdicts to a JSONL file, or upsert them into a SQLite table."""
+
+    def __init__(self, path):
+        self.sqlite = path.endswith((".db", ".sqlite", ".sqlite3"))
+        if self.sqlite:
+            self.conn = sqlite3.connect(path)
+            self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS verdicts (
+                key TEXT PRIMARY KEY,
+                sender TEXT,
+                subject TEXT,
+                date TEXT,
+                verdict TEXT,
+                links TEXT,
+                error TEXT
+            )""")
+        else:
+            self.file = open(path, "a", encoding="utf-8")
+
+    def write(self, records):
+        if self.sqlite:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO verdicts (key, sender, subject, date, verdict, links, error) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(r["key"], r.get("from"), r.get("subject"), r.get("date"), r["verdict"], json.dumps(r.get("links", {})), r.get("error"))
+                 for r in records],
+            )
+            self.conn.commit()
+        else:
+            for r in records:
+                self.file.write(json.dumps(r) + "\n")
+            self.file.flush()
+            os.fsync(self.file.fileno())
+
+    def close(self):
+        (self.conn if self.sqlite else self.file).close()
+
+
+def verdict_for(links):
+    if not links:
+        return "no_links"
+    statuses = set(links.values())
+    if "unsafe" in statuses:
+        return "unsafe"
+    if statuses == {"safe"}:
+        return "safe"
+    return "not_scanned" if statuses == {"not_scanned"} else "unknown"
+
+
+# ---------- CHECKPOINT ----------
+def load_checkpoint(path, source):
+    if os.path.exists(path):
+        with open(path) as f:
+            checkpoint = json.load(f)
+        if checkpoint.get("source") == os.path.abspath(source):
+            return checkpoint
+    return {"source": os.path.abspath(source), "position": 0, "processed": 0}
+
+
+def save_checkpoint(path, checkpoint):
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp, path)
+
+
+# ---------- DRIVER ----------
+def batches(iterator, size):
+    batch = []
+    for item in iterator:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def timed(iterator, stats, stage):
+    """Pass items through, adding the time spent producing them to stats[stage]."""
+    while True:
+        started = time.perf_counter()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            return
+        finally:
+            stats[stage] += time.perf_counter() - started
+        yield item
+
+
+def report(stats, processed, failed, final=False):
+    parts = []
+    for stage in STAGES:
+        seconds = stats[stage]
+        rate = processed / seconds if seconds else 0.0
+        parts.append(f"{stage} {rate:,.1f} msg/s")
+    print(f"{'done' if final else 'progress'}: {processed} messages ({failed} failed to parse) | " + " | ".join(parts), flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk-scan an mbox file or a directory of .eml/.msg files.")
+    parser.add_argument("source", help="mbox file or directory")
+    parser.add_argument("--output", required=True, help="verdicts.jsonl, or a .db/.sqlite file")
+    parser.add_argument("--checkpoint", help="checkpoint file (default: <output>.checkpoint)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--batch-size", type=int, default=200)
+    parser.add_argument("--scan", choices=("hybrid", "ml", "none"), default="hybrid")
+    parser.add_argument("--scan-concurrency", type=int, default=16)
+    args = parser.parse_args()
+
+    checkpoint_path = args.checkpoint or args.output + ".checkpoint"
+    checkpoint = load_checkpoint(checkpoint_path, args.source)
+    if checkpoint["processed"]:
+        print(f"Resuming after {checkpoint['processed']} messages")
+
+    if os.path.isdir(args.source):
+        messages = iter_directory(args.source, skip=checkpoint["position"])
+    else:
+        messages = iter_mbox(args.source, offset=checkpoint["position"])
+
+    writer = VerdictWriter(args.output)
+    stats = dict.fromkeys(STAGES, 0.0)
+    processed = 0
+    failed = 0
+    loop = asyncio.new_event_loop()
+
+    try:
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            chunksize = max(1, args.batch_size // (args.workers * 4))
+            for batch in batches(timed(messages, stats, "read"), args.batch_size):
+                started = time.perf_counter()
+                parsed = list(pool.map(parse_message, [kind for _, _, kind, _ in batch], [raw for _, _, _, raw in batch], chunksize=chunksize))
+                stats["parse"] += time.perf_counter() - started
+                failed += sum(1 for p in parsed if "error" in p)
+
+                started = time.perf_counter()
+                urls = {url for p in parsed for url in p.get("links", [])}
+                statuses, scan_errors = loop.run_until_complete(scan_urls(urls, args.scan, args.scan_concurrency))
+                stats["scan"] += time.perf_counter() - started
+
+                started = time.perf_counter()
+                records = []
+                for (key, _, _, _), p in zip(batch, parsed):
+                    links = {url: statuses.get(url, "not_scanned") for url in dict.fromkeys(p.pop("links", []))}
+                    verdict = "error" if "error" in p else verdict_for(links)
+                    errors = [scan_errors[url] for url in links if url in scan_errors]
+                    if errors:
+                        # The message parsed; its verdict still comes from the links that did scan
+                        p["error"] = "; ".join(errors)
+                    records.append({"key": key, **p, "links": links, "verdict": verdict})
+                writer.write(records)
+                processed += len(batch)
+                checkpoint["position"] = batch[-1][1]
+                checkpoint["processed"] += len(batch)
+                save_checkpoint(checkpoint_path, checkpoint)
+                stats["write"] += time.perf_counter() - started
+
+                report(stats, processed, failed)
+    finally:
+        loop.close()
+        writer.close()
+
+    report(stats, processed, failed, final=True)
+
+
+if __name__ == "__main__":
+    main()
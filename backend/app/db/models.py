@@ -1,5 +1,5 @@
 # backend/app/db/models.py
-from sqlalchemy import Column, String, DateTime
+from sqlalchemy import Column, String, DateTime, Text, Boolean, Integer, Float
 from datetime import datetime
 from .database import Base 
 
@@ -13,4 +13,70 @@ class AliasDomain(Base):
     __tablename__ = "alias_domains"
 
     domain_name = Column(String, primary_key=True, index=True)
-    updated_on = Column(DateTime, default=datetime.utcnow)
\ No newline at end of file
+    updated_on = Column(DateTime, default=datetime.utcnow)
+
+class WhoisRecord(Base):
+    __tablename__ = "whois_cache"
+
+    domain_name = Column(String, primary_key=True, index=True)
+    result = Column(Text, nullable=False)  # JSON-encoded get_whois_info() result
+    success = Column(Boolean, default=False)
+    fetched_on = Column(DateTime, default=datetime.utcnow)
+
+class DomainProfile(Base):
+    __tablename__ = "domain_profiles"
+
+    domain_name = Column(String, primary_key=True, index=True)
+    is_disposable = Column(Boolean, default=False)
+    is_alias = Column(Boolean, default=False)
+    whois_age_years = Column(Integer, nullable=True)
+    has_spf = Column(Boolean, default=False)
+    dmarc_policy = Column(String, default="none")
+    has_mx = Column(Boolean, default=False)
+    dns_records = Column(Text, nullable=True)  # JSON: {"spf": [...], "dmarc": [...], "mx": [...]}
+    score = Column(Float, nullable=True)
+    last_seen = Column(DateTime, default=datetime.utcnow, index=True)
+    refreshed_on = Column(DateTime, nullable=True, index=True)
+
+class GmailSyncState(Base):
+    __tablename__ = "gmail_sync_state"
+
+    account = Column(String, primary_key=True)
+    history_id = Column(String, nullable=False)
+    updated_on = Column(DateTime, default=datetime.utcnow)
+
+class AnalyzedEmail(Base):
+    __tablename__ = "analyzed_emails"
+
+    message_id = Column(String, primary_key=True, index=True)
+    result = Column(Text, nullable=False)  # JSON-encoded analyze_fetched_gmail() result
+    received_on = Column(DateTime, index=True)
+    analyzed_on = Column(DateTime, default=datetime.utcnow)
+
+class AnalysisCacheEntry(Base):
+    __tablename__ = "analysis_cache"
+
+    cache_key = Column(String, primary_key=True)  # sha256:analyzer_version:model_version
+    sha256 = Column(String, index=True, nullable=False)
+    result = Column(Text, nullable=False)  # JSON-encoded upload analysis
+    created_on = Column(DateTime, default=datetime.utcnow)
+    last_hit_on = Column(DateTime, nullable=True)
+    hits = Column(Integer, default=0)
+
+class ConversationState(Base):
+    __tablename__ = "conversation_state"
+
+    conversation_id = Column(String, primary_key=True)
+    state = Column(Text, nullable=False)  # JSON-encoded rolling risk state, see services/conversation_risk.py
+    updated_on = Column(DateTime, default=datetime.utcnow, index=True)
+
+class KnownImage(Base):
+    __tablename__ = "known_images"
+
+    id = Column(Integer, primary_key=True)
+    phash = Column(Integer, nullable=False)  # 64-bit hashes stored as signed SQLite integers
+    dhash = Column(Integer, nullable=False)
+    sha256 = Column(String, unique=True, index=True)
+    source = Column(String)
+    label = Column(String, index=True)  # e.g. "scam_profile"
+    added_on = Column(DateTime, default=datetime.utcnow)
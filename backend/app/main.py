@@ -2,6 +2,7 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from backend.app.routes import analyze
+from backend.app.services.metrics import MetricsMiddleware
 
 
 app = FastAPI()
@@ -22,4 +23,7 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Request counts and latencies by route, served at /metrics
+app.add_middleware(MetricsMiddleware)
+
 app.include_router(analyze.router)
@@ -1,180 +1,341 @@
 import asyncio
-from concurrent.futures import ProcessPoolExecutor
+import json
 import os
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, BackgroundTasks
+import unicodedata
+from urllib.parse import quote
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Request
+from fastapi.responses import StreamingResponse, JSONResponse, PlainTextResponse
 from pydantic import BaseModel
-from googleapiclient.discovery import build
-import base64
-import requests
 from sqlalchemy.orm import Session
 
-from backend.app.services.message_analyzer import analyze_message
+from backend.app.services.message_analyzer import analyze_message_async
+from backend.app.services.message_batcher import message_batcher
+from backend.app.services.conversation_risk import add_conversation_message, get_conversation, conversation_evictor, flush_conversations
 from backend.app.services.image_analyzer import analyze_image
-from backend.app.services.audio_analyzer import analyze_audio
+from backend.app.services.audio_analyzer import analyze_audio_upload, DecoderUnavailable
 from backend.app.services.video_analyzer import analyze_video
-from backend.app.services.gmail_reader import fetch_gmail_messages, fetch_gmail_raw_message
-from backend.app.analyzers.gmail_analyzer import get_gmail_authenticity, extract_links
-from backend.app.services.email_reader import extract_email_content, extract_msg_content_fast
+from backend.app.services.gmail_reader import fetch_gmail_messages, fetch_gmail_raw_message, iter_attachment_bytes
+from backend.app.analyzers.gmail_analyzer import extract_links
+from backend.app.services.email_reader import extract_email_content, EmailTooLarge
+from backend.app.services.upload_analysis import analyze_email_file
+from backend.app.services.upload_store import saved_upload, UploadTooLarge
 from backend.app.db.database import get_db ,engine, SessionLocal
 from backend.app.db.init_db import init_db, load_disposable_domains,load_alias_domains 
 from backend.app.db import models, schemas, crud
 from backend.app.analyzers.LinkScanner import scan_url_hybrid
 from backend.app.analyzers.gmail_analyzer1 import check_domain as comprehensive_check
+from backend.app.services.whois_service import shutdown_whois_executor
+from backend.app.services.domain_profiles import domain_profile_worker, flush_touched_domains
+from backend.app.services.gmail_sync import sync_gmail, iter_sync_gmail
+from backend.app.services.worker_pool import warm_cpu_pool, shutdown_cpu_pool
+from backend.app.services.model_registry import warm_models, model_status, models_ready, ModelUnavailable
+from backend.app.services.job_queue import get_job, job_counts, FINAL_STATUSES
+from backend.app.services.job_workers import start_job_workers, stop_job_workers, JOB_TYPES
+from backend.app.services.jobs import submit, submit_authenticity, submit_media, public_job, MEDIA_JOB_TYPES
+from backend.app.services.metrics import current_endpoint, render_metrics
 from backend.app.ML.url_classifier.training.db import insert_or_update_link, set_label_by_id, set_label_by_url, init_db_url_trainer
 from backend.app.ML.url_classifier.training.auto_label import auto_label_url, domain_of
 
 
 
-router = APIRouter()
-EXECUTOR = ProcessPoolExecutor(max_workers=os.cpu_count() or 2)
+async def label_endpoint(request: Request):
+    """Label stage metrics with the route template. Async so the label stays set for the handler."""
+    route = request.scope.get("route")
+    current_endpoint.set(getattr(route, "path", "unmatched"))
 
-# Store authenticity results
-authenticity_results = {}
+
+router = APIRouter(dependencies=[Depends(label_endpoint)])
+
+# Long-running tasks started with the app
+background_workers = []
 
 class MessageInput(BaseModel):
     message: str
 
 
+class JobInput(BaseModel):
+    type: str
+    payload: dict
+    priority: int = 0
+    retry: bool = False
+
+
 @router.get("/")
 def analyze_root():
     return {"message": "Welcome to HoneyBadger AI Analyzer! 🛡️"}
 
 
 @router.get("/analyze/gmail")
-async def analyze_gmail(max_results: int = 10):
+async def analyze_gmail(max_results: int = 10, incremental: bool = False):
+    """
+    Analyze the inbox. Messages analyzed before are served from storage;
+    with incremental=true only mail added since the last sync is fetched.
+    """
     try:
-        gmails = fetch_gmail_messages(max_results=max_results)
-        analyzed_gmails = []
-
-        for g in gmails:
-            links = extract_links(g["body_html"]) if g["body_html"] else []
-            
-            # Scan each link individually
-            scanned_links = []
-            for link in links:
-                url = link["url"]
-                domain = link.get("domain") or domain_of(url)
-                auto_label = auto_label_url(url)
-                # store link for training + counting
-                insert_or_update_link(url=url, domain=domain, source_email=g.get("id"), subject=g.get("metadata", {}).get("subject"), auto_label=auto_label)
-                scan_result = await scan_url_hybrid(link["url"])
-                scanned_link = link.copy()
-                scanned_link["scan_details"] = {
-                                                "ml_status": scan_result.get("ml_status"),
-                                                "ml_confidence": scan_result.get("ml_confidence"),
-                                                "gsb_status": scan_result.get("gsb_status"),
-                                                "gsb_details": scan_result.get("gsb_details", [])
-                                                }
-                
-                scanned_link["scan_status"] = scan_result.get("final_status", "unknown")
-                scanned_links.append(scanned_link)
-
-            # Initialize authenticity storage for this email
-            authenticity_results[g["id"]] = {
-                "status": "pending",  # Change from None to "pending"
-                "data": None
-            }
-
-            analyzed_gmails.append({
-                "id": g["id"],
-                "metadata": g["metadata"],
-                "body_html": g["body_html"],
-                "body_text": g["body_text"],
-                "attachments": g["attachments"],
-                "links": scanned_links,
-                "authenticity_ready": True  # Change this to True
-            })
-
-        return {"gmail_messages": analyzed_gmails}
+        return await sync_gmail(max_results=max_results, incremental=incremental)
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/analyze/gmail/stream")
+async def analyze_gmail_stream(max_results: int = 10, incremental: bool = False, format: str = "ndjson"):
+    """
+    Same analysis as /analyze/gmail, but each email is sent as soon as its links
+    are scored, as NDJSON lines or Server-Sent Events (format=sse). The
+    generator only advances when the client has consumed the previous chunk.
+    """
+    if format not in ("ndjson", "sse"):
+        raise HTTPException(status_code=400, detail="format must be 'ndjson' or 'sse'")
+
+    async def events():
+        try:
+            async for kind, item in iter_sync_gmail(max_results=max_results, incremental=incremental):
+                yield encode_stream_event(kind, item, format)
+        except Exception as e:
+            yield encode_stream_event("error", {"detail": str(e)}, format)
+
+    media_type = "text/event-stream" if format == "sse" else "application/x-ndjson"
+    return StreamingResponse(events(), media_type=media_type, headers={"Cache-Control": "no-cache"})
+
+
+def encode_stream_event(kind: str, item: dict, format: str) -> str:
+    if format == "sse":
+        return f"event: {kind}\ndata: {json.dumps(item, default=str)}\n\n"
+    return json.dumps({"type": kind, kind: item}, default=str) + "\n"
+
+def content_disposition(filename: str) -> str:
+    """
+    Attachment header that survives any filename: an ASCII fallback (accents
+    stripped, no quotes or line breaks) plus the exact name as RFC 5987 UTF-8.
+    """
+    filename = "".join(ch for ch in filename if ch not in "\r\n") or "attachment"
+    fallback = unicodedata.normalize("NFKD", filename).encode("ascii", "ignore").decode("ascii")
+    fallback = "".join(ch for ch in fallback if ch.isprintable() and ch not in '"\\').strip()
+    if not fallback or fallback.startswith("."):
+        # Nothing but the extension was ASCII
+        fallback = "attachment" + fallback
+    return f"attachment; filename=\"{fallback}\"; filename*=UTF-8''{quote(filename, safe='')}"
+
+
+@router.get("/analyze/gmail/{message_id}/attachments/{attachment_id}")
+async def download_gmail_attachment(message_id: str, attachment_id: str):
+    """Stream one attachment's bytes in chunks; analysis responses only carry its metadata."""
+    raw_email = await asyncio.to_thread(fetch_gmail_raw_message, message_id)
+    found = iter_attachment_bytes(raw_email, attachment_id)
+    if found is None:
+        raise HTTPException(status_code=404, detail="Attachment not found")
+
+    metadata, chunks = found
+    return StreamingResponse(
+        chunks,
+        media_type=metadata["mime_type"],
+        headers={"Content-Disposition": content_disposition(metadata["filename"] or "attachment")},
+    )
+
 @router.get("/analyze/gmail/{message_id}/authenticity")
-async def get_email_authenticity(message_id: str, background_tasks: BackgroundTasks):
-    """Get authenticity data for a specific email, processing if needed."""
-    if message_id not in authenticity_results:
-        return {"error": "Email not found"}
-    
-    # Check if we already have the result
-    if authenticity_results[message_id]["status"] == "completed":
-        return authenticity_results[message_id]["data"]
-    
-    # Check if already processing
-    if authenticity_results[message_id]["status"] == "processing":
-        return {"status": "processing"}
-    
-    # Start processing in background
-    authenticity_results[message_id]["status"] = "processing"
-    background_tasks.add_task(process_authenticity, message_id)
-    
-    return {"status": "processing"}
-
-
-async def process_authenticity(message_id: str):
-    """Process authenticity for a specific email."""
+async def get_email_authenticity(message_id: str, retry: bool = False):
+    """
+    Authenticity data for an email. The first call queues a job; later calls
+    find the same job, so this can be polled until the data comes back. Once
+    the job has failed its error is returned; retry=true queues a new check.
+    """
+    job = await submit_authenticity(message_id, retry=retry)
+    if job["status"] == "done":
+        return job["result"]
+    if job["status"] == "failed":
+        return {"error": job["error"], "job_id": job["id"]}
+    return {"status": "processing", "job_id": job["id"]}
+
+
+# ---------- JOBS ----------
+@router.post("/jobs")
+async def submit_job_route(input: JobInput):
+    """
+    Queue a job; an identical queued, running or finished job is returned
+    instead of a new one. A failed one too, unless retry is set.
+    """
+    spec = JOB_TYPES.get(input.type)
+    if spec is None or not spec["public"]:
+        raise HTTPException(status_code=400, detail=f"Unknown job type: {input.type}")
+    job, created = await submit(input.type, input.payload, input.priority, retry=input.retry)
+    return JSONResponse(status_code=202 if created else 200, content=public_job(job))
+
+
+@router.post("/jobs/media/{kind}")
+async def submit_media_job_route(kind: str, priority: int = 0, retry: bool = False, file: UploadFile = File(...)):
+    """Queue an image, audio or video upload for analysis instead of waiting on it."""
+    if kind not in MEDIA_JOB_TYPES:
+        raise HTTPException(status_code=400, detail=f"kind must be one of {', '.join(MEDIA_JOB_TYPES)}")
     try:
-        raw_email_bytes = fetch_gmail_raw_message(message_id)
-        authenticity = await get_gmail_authenticity(raw_email_bytes)
-        authenticity_results[message_id] = {
-            "status": "completed",
-            "data": authenticity
-        }
-    except Exception as e:
-        authenticity_results[message_id] = {
-            "status": "error",
-            "data": {"error": str(e)}
-        }
+        job = await submit_media(file, kind, priority, retry)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    return JSONResponse(status_code=202, content=public_job(job))
+
+
+@router.get("/jobs")
+def job_counts_route():
+    """Job counts by type and status."""
+    return job_counts()
+
+
+@router.get("/jobs/{job_id}")
+async def get_job_route(job_id: int):
+    job = await asyncio.to_thread(get_job, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return public_job(job)
+
+
+@router.get("/jobs/{job_id}/stream")
+async def stream_job_route(job_id: int, format: str = "ndjson", interval: float = 0.5):
+    """
+    Send the job every time its status or attempt count changes, ending with
+    its final state, as NDJSON lines or Server-Sent Events (format=sse).
+    """
+    if format not in ("ndjson", "sse"):
+        raise HTTPException(status_code=400, detail="format must be 'ndjson' or 'sse'")
+    job = await asyncio.to_thread(get_job, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    interval = min(max(interval, 0.1), 10.0)
+
+    async def events():
+        current = job
+        last = None
+        while True:
+            state = (current["status"], current["attempts"])
+            if state != last:
+                last = state
+                yield encode_stream_event("job", public_job(current), format)
+            if current["status"] in FINAL_STATUSES:
+                return
+            await asyncio.sleep(interval)
+            current = await asyncio.to_thread(get_job, job_id)
+            if current is None:
+                yield encode_stream_event("error", {"detail": "Job not found"}, format)
+                return
+
+    media_type = "text/event-stream" if format == "sse" else "application/x-ndjson"
+    return StreamingResponse(events(), media_type=media_type, headers={"Cache-Control": "no-cache"})
+
+
+@router.get("/healthz")
+def healthz():
+    """Liveness: the process is up. Also reports each model's load state and time."""
+    return {"status": "ok", "models": model_status()}
+
+
+@router.get("/metrics")
+def metrics():
+    """Counters and latency histograms of this process, in Prometheus text format."""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
+@router.get("/readyz")
+def readyz():
+    """Readiness: 200 once every warm-up model (MODEL_WARMUP) has loaded or failed, 503 before."""
+    ready = models_ready()
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={"status": "ready" if ready else "loading", "models": model_status()},
+    )
 
 
 @router.post("/analyze/message")
-def analyze_message_route(input: MessageInput):
-    score = analyze_message(input.message)
+async def analyze_message_route(input: MessageInput):
+    try:
+        score = await analyze_message_async(input.message)
+    except ModelUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
     return {"risk_score": score}
 
 
+@router.post("/conversations/{conversation_id}/messages")
+async def add_conversation_message_route(conversation_id: str, input: MessageInput):
+    """Score a new message and update the conversation's rolling risk."""
+    try:
+        return await add_conversation_message(conversation_id, input.message)
+    except ModelUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+
+@router.get("/conversations/{conversation_id}")
+async def get_conversation_route(conversation_id: str):
+    conversation = await get_conversation(conversation_id)
+    if conversation is None:
+        raise HTTPException(status_code=404, detail="Conversation not found")
+    return conversation
+
+
 @router.post("/analyze/email")
 async def analyze_email_upload(file: UploadFile = File(...)):
-    content = await file.read()
-
-    if file.filename.lower().endswith(".msg"):
-        parsed = extract_msg_content_fast(content)
-    else:
-        parsed = extract_email_content(content)
+    try:
+        parsed = await analyze_email_file(file)
+    except EmailTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
 
     return parsed
 
 
 @router.post("/analyze/image")
 async def analyze_image_route(file: UploadFile = File(...)):
-    file_path = f"temp/{file.filename}"
-    with open(file_path, "wb") as f:
-        f.write(await file.read())
-    score = analyze_image(file_path)
-    return {"risk_score": score}
+    return await analyze_media_upload(file, "image", analyze_image)
 
 
 @router.post("/analyze/audio")
 async def analyze_audio_route(file: UploadFile = File(...)):
-    file_path = f"temp/{file.filename}"
-    with open(file_path, "wb") as f:
-        f.write(await file.read())
-    score = analyze_audio(file_path)
-    return {"risk_score": score}
+    """Audio is decoded and scored while the upload is still arriving."""
+    try:
+        return await analyze_audio_upload(file)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except DecoderUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
 
 
 @router.post("/analyze/video")
 async def analyze_video_route(file: UploadFile = File(...)):
-    file_path = f"temp/{file.filename}"
-    with open(file_path, "wb") as f:
-        f.write(await file.read())
-    score = analyze_video(file_path)
-    return {"risk_score": score}
+    return await analyze_media_upload(file, "video", analyze_video)
+
+
+async def analyze_media_upload(file: UploadFile, kind: str, analyze):
+    """Stream the upload to a unique temp file, analyze it off the event loop, then delete it."""
+    try:
+        async with saved_upload(file, kind) as upload:
+            result = await asyncio.to_thread(analyze, upload.path)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except ValueError as e:
+        # The file could not be decoded (e.g. "Could not open video"): the client's fault, not ours
+        raise HTTPException(status_code=400, detail=str(e))
+    except ModelUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return result if isinstance(result, dict) else {"risk_score": result}
 
 @router.on_event("startup")
-def on_startup():
+async def on_startup():
     init_db()
     init_db_url_trainer()
+    await asyncio.to_thread(warm_cpu_pool)
+    background_workers.append(asyncio.create_task(domain_profile_worker()))
+    background_workers.append(asyncio.create_task(conversation_evictor()))
+    background_workers.extend(start_job_workers())
+    # Models load in the background; /readyz reports when they are done
+    background_workers.append(asyncio.create_task(asyncio.to_thread(warm_models)))
+
+@router.on_event("shutdown")
+async def on_shutdown():
+    for task in background_workers:
+        task.cancel()
+    await message_batcher.stop()
+    stop_job_workers()
+    flush_conversations()
+    await flush_touched_domains()
+    shutdown_whois_executor()
+    shutdown_cpu_pool()
 
 @router.get("/load-domains")
 def load_domains():
@@ -183,11 +344,11 @@ def load_domains():
     return {"message": "Domains loaded successfully!"}
 
 @router.get("/check-domain/{email}")
-def check_domain(email: str, db: Session = Depends(get_db)):
+async def check_domain(email: str, db: Session = Depends(get_db)):
     """
     Comprehensive domain analysis including disposable check, alias check, and WHOIS information
     """
-    result = comprehensive_check(email, db)
+    result = await comprehensive_check(email, db)
     return result
 
 
@@ -0,0 +1,57 @@
+# backend/app/services/analysis_cache.py
+import json
+import os
+from datetime import datetime
+
+from backend.app.db.database import SessionLocal
+from backend.app.db.models import AnalysisCacheEntry
+from backend.app.analyzers.LinkScanner import URL_MODEL_PATH
+from backend.app.ML.url_classifier.training.predict import MODEL_PATH as URL_CLASSIFIER_PATH
+
+# Bump whenever parsing, link extraction or scanning changes what an analysis contains
+ANALYZER_VERSION = "2"
+
+
+def model_version() -> str:
+    """Identify the URL models on disk by size and mtime, so retraining invalidates the cache."""
+    parts = []
+    for path in (URL_MODEL_PATH, URL_CLASSIFIER_PATH):
+        try:
+            stat = os.stat(path)
+            parts.append(f"{stat.st_size}-{int(stat.st_mtime)}")
+        except OSError:
+            parts.append("missing")
+    return "_".join(parts)
+
+
+def cache_key(sha256: str) -> str:
+    return f"{sha256}:{ANALYZER_VERSION}:{model_version()}"
+
+
+def get_cached_analysis(sha256: str):
+    db = SessionLocal()
+    try:
+        entry = db.query(AnalysisCacheEntry).filter_by(cache_key=cache_key(sha256)).first()
+        if entry is None:
+            return None
+        entry.hits = (entry.hits or 0) + 1
+        entry.last_hit_on = datetime.utcnow()
+        db.commit()
+        return json.loads(entry.result)
+    finally:
+        db.close()
+
+
+def put_cached_analysis(sha256: str, result: dict):
+    db = SessionLocal()
+    try:
+        db.merge(AnalysisCacheEntry(
+            cache_key=cache_key(sha256),
+            sha256=sha256,
+            result=json.dumps(result, default=str),
+            created_on=datetime.utcnow(),
+            hits=0,
+        ))
+        db.commit()
+    finally:
+        db.close()
@@ -0,0 +1,105 @@
+# backend/app/services/attachment_store.py
+import hashlib
+import os
+import tempfile
+import threading
+
+# Content-addressed on-disk store: <dir>/<sha256[:2]>/<sha256>
+ATTACHMENT_STORE_DIR = os.getenv("ATTACHMENT_STORE_DIR", "attachment_store")
+ATTACHMENT_STORE_MAX_BYTES = int(os.getenv("ATTACHMENT_STORE_MAX_BYTES", str(1024 * 1024 * 1024)))
+# Eviction trims the store to this fraction of the limit, so it runs rarely
+ATTACHMENT_STORE_LOW_WATER = 0.9
+
+_evict_lock = threading.Lock()
+# Bytes in the store as far as this process knows: measured by the last full
+# scan plus what this process has added since. None until the first put.
+_store_bytes = None
+
+
+def blob_path(sha256: str) -> str:
+    return os.path.join(ATTACHMENT_STORE_DIR, sha256[:2], sha256)
+
+
+def put_chunks(chunks) -> tuple[str, int]:
+    """
+    Store a stream of bytes, hashing while writing. Identical content is kept
+    once: if the blob already exists the new copy is dropped.
+    Returns (sha256, size).
+    """
+    os.makedirs(ATTACHMENT_STORE_DIR, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+    fd, tmp_path = tempfile.mkstemp(dir=ATTACHMENT_STORE_DIR, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as tmp:
+            for chunk in chunks:
+                digest.update(chunk)
+                size += len(chunk)
+                tmp.write(chunk)
+        sha256 = digest.hexdigest()
+        path = blob_path(sha256)
+        if os.path.exists(path):
+            os.utime(path)  # refresh its LRU position
+            os.remove(tmp_path)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(tmp_path, path)
+            record_added(size)
+        return sha256, size
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def put_bytes(data: bytes) -> tuple[str, int]:
+    return put_chunks([data])
+
+
+def record_added(size: int):
+    """
+    Count a new blob against the running total; the store is only walked when
+    the total passes ATTACHMENT_STORE_MAX_BYTES (or on the first put). Other
+    processes' additions are picked up by that walk.
+    """
+    global _store_bytes
+    with _evict_lock:
+        if _store_bytes is not None:
+            _store_bytes += size
+            if _store_bytes <= ATTACHMENT_STORE_MAX_BYTES:
+                return
+    evict_if_needed()
+
+
+def evict_if_needed():
+    """
+    Measure the store and, if it is over ATTACHMENT_STORE_MAX_BYTES, delete least
+    recently used blobs until it is under the low-water mark.
+    """
+    global _store_bytes
+    with _evict_lock:
+        blobs = []
+        total = 0
+        for root, _, names in os.walk(ATTACHMENT_STORE_DIR):
+            for name in names:
+                if name.endswith(".tmp"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                blobs.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+
+        if total > ATTACHMENT_STORE_MAX_BYTES:
+            target = ATTACHMENT_STORE_MAX_BYTES * ATTACHMENT_STORE_LOW_WATER
+            for _, size, path in sorted(blobs):
+                if total <= target:
+                    break
+                try:
+                    os.remove(path)
+                    total -= size
+                except FileNotFoundError:
+                    pass
+        _store_bytes = total
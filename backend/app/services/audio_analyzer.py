@@ -1,4 +1,353 @@
-def analyze_audio(audio_path: str) -> float:
-    # Dummy logic for audio analysis
-    print(f"Analyzing audio at {audio_path}")
-    return 0.6  # Medium risk
+# backend/app/services/audio_analyzer.py
+import asyncio
+import os
+import shutil
+import subprocess
+import threading
+import wave
+
+import numpy as np
+
+from backend.app.analyzers.perceptual_hash import dct_matrix
+from backend.app.services.upload_store import saved_upload, UploadTooLarge, UPLOAD_LIMITS, UPLOAD_CHUNK_SIZE
+
+SAMPLE_RATE = 16000
+FRAME_SAMPLES = 400   # 25 ms
+HOP_SAMPLES = 160     # 10 ms
+N_FFT = 512
+N_MELS = 40
+N_MFCC = 13
+# Samples read per block; memory stays at one block plus one partial frame
+AUDIO_BLOCK_SAMPLES = int(os.getenv("AUDIO_BLOCK_SAMPLES", str(SAMPLE_RATE * 4)))
+# Frames are summarized and scored per segment of this length
+AUDIO_SEGMENT_SECONDS = float(os.getenv("AUDIO_SEGMENT_SECONDS", "5"))
+# Optional joblib classifier over segment features (see segment_vector); without it every
+# segment gets AUDIO_DEFAULT_RISK, the value the analyzer returned before it had features
+AUDIO_MODEL_PATH = os.getenv("AUDIO_MODEL_PATH", "backend/app/ML/audio/segment_model.pkl")
+AUDIO_DEFAULT_RISK = 0.6
+# A frame counts as voiced if it is within this many dB of the loudest frame up to
+# and including it, and louder than VOICED_FLOOR_DBFS. Both tests look only at
+# earlier frames, so the result does not depend on how the audio was split into blocks.
+VOICED_DB_BELOW_PEAK = 25.0
+VOICED_FLOOR_DBFS = -50.0
+
+
+def mel_filterbank(n_mels=N_MELS, n_fft=N_FFT, sample_rate=SAMPLE_RATE):
+    """Triangular HTK-style mel filters: (n_mels, n_fft // 2 + 1)."""
+    def to_mel(hz):
+        return 2595.0 * np.log10(1.0 + hz / 700.0)
+
+    def to_hz(mel):
+        return 700.0 * (10 ** (mel / 2595.0) - 1.0)
+
+    edges = to_hz(np.linspace(to_mel(0.0), to_mel(sample_rate / 2), n_mels + 2))
+    bins = np.fft.rfftfreq(n_fft, 1.0 / sample_rate)
+    lower, center, upper = edges[:-2, None], edges[1:-1, None], edges[2:, None]
+    rising = (bins - lower) / (center - lower)
+    falling = (upper - bins) / (upper - center)
+    return np.maximum(0.0, np.minimum(rising, falling))
+
+
+MEL_FILTERS = mel_filterbank()
+MFCC_DCT = dct_matrix(N_MELS)[:N_MFCC]
+WINDOW = np.hanning(FRAME_SAMPLES)
+
+
+def frame_energy_db(power):
+    return 10 * np.log10(power.sum(axis=-1) + 1e-10)
+
+
+# Frame energy of a full-scale 1 kHz sine, the 0 dBFS reference for VOICED_FLOOR_DBFS
+FULL_SCALE_DB = float(frame_energy_db(
+    np.abs(np.fft.rfft(np.sin(2 * np.pi * 1000 * np.arange(FRAME_SAMPLES) / SAMPLE_RATE) * WINDOW, n=N_FFT)) ** 2 / N_FFT
+))
+VOICED_FLOOR_DB = FULL_SCALE_DB + VOICED_FLOOR_DBFS
+
+
+class StreamingAudioFeatures:
+    """
+    Log-mel / MFCC features computed block by block. Frames overlap across
+    blocks: the samples after the last full hop are carried into the next
+    block. Frame features are folded into per-segment sums; each finished
+    segment is scored and folded into a running aggregate, so nothing grows
+    with the length of the audio.
+    """
+
+    def __init__(self, score_segment, segment_seconds=AUDIO_SEGMENT_SECONDS):
+        self.score_segment = score_segment
+        self.frames_per_segment = max(1, int(segment_seconds * SAMPLE_RATE / HOP_SAMPLES))
+        self.carry = np.zeros(0, dtype=np.float32)
+        self.samples = 0
+        self.peak_db = -np.inf
+        self._reset_segment()
+        # Running aggregate over segments
+        self.segments = 0
+        self.score_sum = 0.0
+        self.max_score = None
+        self.max_segment_start = None
+        self.voiced_frames = 0
+        self.total_frames = 0
+
+    def _reset_segment(self):
+        self.seg_frames = 0
+        self.seg_voiced = 0
+        self.seg_mfcc = np.zeros(N_MFCC)
+        self.seg_mfcc_sq = np.zeros(N_MFCC)
+        self.seg_energy = 0.0
+        self.seg_flatness = 0.0
+
+    def feed(self, samples):
+        """Add float32 mono samples in [-1, 1] at SAMPLE_RATE."""
+        self.samples += len(samples)
+        buffer = np.concatenate([self.carry, samples]) if len(self.carry) else np.asarray(samples, dtype=np.float32)
+        if len(buffer) < FRAME_SAMPLES:
+            self.carry = buffer
+            return
+        frame_count = 1 + (len(buffer) - FRAME_SAMPLES) // HOP_SAMPLES
+        frames = np.lib.stride_tricks.sliding_window_view(buffer, FRAME_SAMPLES)[::HOP_SAMPLES][:frame_count]
+        self.carry = buffer[frame_count * HOP_SAMPLES:].copy()
+
+        power = np.abs(np.fft.rfft(frames * WINDOW, n=N_FFT)) ** 2 / N_FFT
+        log_mel = np.log(power @ MEL_FILTERS.T + 1e-10)
+        mfcc = log_mel @ MFCC_DCT.T
+        energy_db = frame_energy_db(power)
+        flatness = np.exp(np.log(power + 1e-10).mean(axis=1)) / (power.mean(axis=1) + 1e-10)
+        # Loudest frame up to and including each frame
+        peak_db = np.maximum.accumulate(np.maximum(energy_db, self.peak_db))
+        self.peak_db = float(peak_db[-1])
+        voiced = (energy_db > peak_db - VOICED_DB_BELOW_PEAK) & (energy_db > VOICED_FLOOR_DB)
+
+        # Fold frames into segments, closing a segment whenever it is full
+        start = 0
+        while start < frame_count:
+            take = min(frame_count - start, self.frames_per_segment - self.seg_frames)
+            part = slice(start, start + take)
+            self.seg_voiced += int(voiced[part].sum())
+            self.seg_mfcc += mfcc[part].sum(axis=0)
+            self.seg_mfcc_sq += (mfcc[part] ** 2).sum(axis=0)
+            self.seg_energy += float(energy_db[part].sum())
+            self.seg_flatness += float(flatness[part].sum())
+            self.seg_frames += take
+            start += take
+            if self.seg_frames == self.frames_per_segment:
+                self._close_segment()
+
+    def _close_segment(self):
+        if not self.seg_frames:
+            return
+        n = self.seg_frames
+        mean = self.seg_mfcc / n
+        summary = {
+            "start": round(self.segments * self.frames_per_segment * HOP_SAMPLES / SAMPLE_RATE, 2),
+            "voiced_ratio": self.seg_voiced / n,
+            "energy_db": self.seg_energy / n,
+            "flatness": self.seg_flatness / n,
+            "mfcc_mean": mean,
+            "mfcc_std": np.sqrt(np.maximum(self.seg_mfcc_sq / n - mean ** 2, 0.0)),
+        }
+        score = float(self.score_segment(summary))
+        self.segments += 1
+        self.score_sum += score
+        if self.max_score is None or score > self.max_score:
+            self.max_score, self.max_segment_start = score, summary["start"]
+        self.voiced_frames += self.seg_voiced
+        self.total_frames += n
+        self._reset_segment()
+
+    def finish(self) -> dict:
+        self._close_segment()
+        return {
+            "risk_score": round(self.score_sum / self.segments, 3) if self.segments else AUDIO_DEFAULT_RISK,
+            "max_segment_score": None if self.max_score is None else round(self.max_score, 3),
+            "max_segment_start": self.max_segment_start,
+            "segments": self.segments,
+            "duration_seconds": round(self.samples / SAMPLE_RATE, 2),
+            "voiced_ratio": round(self.voiced_frames / self.total_frames, 3) if self.total_frames else 0.0,
+        }
+
+
+# ---------- SEGMENT SCORING ----------
+_segment_model = None
+_segment_model_lock = threading.Lock()
+
+
+def segment_vector(summary):
+    return np.concatenate([[summary["voiced_ratio"], summary["energy_db"], summary["flatness"]],
+                           summary["mfcc_mean"], summary["mfcc_std"]])
+
+
+def load_segment_model():
+    """The optional segment classifier, or None when no model file is deployed."""
+    global _segment_model
+    with _segment_model_lock:
+        if _segment_model is None:
+            if os.path.exists(AUDIO_MODEL_PATH):
+                import joblib
+                _segment_model = joblib.load(AUDIO_MODEL_PATH)
+            else:
+                _segment_model = False
+    return _segment_model or None
+
+
+def score_segment(summary) -> float:
+    model = load_segment_model()
+    if model is None or summary["voiced_ratio"] == 0:
+        return AUDIO_DEFAULT_RISK
+    return float(model.predict_proba(segment_vector(summary)[None, :])[0][1])
+
+
+# ---------- DECODING ----------
+def pcm16_to_float(data: bytes, channels=1):
+    samples = np.frombuffer(data, dtype="<i2").astype(np.float32) / 32768.0
+    if channels > 1:
+        samples = samples[: len(samples) // channels * channels].reshape(-1, channels).mean(axis=1)
+    return samples
+
+
+def open_wav(path):
+    """A reader for 16-bit PCM WAV at SAMPLE_RATE, or None for anything else."""
+    try:
+        wav = wave.open(path, "rb")
+    except (wave.Error, EOFError):
+        return None
+    if wav.getsampwidth() != 2 or wav.getframerate() != SAMPLE_RATE:
+        wav.close()
+        return None
+    return wav
+
+
+def iter_wav_blocks(wav, block_samples=AUDIO_BLOCK_SAMPLES):
+    """Mono float blocks, read block by block."""
+    with wav:
+        channels = wav.getnchannels()
+        while data := wav.readframes(block_samples):
+            yield pcm16_to_float(data, channels)
+
+
+class DecoderUnavailable(RuntimeError):
+    """The upload needs ffmpeg to decode and it is not installed: a server problem, not a bad file."""
+
+
+def ffmpeg_command(source="pipe:0"):
+    """Decode any format ffmpeg knows to mono 16 kHz s16le on stdout."""
+    if shutil.which("ffmpeg") is None:
+        raise DecoderUnavailable("ffmpeg is required to decode this audio format")
+    command = ["ffmpeg", "-hide_banner", "-loglevel", "error"]
+    if source != "pipe:0":
+        command.append("-nostdin")
+    return command + ["-i", source, "-f", "s16le", "-ac", "1", "-ar", str(SAMPLE_RATE), "pipe:1"]
+
+
+def iter_ffmpeg_blocks(process, block_samples=AUDIO_BLOCK_SAMPLES):
+    """Mono float blocks from ffmpeg's s16le output."""
+    block_bytes = block_samples * 2
+    while data := process.stdout.read(block_bytes):
+        if len(data) % 2:
+            data += process.stdout.read(1)
+        yield pcm16_to_float(data)
+
+
+def iter_audio_blocks(path):
+    wav = open_wav(path)
+    if wav is not None:
+        yield from iter_wav_blocks(wav)
+        return
+    process = subprocess.Popen(ffmpeg_command(path), stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    try:
+        yield from iter_ffmpeg_blocks(process)
+    finally:
+        process.kill()
+        process.wait()
+
+
+def analyze_audio(audio_path: str) -> dict:
+    features = StreamingAudioFeatures(score_segment)
+    for block in iter_audio_blocks(audio_path):
+        features.feed(block)
+    return features.finish()
+
+
+class AudioStreamAnalyzer:
+    """
+    Analyze audio while it is still being uploaded: bytes written here go to
+    ffmpeg's stdin and a reader thread feeds the decoded PCM into the features.
+    """
+
+    def __init__(self):
+        self.features = StreamingAudioFeatures(score_segment)
+        self.process = subprocess.Popen(ffmpeg_command(), stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                         stderr=subprocess.DEVNULL)
+        self.error = None
+        self.reader = threading.Thread(target=self._read, name="audio-stream", daemon=True)
+        self.reader.start()
+
+    def _read(self):
+        try:
+            for block in iter_ffmpeg_blocks(self.process):
+                self.features.feed(block)
+        except Exception as e:
+            self.error = e
+            # Nobody drains stdout any more: stop ffmpeg so write() fails instead of blocking
+            self.process.kill()
+
+    def write(self, chunk: bytes):
+        if self.error is not None:
+            raise self.error
+        try:
+            self.process.stdin.write(chunk)
+        except (BrokenPipeError, ValueError):
+            raise self.error or ValueError("Could not decode audio")
+
+    def finish(self) -> dict:
+        try:
+            self.process.stdin.close()
+        except BrokenPipeError:
+            pass  # ffmpeg already exited; the reader's error or the sample count says why
+        self.reader.join()
+        self.process.wait()
+        if self.error is not None:
+            raise self.error
+        if self.features.samples == 0:
+            raise ValueError("Could not decode audio")
+        return self.features.finish()
+
+    def abort(self):
+        self.process.kill()
+        self.reader.join()
+        self.process.wait()
+
+
+def needs_seekable_input(head: bytes) -> bool:
+    """
+    MP4-family files (m4a, mp4, 3gp, mov: phone voice notes) often keep their
+    index ("moov" atom) at the end, which ffmpeg cannot reach through a pipe.
+    """
+    return head[4:8] == b"ftyp"
+
+
+async def analyze_audio_upload(file) -> dict:
+    """
+    Analyze an UploadFile while it streams in, so work overlaps the upload.
+    Without ffmpeg, or for MP4-family containers, the upload is spooled to
+    disk first and decoded from the file.
+    """
+    head = await file.read(UPLOAD_CHUNK_SIZE)
+    if shutil.which("ffmpeg") is None or needs_seekable_input(head):
+        await file.seek(0)
+        async with saved_upload(file, "audio") as upload:
+            return await asyncio.to_thread(analyze_audio, upload.path)
+
+    analyzer = await asyncio.to_thread(AudioStreamAnalyzer)
+    size = 0
+    chunk = head
+    try:
+        while chunk:
+            size += len(chunk)
+            if size > UPLOAD_LIMITS["audio"]:
+                raise UploadTooLarge(f"Audio upload is larger than {UPLOAD_LIMITS['audio']} bytes")
+            await asyncio.to_thread(analyzer.write, chunk)
+            chunk = await file.read(UPLOAD_CHUNK_SIZE)
+    except BaseException:
+        await asyncio.to_thread(analyzer.abort)
+        raise
+    return await asyncio.to_thread(analyzer.finish)
@@ -0,0 +1,211 @@
+# backend/app/services/conversation_risk.py
+import asyncio
+import json
+import math
+import os
+import time
+from collections import OrderedDict, deque
+from datetime import datetime
+
+from backend.app.db.database import SessionLocal
+from backend.app.db.models import ConversationState
+from backend.app.services.message_analyzer import analyze_message_async, MESSAGE_RISK_LABEL
+
+# Per-message decay of the lexicon counters: older messages weigh less
+CONVERSATION_DECAY = float(os.getenv("CONVERSATION_DECAY", "0.9"))
+# Recent per-message scores kept for trend features
+CONVERSATION_WINDOW = int(os.getenv("CONVERSATION_WINDOW", "20"))
+# Conversations idle this long are written to the database and dropped from memory
+CONVERSATION_IDLE_SECONDS = int(os.getenv("CONVERSATION_IDLE_SECONDS", "900"))
+CONVERSATION_MAX_ACTIVE = int(os.getenv("CONVERSATION_MAX_ACTIVE", "10000"))
+CONVERSATION_EVICT_INTERVAL = int(os.getenv("CONVERSATION_EVICT_INTERVAL", "60"))
+
+# Typical honeytrap progression; reaching later stages raises the risk
+ESCALATION_STAGES = {
+    "trust_building": 1,
+    "isolation": 2,
+    "meeting_request": 3,
+    "explicit_request": 3,
+    "financial": 4,
+    "sextortion": 4,
+}
+MAX_STAGE = max(ESCALATION_STAGES.values())
+
+# conversation id -> state, ordered by last message (oldest first). Reads do not
+# reorder it, so idle eviction and the CONVERSATION_MAX_ACTIVE cap agree on "recent".
+_active = OrderedDict()
+# States being written to the database; still served from here until the write is done
+_evicting = {}
+
+
+def new_state():
+    return {
+        "messages": 0,
+        "first_seen": time.time(),
+        "last_seen": time.time(),
+        "classifier_ema": 0.0,
+        "lexicon": {},          # category -> decayed weighted hits
+        "peak_stage": 0,
+        "stages_in_order": True,
+        "flagged_messages": 0,
+        "recent_scores": [],
+        "risk": 0.0,
+    }
+
+
+def message_risk(result: dict) -> float:
+    """Probability of the risky class from a {"label", "score"} classifier result."""
+    return result["score"] if result["label"] == MESSAGE_RISK_LABEL else 1.0 - result["score"]
+
+
+def conversation_risk(state: dict) -> float:
+    """Blend of decayed lexicon pressure, classifier trend and escalation, in [0, 1]."""
+    pressure = 1.0 - math.exp(-sum(state["lexicon"].values()) / 3.0)
+    escalation = state["peak_stage"] / MAX_STAGE
+    if state["peak_stage"] >= 3 and state["stages_in_order"]:
+        escalation = min(1.0, escalation + 0.25)
+    return round(0.5 * pressure + 0.3 * state["classifier_ema"] + 0.2 * escalation, 4)
+
+
+def update_state(state: dict, analysis: dict) -> dict:
+    """Fold one analyzed message into the state: constant work, no model calls."""
+    score = message_risk(analysis)
+    state["messages"] += 1
+    state["last_seen"] = time.time()
+
+    alpha = 2.0 / (CONVERSATION_WINDOW + 1)
+    state["classifier_ema"] = score if state["messages"] == 1 else (1 - alpha) * state["classifier_ema"] + alpha * score
+
+    lexicon = state["lexicon"]
+    for category in list(lexicon):
+        lexicon[category] *= CONVERSATION_DECAY
+        if lexicon[category] < 0.01:
+            del lexicon[category]
+    for category, stats in analysis["lexicon"]["categories"].items():
+        lexicon[category] = lexicon.get(category, 0.0) + stats["score"]
+        stage = ESCALATION_STAGES.get(category, 0)
+        if stage and stage < state["peak_stage"] - 1:
+            state["stages_in_order"] = False
+        state["peak_stage"] = max(state["peak_stage"], stage)
+
+    if analysis["honeytrap_risk"]:
+        state["flagged_messages"] += 1
+    recent = deque(state["recent_scores"], maxlen=CONVERSATION_WINDOW)
+    recent.append(round(score, 4))
+    state["recent_scores"] = list(recent)
+    state["risk"] = conversation_risk(state)
+    return state
+
+
+# ---------- STATE STORAGE ----------
+def cached_state(conversation_id: str):
+    """State held in memory (active, or being written out), else None."""
+    state = _active.get(conversation_id)
+    return state if state is not None else _evicting.get(conversation_id)
+
+
+def stored_state(conversation_id: str):
+    """State from the database (after eviction), else None."""
+    db = SessionLocal()
+    try:
+        row = db.query(ConversationState).filter_by(conversation_id=conversation_id).first()
+    finally:
+        db.close()
+    return json.loads(row.state) if row is not None else None
+
+
+def mark_active(conversation_id: str, state: dict):
+    """Keep a state that just received a message in memory, as the most recent one."""
+    _active[conversation_id] = state
+    _active.move_to_end(conversation_id)
+
+
+def save_states(encoded: dict):
+    """Upsert {conversation id: JSON state} rows."""
+    if not encoded:
+        return
+    db = SessionLocal()
+    try:
+        for conversation_id, state_json in encoded.items():
+            db.merge(ConversationState(conversation_id=conversation_id, state=state_json,
+                                       updated_on=datetime.utcnow()))
+        db.commit()
+    finally:
+        db.close()
+
+
+def take_idle(idle_seconds=CONVERSATION_IDLE_SECONDS, max_active=CONVERSATION_MAX_ACTIVE):
+    """
+    Remove idle conversations (no message for idle_seconds) from memory and
+    return them; over the cap, the ones with the oldest last message go too.
+    """
+    cutoff = time.time() - idle_seconds
+    taken = {}
+    for conversation_id, state in list(_active.items()):
+        if state["last_seen"] >= cutoff and len(_active) <= max_active:
+            break
+        taken[conversation_id] = _active.pop(conversation_id)
+    return taken
+
+
+async def evict_idle():
+    """Write idle conversations to the database. States are serialized on the event loop,
+    so the write in the thread never sees a state that is being updated."""
+    taken = take_idle()
+    if not taken:
+        return 0
+    _evicting.update(taken)
+    try:
+        await asyncio.to_thread(save_states, {cid: json.dumps(state) for cid, state in taken.items()})
+    finally:
+        for conversation_id, state in taken.items():
+            if _evicting.get(conversation_id) is state:
+                del _evicting[conversation_id]
+    return len(taken)
+
+
+def flush_conversations():
+    """Persist every in-memory conversation, e.g. at shutdown."""
+    save_states({cid: json.dumps(state) for cid, state in _active.items()})
+
+
+async def conversation_evictor():
+    """Background loop that moves idle conversations out of memory."""
+    while True:
+        await asyncio.sleep(CONVERSATION_EVICT_INTERVAL)
+        try:
+            await evict_idle()
+        except Exception as e:
+            print(f"❌ Failed to evict idle conversations: {e}")
+
+
+# ---------- API ----------
+def state_summary(conversation_id: str, state: dict) -> dict:
+    return {
+        "conversation_id": conversation_id,
+        "risk": state["risk"],
+        "messages": state["messages"],
+        "flagged_messages": state["flagged_messages"],
+        "peak_stage": state["peak_stage"],
+        "lexicon": {category: round(value, 3) for category, value in state["lexicon"].items()},
+        "classifier_ema": round(state["classifier_ema"], 4),
+        "recent_scores": state["recent_scores"],
+    }
+
+
+async def add_conversation_message(conversation_id: str, message: str) -> dict:
+    """Score one new message (one classifier call) and update its conversation's risk."""
+    analysis = await analyze_message_async(message)
+    # No await between loading and updating, so concurrent messages cannot interleave here
+    state = cached_state(conversation_id) or stored_state(conversation_id) or new_state()
+    update_state(state, analysis)
+    mark_active(conversation_id, state)
+    return {"message": analysis, "conversation": state_summary(conversation_id, state)}
+
+
+async def get_conversation(conversation_id: str):
+    """Read-only: does not bring an evicted conversation back into memory or count as activity."""
+    state = cached_state(conversation_id)
+    if state is None:
+        state = await asyncio.to_thread(stored_state, conversation_id)
+    return state_summary(conversation_id, state) if state is not None else None
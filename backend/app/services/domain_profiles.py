@@ -0,0 +1,252 @@
+# backend/app/services/domain_profiles.py
+import asyncio
+import json
+import os
+from datetime import datetime, timedelta
+
+from backend.app.db.database import SessionLocal
+from backend.app.db.models import DomainProfile
+from backend.app.db import crud
+from backend.app.analyzers.gmail_analyzer import dns_lookup, has_valid_spf, get_dmarc_policy
+from backend.app.services.whois_service import lookup_whois
+
+PROFILE_TTL = timedelta(hours=int(os.getenv("DOMAIN_PROFILE_TTL_HOURS", "24")))
+# A profile with a failed DNS lookup is only trusted this long, then refreshed again
+PROFILE_RETRY_TTL = timedelta(minutes=int(os.getenv("DOMAIN_PROFILE_RETRY_MINUTES", "5")))
+REFRESH_BATCH_SIZE = int(os.getenv("DOMAIN_PROFILE_BATCH_SIZE", "20"))
+REFRESH_INTERVAL = float(os.getenv("DOMAIN_PROFILE_REFRESH_INTERVAL", "30"))
+# First pause after a failed refresh round, doubled per failing round up to REFRESH_INTERVAL
+REFRESH_ERROR_BACKOFF = float(os.getenv("DOMAIN_PROFILE_ERROR_BACKOFF", "1"))
+
+# Domains seen since the worker last wrote last_seen; touch_domain only adds here
+_touched = set()
+
+
+def profile_to_dict(profile: DomainProfile) -> dict:
+    return {
+        "domain": profile.domain_name,
+        "is_disposable": profile.is_disposable,
+        "is_alias": profile.is_alias,
+        "whois_age_years": profile.whois_age_years,
+        "has_spf": profile.has_spf,
+        "dmarc_policy": profile.dmarc_policy,
+        "has_mx": profile.has_mx,
+        "dns_records": json.loads(profile.dns_records) if profile.dns_records else {},
+        "score": profile.score,
+        "last_seen": profile.last_seen.isoformat() if profile.last_seen else None,
+        "refreshed_on": profile.refreshed_on.isoformat() if profile.refreshed_on else None,
+    }
+
+
+def is_fresh(profile: DomainProfile) -> bool:
+    return profile.refreshed_on is not None and profile.refreshed_on + PROFILE_TTL > datetime.utcnow()
+
+
+def compute_domain_score(is_disposable, is_alias, whois_age_years, has_spf, dmarc_policy, has_mx) -> float:
+    """Combined trust score in [0, 1]; lower means riskier."""
+    score = 1.0
+    if is_disposable:
+        score -= 0.5
+    if is_alias:
+        score -= 0.1
+    if whois_age_years is None:
+        score -= 0.1
+    elif whois_age_years < 1:
+        score -= 0.3
+    if not has_spf:
+        score -= 0.1
+    if dmarc_policy not in ("reject", "quarantine"):
+        score -= 0.1
+    if not has_mx:
+        score -= 0.2
+    return round(max(score, 0.0), 3)
+
+
+# ---------- READ PATH ----------
+def get_profile(domain: str):
+    """Read the stored profile for a domain (one indexed row), fresh or not."""
+    db = SessionLocal()
+    try:
+        profile = db.query(DomainProfile).filter_by(domain_name=domain.strip().lower()).first()
+        return profile_to_dict(profile) if profile else None
+    finally:
+        db.close()
+
+
+def get_fresh_profile(domain: str):
+    """Return the stored profile only if it is still within PROFILE_TTL."""
+    db = SessionLocal()
+    try:
+        profile = db.query(DomainProfile).filter_by(domain_name=domain.strip().lower()).first()
+        if profile is None or not is_fresh(profile):
+            return None
+        return profile_to_dict(profile)
+    finally:
+        db.close()
+
+
+def get_profiles(domains) -> dict:
+    """Stored profiles for many domains in one query: {domain: profile}."""
+    domains = {d.strip().lower() for d in domains if d}
+    if not domains:
+        return {}
+    db = SessionLocal()
+    try:
+        rows = db.query(DomainProfile).filter(DomainProfile.domain_name.in_(list(domains))).all()
+        return {row.domain_name: profile_to_dict(row) for row in rows}
+    finally:
+        db.close()
+
+
+def touch_domains(domains):
+    """touch_domain for many domains with a single commit."""
+    domains = {d.strip().lower() for d in domains if d}
+    if not domains:
+        return
+    db = SessionLocal()
+    try:
+        now = datetime.utcnow()
+        existing = {
+            row.domain_name: row
+            for row in db.query(DomainProfile).filter(DomainProfile.domain_name.in_(list(domains))).all()
+        }
+        for domain in domains:
+            if domain in existing:
+                existing[domain].last_seen = now
+            else:
+                db.add(DomainProfile(domain_name=domain, last_seen=now))
+        db.commit()
+    finally:
+        db.close()
+
+
+def touch_domain(domain: str):
+    """
+    Record that a domain was just seen so the refresh worker prioritises it.
+    No database work: the worker writes the batch with touch_domains right
+    before it picks stale domains, the only time last_seen is read.
+    """
+    if domain:
+        _touched.add(domain.strip().lower())
+
+
+async def flush_touched_domains():
+    """Write the domains touched since the last flush, off the event loop."""
+    global _touched
+    if not _touched:
+        return
+    domains, _touched = _touched, set()
+    try:
+        await asyncio.to_thread(touch_domains, domains)
+    except BaseException:
+        _touched |= domains
+        raise
+
+
+async def get_or_refresh_profile(domain: str) -> dict:
+    """Serve the stored profile, falling back to live lookups only when stale."""
+    touch_domain(domain)
+    profile = await asyncio.to_thread(get_fresh_profile, domain)
+    if profile is not None:
+        return profile
+    return await refresh_profile(domain)
+
+
+# ---------- REFRESH ----------
+async def refresh_profile(domain: str) -> dict:
+    """Re-derive every fact about a domain and store the combined row."""
+    domain = domain.strip().lower()
+
+    (spf_records, spf_ok), (dmarc_records, dmarc_ok), (mx_records, mx_ok), whois_info = await asyncio.gather(
+        dns_lookup("TXT", domain),
+        dns_lookup("TXT", f"_dmarc.{domain}"),
+        dns_lookup("MX", domain),
+        lookup_whois(domain),
+    )
+
+    # A failed lookup says nothing about the records: store none for it
+    ok = {"spf": spf_ok, "dmarc": dmarc_ok, "mx": mx_ok}
+    spf_records = spf_records if spf_ok else []
+    dmarc_records = dmarc_records if dmarc_ok else []
+    mx_records = mx_records if mx_ok else []
+
+    db = SessionLocal()
+    try:
+        disposable = crud.is_disposable(db, domain)
+        alias = crud.is_alias(db, domain)
+        age = None
+        if whois_info.get("success"):
+            age = whois_info["data"].get("domain_age_years")
+        has_spf = has_valid_spf(spf_records)
+        dmarc_policy = get_dmarc_policy(dmarc_records)
+        has_mx = mx_ok and bool(mx_records)
+
+        profile = db.query(DomainProfile).filter_by(domain_name=domain).first()
+        if profile is None:
+            profile = DomainProfile(domain_name=domain, last_seen=datetime.utcnow())
+            db.add(profile)
+        profile.is_disposable = disposable
+        profile.is_alias = alias
+        profile.whois_age_years = age
+        profile.has_spf = has_spf
+        profile.dmarc_policy = dmarc_policy
+        profile.has_mx = has_mx
+        profile.dns_records = json.dumps({"spf": spf_records, "dmarc": dmarc_records, "mx": mx_records, "ok": ok})
+        profile.score = compute_domain_score(disposable, alias, age, has_spf, dmarc_policy, has_mx)
+        profile.refreshed_on = datetime.utcnow()
+        if not all(ok.values()):
+            # Dated back so the row goes stale after PROFILE_RETRY_TTL: get_fresh_profile
+            # and the worker's stale query then retry it without a special case
+            profile.refreshed_on -= PROFILE_TTL - PROFILE_RETRY_TTL
+        db.commit()
+        return profile_to_dict(profile)
+    finally:
+        db.close()
+
+
+def stale_domains(limit: int) -> list[str]:
+    """Stale or never-refreshed domains, most recently seen first."""
+    cutoff = datetime.utcnow() - PROFILE_TTL
+    db = SessionLocal()
+    try:
+        rows = (
+            db.query(DomainProfile.domain_name)
+            .filter((DomainProfile.refreshed_on == None) | (DomainProfile.refreshed_on < cutoff))  # noqa: E711
+            .order_by(DomainProfile.last_seen.desc())
+            .limit(limit)
+            .all()
+        )
+        return [r[0] for r in rows]
+    finally:
+        db.close()
+
+
+async def domain_profile_worker():
+    """
+    Background loop that keeps domain_profiles fresh in priority order.
+    Domains that failed stay stale and come straight back, so a round with
+    failures is followed by an exponential backoff instead of a retry spin.
+    """
+    backoff = REFRESH_ERROR_BACKOFF
+    while True:
+        failed = False
+        domains = []
+        try:
+            await flush_touched_domains()
+            domains = await asyncio.to_thread(stale_domains, REFRESH_BATCH_SIZE)
+        except Exception as e:
+            print(f"❌ Failed to load stale domain profiles: {e}")
+            failed = True
+        for domain in domains:
+            try:
+                await refresh_profile(domain)
+            except Exception as e:
+                print(f"❌ Failed to refresh profile for {domain}: {e}")
+                failed = True
+        if failed:
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, REFRESH_INTERVAL)
+            continue
+        backoff = REFRESH_ERROR_BACKOFF
+        if len(domains) < REFRESH_BATCH_SIZE:
+            await asyncio.sleep(REFRESH_INTERVAL)
@@ -1,73 +1,240 @@
+import base64
 import io
+import os
+import quopri
+import tempfile
 import extract_msg
-from concurrent.futures import ProcessPoolExecutor
-from email import message_from_bytes
+from email import policy as email_policy
+from email.feedparser import BytesFeedParser
+from email.message import EmailMessage
+from backend.app.services.worker_pool import run_cpu
+from backend.app.services.attachment_store import put_bytes, put_chunks
 
-def process_attachment(attachment):
-    """Process a single attachment into previewable form."""
+# .msg uploads up to this size are parsed inline; the pool round trip costs more than it saves
+MSG_INLINE_MAX_BYTES = int(os.getenv("MSG_INLINE_MAX_BYTES", str(512 * 1024)))
+
+# Limits for streamed .eml uploads
+EML_MAX_BYTES = int(os.getenv("EML_MAX_BYTES", str(25 * 1024 * 1024)))
+EML_MAX_PARTS = int(os.getenv("EML_MAX_PARTS", "500"))
+# Non-text parts with a larger encoded payload are moved to temporary files
+EML_SPILL_BYTES = int(os.getenv("EML_SPILL_BYTES", str(1024 * 1024)))
+EML_CHUNK_SIZE = 64 * 1024
+
+def attachment_metadata(attachment, store=False):
+    """Describe a single attachment; with store, also keep its bytes in the attachment store."""
     try:
         filename = attachment.longFilename or attachment.shortFilename or "unnamed"
         data = attachment.data
-        return {"filename": filename, "size": len(data), "data": data}
+        metadata = {
+            "filename": filename,
+            "size": len(data) if data is not None else 0,
+            "mime_type": getattr(attachment, "mimetype", None),
+        }
+        if store and isinstance(data, bytes):
+            metadata["sha256"], _ = put_bytes(data)
+        return metadata
     except Exception as e:
         return {"error": str(e)}
 
-def extract_msg_content_fast(msg_bytes):
-    """Faster .msg parsing with parallelized attachment extraction."""
+def as_text(body) -> str:
+    """extract_msg returns htmlBody as bytes and body as str."""
+    if isinstance(body, bytes):
+        return body.decode("utf-8", errors="ignore")
+    return body or ""
+
+def extract_msg_content_fast(msg_bytes, store_attachments=False):
+    """Parse .msg bytes; attachments are reduced to metadata in the parsing process."""
     msg_stream = io.BytesIO(msg_bytes)
     msg = extract_msg.Message(msg_stream)
 
-    # Extract metadata
-    result = {
-        "from": msg.sender or "",
-        "to": msg.to or "",
-        "subject": msg.subject or "",
-        "date": msg.date or "",
-        "html": msg.htmlBody or msg.body or "",
-        "attachments": []
-    }
+    try:
+        # Extract metadata
+        return {
+            "from": msg.sender or "",
+            "to": msg.to or "",
+            "subject": msg.subject or "",
+            "date": str(msg.date or ""),
+            "html": as_text(msg.htmlBody) or as_text(msg.body),
+            "attachments": [attachment_metadata(a, store=store_attachments) for a in msg.attachments],
+        }
+    finally:
+        msg.close()
 
-    attachments = msg.attachments
-    if attachments:
-        with ProcessPoolExecutor() as executor:
-            results = list(executor.map(process_attachment, attachments))
-        result["attachments"] = results
+async def extract_msg_content_async(msg_bytes, store_attachments=False):
+    """Small messages stay on the fast inline path; big ones go to the warm shared pool."""
+    if len(msg_bytes) <= MSG_INLINE_MAX_BYTES:
+        return extract_msg_content_fast(msg_bytes, store_attachments)
+    return await run_cpu(extract_msg_content_fast, msg_bytes, store_attachments)
 
-    return result
+# ---------- STREAMING .EML PARSING ----------
+class EmailTooLarge(ValueError):
+    """The upload exceeds EML_MAX_BYTES or EML_MAX_PARTS."""
 
-def extract_email_content(content: bytes):
-    """Parse .eml file bytes -> dict with metadata + html/text (no attachments here)."""
-    msg = message_from_bytes(content)
-
-    html = ""
-    text = ""
-
-    if msg.is_multipart():
-        for part in msg.walk():
-            ctype = part.get_content_type()
-            if ctype == "text/html":
-                payload = part.get_payload(decode=True)
-                if payload:
-                    html = payload.decode(errors="ignore")
-            elif ctype == "text/plain" and not html:  # keep as fallback
-                payload = part.get_payload(decode=True)
-                if payload:
-                    text = payload.decode(errors="ignore")
-    else:
-        ctype = msg.get_content_type()
-        payload = msg.get_payload(decode=True)
-        if payload:
-            if ctype == "text/html":
-                html = payload.decode(errors="ignore")
-            else:
-                text = payload.decode(errors="ignore")
+
+class SpillingMessage(EmailMessage):
+    """
+    Message part that moves a large non-text payload to a temporary file as
+    soon as the parser hands it over, so it does not stay in the message tree.
+    """
+
+    def __init__(self, policy=None, spill_bytes=EML_SPILL_BYTES):
+        super().__init__(policy=policy)
+        self.spill_bytes = spill_bytes
+        self.spilled_path = None
+        self.encoded_size = 0
+        self.padding = 0
+
+    def set_payload(self, payload, charset=None):
+        if isinstance(payload, str):
+            self.encoded_size = len(payload) - payload.count("\n") - payload.count("\r")
+            self.padding = len(payload.rstrip()) - len(payload.rstrip().rstrip("="))
+            if len(payload) > self.spill_bytes and self.get_content_maintype() not in ("text", "multipart", "message"):
+                with tempfile.NamedTemporaryFile(prefix="eml-part-", suffix=".part", delete=False) as spill:
+                    spill.write(payload.encode("ascii", "surrogateescape"))
+                self.spilled_path = spill.name
+                payload = ""
+        super().set_payload(payload, charset)
+
+
+class StreamingEmailParser:
+    """
+    Incremental .eml parser: feed() chunks as they arrive, then close().
+
+    with StreamingEmailParser() as parser:
+        ...
+
+    removes every spilled part file on exit, also when feed() or close()
+    raised halfway through the message.
+    """
+
+    def __init__(self, max_bytes=EML_MAX_BYTES, max_parts=EML_MAX_PARTS, spill_bytes=EML_SPILL_BYTES):
+        self.max_bytes = max_bytes
+        self.max_parts = max_parts
+        self.size = 0
+        self._parts = []
+        self._parser = BytesFeedParser(_factory=lambda policy: self._new_part(policy, spill_bytes), policy=email_policy.default)
+
+    def _new_part(self, policy, spill_bytes):
+        # Checked as each part starts, so a message with thousands of tiny parts stops early
+        if len(self._parts) >= self.max_parts:
+            raise EmailTooLarge(f"Email has more than {self.max_parts} MIME parts")
+        part = SpillingMessage(policy=policy, spill_bytes=spill_bytes)
+        self._parts.append(part)
+        return part
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.cleanup()
+        return False
+
+    def cleanup(self):
+        """Delete the spill files of every part parsed so far."""
+        for part in self._parts:
+            if part.spilled_path and os.path.exists(part.spilled_path):
+                os.remove(part.spilled_path)
+
+    def feed(self, chunk: bytes):
+        self.size += len(chunk)
+        if self.size > self.max_bytes:
+            raise EmailTooLarge(f"Email is larger than {self.max_bytes} bytes")
+        self._parser.feed(chunk)
+
+    def close(self):
+        return self._parser.close()
+
+
+def decoded_size(part):
+    """Size of a part's decoded payload, estimated from its encoded size without decoding."""
+    if part.get("Content-Transfer-Encoding", "").strip().lower() == "base64":
+        return max(part.encoded_size * 3 // 4 - part.padding, 0)
+    return part.encoded_size
+
+
+def iter_part_bytes(part, chunk_size=EML_CHUNK_SIZE):
+    """Decoded bytes of a leaf part, read from its spill file in chunks when it was spilled."""
+    if not part.spilled_path:
+        yield part.get_payload(decode=True) or b""
+        return
+
+    cte = part.get("Content-Transfer-Encoding", "").strip().lower()
+    with open(part.spilled_path, "rb") as f:
+        if cte == "quoted-printable":
+            yield quopri.decodestring(f.read())
+        elif cte != "base64":
+            while chunk := f.read(chunk_size):
+                yield chunk
+        else:
+            # Decode whole 4-char groups as they accumulate
+            pending = b""
+            while chunk := f.read(chunk_size):
+                pending += chunk.translate(None, b" \t\r\n")
+                usable = len(pending) - len(pending) % 4
+                if usable:
+                    yield base64.b64decode(pending[:usable])
+                    pending = pending[usable:]
+            if pending:
+                yield base64.b64decode(pending + b"=" * (-len(pending) % 4))
+
+
+def summarize_email_message(msg, store_attachments=False):
+    """
+    Pick the body parts and describe attachments. Only the chosen HTML part
+    (the last one, as before) and the plain-text fallback are decoded.
+    With store_attachments, attachment bytes are also put in the
+    content-addressed attachment store and described by their sha256.
+    """
+    html_part = None
+    text_part = None
+    attachments = []
+
+    for index, part in enumerate(msg.walk()):
+        if part.is_multipart():
+            continue
+        ctype = part.get_content_type()
+        if part.get_filename() or part.get_content_disposition() == "attachment" or part.spilled_path:
+            attachment = {
+                "attachment_id": str(index),
+                "filename": part.get_filename() or "unnamed",
+                "mime_type": ctype,
+                "size": decoded_size(part),
+            }
+            if store_attachments:
+                attachment["sha256"], attachment["size"] = put_chunks(iter_part_bytes(part))
+            attachments.append(attachment)
+        elif ctype == "text/html" and part.encoded_size:
+            html_part = part
+        elif ctype == "text/plain" and html_part is None and part.encoded_size:  # keep as fallback
+            text_part = part
+
+    def decode(part):
+        payload = part.get_payload(decode=True) if part is not None else None
+        return payload.decode(errors="ignore") if payload else ""
 
     return {
-        "from": msg.get("From", "") or "",
-        "to": msg.get("To", "") or "",
-        "subject": msg.get("Subject", "") or "",
-        "date": msg.get("Date", "") or "",
-        "html": html,
-        "text": text,
-        "attachments": [],  # .eml attachments can be added later if needed
+        "from": str(msg.get("From", "") or ""),
+        "to": str(msg.get("To", "") or ""),
+        "subject": str(msg.get("Subject", "") or ""),
+        "date": str(msg.get("Date", "") or ""),
+        "html": decode(html_part),
+        "text": decode(text_part),
+        "attachments": attachments,
     }
+
+
+def extract_email_content(content: bytes):
+    """Parse .eml file bytes -> dict with metadata + html/text + attachment metadata."""
+    with StreamingEmailParser() as parser:
+        for start in range(0, len(content), EML_CHUNK_SIZE):
+            parser.feed(content[start:start + EML_CHUNK_SIZE])
+        return summarize_email_message(parser.close())
+
+
+def extract_email_file(path, store_attachments=False):
+    """Parse an .eml already on disk, reading it in chunks (blocking: run it in a thread)."""
+    with StreamingEmailParser() as parser, open(path, "rb") as f:
+        while chunk := f.read(EML_CHUNK_SIZE):
+            parser.feed(chunk)
+        return summarize_email_message(parser.close(), store_attachments=store_attachments)
+
@@ -0,0 +1,68 @@
+# backend/app/services/gmail_analysis.py
+import asyncio
+
+from backend.app.analyzers.gmail_analyzer import extract_links
+from backend.app.analyzers.LinkScanner import scan_url_hybrid
+from backend.app.ML.url_classifier.training.db import insert_or_update_links
+from backend.app.ML.url_classifier.training.auto_label import auto_label_url, domain_of
+from backend.app.services.domain_profiles import get_profiles, touch_domains
+
+
+def record_links(g: dict, links: list):
+    """Store an email's links for training + counting, with batched DB round trips."""
+    domains = [link.get("domain") or domain_of(link["url"]) for link in links]
+    touch_domains(domains)
+    profiles = get_profiles(domains)
+
+    rows = []
+    for link, domain in zip(links, domains):
+        rows.append({
+            "url": link["url"],
+            "domain": domain,
+            "source_email": g.get("id"),
+            "subject": g.get("metadata", {}).get("subject"),
+            "auto_label": auto_label_url(link["url"], profile=profiles.get((domain or "").lower())),
+        })
+    insert_or_update_links(rows)
+
+
+async def scan_links(links: list, scan=scan_url_hybrid) -> list:
+    """Scan links concurrently and attach the scan details to a copy of each."""
+    scan_results = await asyncio.gather(*(scan(link["url"]) for link in links))
+
+    scanned_links = []
+    for link, scan_result in zip(links, scan_results):
+        scanned_link = link.copy()
+        scanned_link["scan_details"] = {
+                                        "ml_status": scan_result.get("ml_status"),
+                                        "ml_confidence": scan_result.get("ml_confidence"),
+                                        "gsb_status": scan_result.get("gsb_status"),
+                                        "gsb_details": scan_result.get("gsb_details", [])
+                                        }
+
+        scanned_link["scan_status"] = scan_result.get("final_status", "unknown")
+        scanned_links.append(scanned_link)
+    return scanned_links
+
+
+async def analyze_fetched_gmail(g: dict, links: list = None, scan=scan_url_hybrid) -> dict:
+    """
+    Scan the links of one parsed Gmail message and build its API result.
+    `links` may be passed in when they were already extracted; `scan` lets a
+    caller share/deduplicate scans across messages.
+    """
+    if links is None:
+        links = extract_links(g["body_html"], g["body_text"])
+
+    await asyncio.to_thread(record_links, g, links)
+    scanned_links = await scan_links(links, scan=scan)
+
+    return {
+        "id": g["id"],
+        "metadata": g["metadata"],
+        "body_html": g["body_html"],
+        "body_text": g["body_text"],
+        "attachments": g["attachments"],
+        "links": scanned_links,
+        "authenticity_ready": True
+    }
@@ -0,0 +1,166 @@
+# backend/app/services/gmail_pipeline.py
+import asyncio
+import os
+
+from backend.app.analyzers.gmail_analyzer import extract_links
+from backend.app.analyzers.LinkScanner import scan_url_hybrid
+from backend.app.services.gmail_reader import fetch_gmail_raw_messages, parse_raw_gmail
+from backend.app.services.gmail_analysis import analyze_fetched_gmail
+from backend.app.services.worker_pool import CPU_POOL_WORKERS, run_cpu
+
+# Network-bound stages
+FETCH_CHUNK = int(os.getenv("GMAIL_PIPELINE_FETCH_CHUNK", "10"))
+FETCH_CONCURRENCY = int(os.getenv("GMAIL_PIPELINE_FETCH_CONCURRENCY", "2"))
+SCAN_CONCURRENCY = int(os.getenv("GMAIL_PIPELINE_SCAN_CONCURRENCY", "16"))
+MESSAGE_CONCURRENCY = int(os.getenv("GMAIL_PIPELINE_MESSAGE_CONCURRENCY", "8"))
+# CPU-bound stage (MIME parsing + link extraction) on the shared process pool
+PARSE_WORKERS = int(os.getenv("GMAIL_PIPELINE_PARSE_WORKERS", str(CPU_POOL_WORKERS)))
+# Capacity of the queues between stages
+QUEUE_SIZE = int(os.getenv("GMAIL_PIPELINE_QUEUE_SIZE", "16"))
+# How many messages past the one being yielded may be in flight or waiting to be
+# yielded; bounds the reorder buffer when the head message is slow. At least FETCH_CHUNK.
+REORDER_WINDOW = int(os.getenv("GMAIL_PIPELINE_REORDER_WINDOW", "64"))
+# Stored results are read from the database this many positions at a time
+STORED_CHUNK = int(os.getenv("GMAIL_PIPELINE_STORED_CHUNK", "100"))
+
+_DONE = object()
+
+
+def parse_and_extract(message_id, raw_email):
+    """CPU stage, run in a worker process: parse the MIME tree and extract links."""
+    g = parse_raw_gmail(message_id, raw_email)
+    # The raw bytes are not needed downstream, so don't ship them back
+    g.pop("raw_email", None)
+    links = extract_links(g["body_html"], g["body_text"])
+    return g, links
+
+
+async def run_gmail_pipeline(message_ids, stored_ids, load_stored, store_result):
+    """
+    Analyze messages through staged workers and yield results in message_ids order:
+
+        fetch (batched raw gets) -> parse + extract links (shared process pool)
+            -> dedup + scan links (bounded concurrency) -> assemble (in order)
+
+    Stages are connected by bounded queues, so a slow stage holds back the ones
+    before it, and fetching stops REORDER_WINDOW messages ahead of the one
+    waiting to be yielded, so one slow message cannot make finished results
+    pile up behind it. Messages in stored_ids are not fetched; when the first
+    of them comes up, load_stored(ids) reads it and the other stored ones in
+    the next STORED_CHUNK positions in one go ({id: result}).
+    store_result(result) persists new results.
+    """
+    parse_queue = asyncio.Queue(QUEUE_SIZE)
+    scan_queue = asyncio.Queue(QUEUE_SIZE)
+    fetch_slots = asyncio.Semaphore(FETCH_CONCURRENCY)
+    scan_slots = asyncio.Semaphore(SCAN_CONCURRENCY)
+    # One permit per fetched message, returned when its result is yielded (or dropped)
+    window = asyncio.Semaphore(max(REORDER_WINDOW, FETCH_CHUNK))
+    tasks = []
+
+    ready = {}      # position -> result, or None when the message was dropped
+    failures = []
+    progress = asyncio.Event()
+    scans = {}      # url -> scan task, so every URL is scanned once per run
+
+    def finish(seq, result):
+        ready[seq] = result
+        progress.set()
+
+    async def limited_scan(url):
+        async with scan_slots:
+            return await scan_url_hybrid(url)
+
+    async def scan_once(url):
+        if url not in scans:
+            scans[url] = asyncio.ensure_future(limited_scan(url))
+        return await scans[url]
+
+    async def fetch_stage():
+        new = [(seq, m) for seq, m in enumerate(message_ids) if m not in stored_ids]
+
+        async def fetch_chunk(chunk):
+            async with fetch_slots:
+                raw_by_id = await asyncio.to_thread(fetch_gmail_raw_messages, [m for _, m in chunk])
+            for seq, m in chunk:
+                raw_email = raw_by_id.pop(m, None)
+                if raw_email is None:
+                    finish(seq, None)
+                else:
+                    await parse_queue.put((seq, m, raw_email))
+
+        # Permits are taken in message order by this one loop, so the head
+        # message always holds one and the window cannot deadlock
+        fetches = []
+        for i in range(0, len(new), FETCH_CHUNK):
+            chunk = new[i:i + FETCH_CHUNK]
+            for _ in chunk:
+                await window.acquire()
+            fetch = asyncio.create_task(fetch_chunk(chunk))
+            fetch.add_done_callback(on_stage_done)
+            fetches.append(fetch)
+            tasks.append(fetch)
+        await asyncio.gather(*fetches)
+        for _ in range(PARSE_WORKERS):
+            await parse_queue.put(_DONE)
+
+    async def parse_worker():
+        while (item := await parse_queue.get()) is not _DONE:
+            seq, m, raw_email = item
+            try:
+                g, links = await run_cpu(parse_and_extract, m, raw_email)
+            except Exception as e:
+                print(f"❌ Failed to parse Gmail message {m}: {e}")
+                finish(seq, None)
+                continue
+            await scan_queue.put((seq, g, links))
+
+    async def parse_stage():
+        await asyncio.gather(*(parse_worker() for _ in range(PARSE_WORKERS)))
+        for _ in range(MESSAGE_CONCURRENCY):
+            await scan_queue.put(_DONE)
+
+    async def scan_worker():
+        while (item := await scan_queue.get()) is not _DONE:
+            seq, g, links = item
+            try:
+                result = await analyze_fetched_gmail(g, links, scan=scan_once)
+                await asyncio.to_thread(store_result, result)
+            except Exception as e:
+                print(f"❌ Failed to analyze Gmail message {g['id']}: {e}")
+                finish(seq, None)
+                continue
+            finish(seq, result)
+
+    def on_stage_done(task):
+        if not task.cancelled() and task.exception() is not None:
+            failures.append(task.exception())
+            progress.set()
+
+    stages = [asyncio.create_task(fetch_stage()), asyncio.create_task(parse_stage())]
+    stages += [asyncio.create_task(scan_worker()) for _ in range(MESSAGE_CONCURRENCY)]
+    for task in stages:
+        task.add_done_callback(on_stage_done)
+    tasks += stages
+
+    stored = {}
+    try:
+        for seq, message_id in enumerate(message_ids):
+            if message_id in stored_ids:
+                if message_id not in stored:
+                    upcoming = [m for m in message_ids[seq:seq + STORED_CHUNK] if m in stored_ids]
+                    stored = await asyncio.to_thread(load_stored, upcoming)
+                result = stored.pop(message_id, None)
+            else:
+                while seq not in ready:
+                    if failures:
+                        raise failures[0]
+                    progress.clear()
+                    await progress.wait()
+                result = ready.pop(seq)
+                window.release()
+            if result is not None:
+                yield result
+    finally:
+        for task in tasks + list(scans.values()):
+            task.cancel()
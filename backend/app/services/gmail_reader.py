@@ -1,20 +1,42 @@
 import os
 import base64
+import random
 import re
-from email import message_from_bytes
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from email import message_from_bytes, policy
+import httplib2
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
+from google_auth_httplib2 import AuthorizedHttp
+from googleapiclient.errors import HttpError
+from backend.app.services.metrics import instrumented
 
 # Gmail API scope
 SCOPES = ['https://www.googleapis.com/auth/gmail.readonly']
 TOKEN_PATH = os.path.abspath("token.json")
 CREDENTIALS_PATH = os.path.abspath("credentials.json")
 
+# Override the Gmail API root, e.g. http://localhost:8089/ for a local fake Gmail service
+GMAIL_API_ENDPOINT = os.getenv("GMAIL_API_ENDPOINT")
+# Gmail accepts at most 100 calls per batch request
+GMAIL_BATCH_SIZE = min(int(os.getenv("GMAIL_BATCH_SIZE", "100")), 100)
+GMAIL_BATCH_CONCURRENCY = int(os.getenv("GMAIL_BATCH_CONCURRENCY", "4"))
+# Rounds for re-batching messages that were rate limited (429) or hit a 5xx
+GMAIL_BATCH_ATTEMPTS = 3
+GMAIL_RETRY_STATUSES = (429, 500, 503)
+# Seconds before the first re-batch, doubled each round and jittered so clients don't retry in step
+GMAIL_RETRY_BACKOFF = float(os.getenv("GMAIL_RETRY_BACKOFF", "1.0"))
+# Bytes per chunk when streaming an attachment download
+ATTACHMENT_CHUNK_SIZE = 64 * 1024
+# Refresh the OAuth token once it is this close to expiring
+GMAIL_TOKEN_REFRESH_MARGIN = timedelta(seconds=int(os.getenv("GMAIL_TOKEN_REFRESH_MARGIN", "300")))
 
-def get_gmail_service():
-    """Authenticate and return Gmail service."""
+
+def load_gmail_credentials():
+    """Load (refreshing or re-authorizing if needed) Gmail OAuth credentials from disk."""
     creds = None
     if os.path.exists(TOKEN_PATH):
         creds = Credentials.from_authorized_user_file(TOKEN_PATH, SCOPES)
@@ -23,21 +45,99 @@ def get_gmail_service():
         if creds and creds.expired and creds.refresh_token:
             creds.refresh(Request())
         else:
+            from google_auth_oauthlib.flow import InstalledAppFlow
             flow = InstalledAppFlow.from_client_secrets_file(CREDENTIALS_PATH, SCOPES)
             creds = flow.run_local_server(port=8080)
-        with open(TOKEN_PATH, 'w') as token:
-            token.write(creds.to_json())
+        save_gmail_credentials(creds)
+
+    return creds
+
+
+def save_gmail_credentials(creds):
+    with open(TOKEN_PATH, 'w') as token:
+        token.write(creds.to_json())
+
+
+def build_gmail_service(creds):
+    """Build the Gmail client from the discovery document bundled with googleapiclient."""
+    # googleapiclient.discovery is slow to import; only pay for it when Gmail is used
+    from googleapiclient.discovery import build
+    client_options = {"api_endpoint": GMAIL_API_ENDPOINT} if GMAIL_API_ENDPOINT else None
+    return build('gmail', 'v1', credentials=creds, client_options=client_options,
+                 static_discovery=True, cache_discovery=False)
+
+
+class GmailClient:
+    """
+    Process-wide Gmail client holder. The service is built once; credentials are
+    refreshed under a lock only when they are close to expiry. googleapiclient
+    services are safe to share between threads as long as every thread executes
+    requests with its own http object, which http() provides.
+    """
+
+    def __init__(self, refresh_margin=GMAIL_TOKEN_REFRESH_MARGIN):
+        self.refresh_margin = refresh_margin
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._creds = None
+        self._service = None
+
+    def _near_expiry(self, creds):
+        if not creds.valid:
+            return True
+        return creds.expiry is not None and creds.expiry - datetime.utcnow() < self.refresh_margin
+
+    def credentials(self):
+        with self._lock:
+            if self._creds is None:
+                self._creds = load_gmail_credentials()
+            elif self._near_expiry(self._creds) and self._creds.refresh_token:
+                self._creds.refresh(Request())
+                save_gmail_credentials(self._creds)
+            return self._creds
+
+    def service(self):
+        creds = self.credentials()
+        with self._lock:
+            if self._service is None:
+                self._service = build_gmail_service(creds)
+            return self._service
+
+    def http(self):
+        """Authorized httplib2 connection owned by the calling thread."""
+        creds = self.credentials()
+        http = getattr(self._local, "http", None)
+        if http is None or http.credentials is not creds:
+            http = self._local.http = AuthorizedHttp(creds, http=httplib2.Http())
+        return http
+
+    def reset(self):
+        with self._lock:
+            self._creds = None
+            self._service = None
+        self._local = threading.local()
+
 
-    return build('gmail', 'v1', credentials=creds)
+gmail_client = GmailClient()
 
+
+def get_gmail_credentials():
+    return gmail_client.credentials()
+
+
+def get_gmail_service():
+    """Authenticate and return the shared Gmail service."""
+    return gmail_client.service()
+
+@instrumented("gmail_fetch_raw_message")
 def fetch_gmail_raw_message(message_id):
     """Fetch full raw RFC822 Gmail message"""
-    service = get_gmail_service()   # <-- use your existing function
+    service = get_gmail_service()
     raw_msg = service.users().messages().get(
         userId="me",
         id=message_id,
         format="raw"
-    ).execute()
+    ).execute(http=gmail_client.http())
     raw_bytes = base64.urlsafe_b64decode(raw_msg["raw"].encode("UTF-8"))
     return raw_bytes
 
@@ -90,75 +190,215 @@ def get_gmail_body_from_raw(raw_msg):
     return ""
 
 
-def fetch_gmail_messages(max_results=10):
-    """Fetch Gmail messages metadata, body, attachments, and raw MIME (for DKIM/DMARC)."""
-    service = get_gmail_service()
+# ---------- BATCHED RAW INGESTION ----------
+def new_gmail_batch(service, callback):
+    """Batch request against Gmail, or against GMAIL_API_ENDPOINT when it is set."""
+    if GMAIL_API_ENDPOINT:
+        from googleapiclient.http import BatchHttpRequest
+        return BatchHttpRequest(callback=callback, batch_uri=GMAIL_API_ENDPOINT.rstrip("/") + "/batch/gmail/v1")
+    return service.new_batch_http_request(callback=callback)
+
+
+@instrumented("gmail_fetch_raw")
+def fetch_raw_messages(service, creds, message_ids):
+    """
+    Fetch format="raw" for many messages through Gmail batch requests
+    (GMAIL_BATCH_SIZE gets per HTTP call, at most GMAIL_BATCH_CONCURRENCY
+    batches in flight). Messages that were rate limited or hit a 5xx are
+    re-batched after an exponential, jittered backoff. Returns
+    {message_id: raw RFC822 bytes}; messages given up on are logged and left out.
+    """
+    raw_by_id = {}
+    pending = list(message_ids)
+
+    def run_batch(ids):
+        fetched, retry = {}, []
+
+        def on_response(request_id, response, exception):
+            if exception is None:
+                fetched[request_id] = base64.urlsafe_b64decode(response["raw"])
+            elif isinstance(exception, HttpError) and exception.resp.status in GMAIL_RETRY_STATUSES:
+                retry.append(request_id)
+            else:
+                print(f"❌ Failed to fetch Gmail message {request_id}: {exception}")
+
+        batch = new_gmail_batch(service, on_response)
+        for message_id in ids:
+            batch.add(
+                service.users().messages().get(userId="me", id=message_id, format="raw"),
+                request_id=message_id,
+            )
+        # httplib2 is not thread-safe, so every batch gets its own connection
+        http = AuthorizedHttp(creds, http=httplib2.Http()) if creds else httplib2.Http()
+        try:
+            batch.execute(http=http)
+        except HttpError as e:
+            if e.resp.status not in GMAIL_RETRY_STATUSES:
+                print(f"❌ Gmail batch of {len(ids)} messages failed: {e}")
+                return fetched, retry
+            # The whole batch was throttled: re-batch every message it did not answer
+            retry.extend(message_id for message_id in ids if message_id not in fetched and message_id not in retry)
+        return fetched, retry
+
+    for attempt in range(GMAIL_BATCH_ATTEMPTS):
+        if not pending:
+            break
+        if attempt:
+            delay = GMAIL_RETRY_BACKOFF * 2 ** (attempt - 1)
+            time.sleep(delay / 2 + random.uniform(0, delay / 2))
+        chunks = [pending[i:i + GMAIL_BATCH_SIZE] for i in range(0, len(pending), GMAIL_BATCH_SIZE)]
+        pending = []
+        with ThreadPoolExecutor(max_workers=GMAIL_BATCH_CONCURRENCY) as pool:
+            for fetched, retry in pool.map(run_batch, chunks):
+                raw_by_id.update(fetched)
+                pending.extend(retry)
+
+    if pending:
+        print(f"❌ Gave up on {len(pending)} Gmail messages after {GMAIL_BATCH_ATTEMPTS} attempts: {', '.join(pending)}")
+    return raw_by_id
+
+
+def decode_part_text(part):
+    """Decode a text part using its declared charset, falling back to replacement."""
+    try:
+        return part.get_content().strip()
+    except (LookupError, UnicodeError, KeyError):
+        payload = part.get_payload(decode=True) or b""
+        return payload.decode(errors="replace").strip()
+
+
+# ---------- ATTACHMENTS ----------
+def iter_attachment_parts(msg):
+    """(attachment_id, part) for every attachment; the id is the part's position in walk()."""
+    for index, part in enumerate(msg.walk()):
+        if not part.is_multipart() and part.get_filename():
+            yield str(index), part
+
+
+def attachment_size(part):
+    """Decoded size of an attachment, computed from its encoded payload without decoding it."""
+    payload = part.get_payload()
+    if not isinstance(payload, str):
+        return 0
+    if part.get("Content-Transfer-Encoding", "").strip().lower() == "base64":
+        encoded = len(payload) - sum(payload.count(c) for c in "\r\n\t ")
+        padding = len(payload.rstrip()) - len(payload.rstrip().rstrip("="))
+        return max(encoded * 3 // 4 - padding, 0)
+    return len(part.get_payload(decode=True) or b"")
+
+
+def iter_attachment_bytes(raw_email, attachment_id, chunk_size=ATTACHMENT_CHUNK_SIZE):
+    """
+    Find one attachment in a raw message and return (metadata, chunks). Base64
+    payloads are decoded chunk by chunk, so the decoded file is never held whole.
+    Returns None if there is no such attachment.
+    """
+    msg = message_from_bytes(raw_email, policy=policy.default)
+    part = dict(iter_attachment_parts(msg)).get(attachment_id)
+    if part is None:
+        return None
+
+    metadata = {
+        "attachment_id": attachment_id,
+        "filename": part.get_filename(),
+        "mime_type": part.get_content_type(),
+        "size": attachment_size(part),
+    }
+
+    def chunks():
+        if part.get("Content-Transfer-Encoding", "").strip().lower() != "base64":
+            data = memoryview(part.get_payload(decode=True) or b"")
+            for start in range(0, len(data), chunk_size):
+                yield bytes(data[start:start + chunk_size])
+            return
+
+        # Base64 lines are 76 chars; decode whole 4-char groups as they accumulate
+        pending = ""
+        for line in part.get_payload().splitlines():
+            pending += line.strip()
+            if len(pending) * 3 // 4 >= chunk_size:
+                usable = len(pending) - len(pending) % 4
+                yield base64.b64decode(pending[:usable])
+                pending = pending[usable:]
+        if pending:
+            yield base64.b64decode(pending + "=" * (-len(pending) % 4))
+
+    return metadata, chunks()
+
+
+def parse_raw_gmail(message_id, raw_email):
+    """Parse headers, bodies and attachments from raw RFC822 bytes locally."""
+    msg = message_from_bytes(raw_email, policy=policy.default)
+
+    metadata = {
+        "from": str(msg.get("From", "")),
+        "to": str(msg.get("To", "")),
+        "subject": str(msg.get("Subject", "")),
+        "date": str(msg.get("Date", "")),
+    }
+
+    html_part = msg.get_body(preferencelist=("html",))
+    text_part = msg.get_body(preferencelist=("plain",))
+
+    # Metadata only; bytes are served on demand by iter_attachment_bytes()
+    attachments = [
+        {
+            "attachment_id": attachment_id,
+            "filename": part.get_filename(),
+            "mime_type": part.get_content_type(),
+            "size": attachment_size(part),
+        }
+        for attachment_id, part in iter_attachment_parts(msg)
+    ]
+
+    return {
+        "id": message_id,
+        "metadata": metadata,
+        "body_html": decode_part_text(html_part) if html_part else None,
+        "body_text": decode_part_text(text_part) if text_part else None,
+        "attachments": attachments,
+        "raw_email": raw_email,  # ✅ kept for authenticity checks
+    }
+
+
+@instrumented("gmail_list_messages")
+def list_inbox_message_ids(max_results=10, service=None, http=None):
+    """Ids of the newest inbox messages, newest first."""
+    if service is None:
+        service = gmail_client.service()
+        http = gmail_client.http()
     result = service.users().messages().list(
         userId="me",
         maxResults=max_results,
         q="in:inbox -in:sent"
-    ).execute()
-    messages = result.get("messages", [])
-
-    gmails = []
-    for msg in messages:
-        # Full fetch (for metadata, body, attachments)
-        msg_data = service.users().messages().get(
-            userId="me",
-            id=msg["id"],
-            format="full"
-        ).execute()
-
-        # Raw fetch (for authenticity checks)
-        raw_msg_data = service.users().messages().get(
-            userId="me",
-            id=msg["id"],
-            format="raw"
-        ).execute()
-        raw_email = base64.urlsafe_b64decode(raw_msg_data["raw"])
-
-        headers = msg_data["payload"].get("headers", [])
-        metadata = {
-            "from": next((h["value"] for h in headers if h["name"].lower() == "from"), ""),
-            "to": next((h["value"] for h in headers if h["name"].lower() == "to"), ""),
-            "subject": next((h["value"] for h in headers if h["name"].lower() == "subject"), ""),
-            "date": next((h["value"] for h in headers if h["name"].lower() == "date"), ""),
-        }
+    ).execute(http=http)
+    return [m["id"] for m in result.get("messages", [])]
+
+
+def fetch_gmail_raw_messages(message_ids):
+    """Batch-fetch raw bytes for the given ids with the shared client: {id: bytes}."""
+    return fetch_raw_messages(gmail_client.service(), gmail_client.credentials(), message_ids)
+
+
+def fetch_gmail_messages_by_id(message_ids, service=None, creds=None):
+    """Batch-fetch and locally parse the given messages, keeping their order."""
+    if service is None:
+        creds = gmail_client.credentials()
+        service = gmail_client.service()
+    raw_by_id = fetch_raw_messages(service, creds, message_ids)
+    return [parse_raw_gmail(message_id, raw_by_id[message_id]) for message_id in message_ids if message_id in raw_by_id]
+
+
+@instrumented("fetch_gmail_messages")
+def fetch_gmail_messages(max_results=10, service=None, creds=None):
+    """
+    Fetch Gmail messages metadata, body, attachments, and raw MIME (for DKIM/DMARC).
 
-        body_data = get_gmail_body(msg_data["payload"])
-
-        attachments = []
-        for part in msg_data["payload"].get("parts", []):
-            if part.get("filename") and part["body"].get("attachmentId"):
-                attachment = service.users().messages().attachments().get(
-                    userId="me", messageId=msg["id"], id=part["body"]["attachmentId"]
-                ).execute()
-
-                attachment_data = attachment["data"]
-                try:
-                    standard_base64 = attachment_data.replace("-", "+").replace("_", "/")
-                    decoded_data = base64.b64decode(standard_base64)
-                    clean_base64 = base64.b64encode(decoded_data).decode("utf-8")
-                except Exception:
-                    clean_base64 = attachment_data
-
-                attachments.append({
-                    "filename": part["filename"],
-                    "mime_type": part["mimeType"],
-                    "data_base64": clean_base64,
-                    "size": part.get("body", {}).get("size", 0),
-                })
-
-        gmails.append({
-            "id": msg["id"],
-            "metadata": metadata,
-            "body_html": body_data["html"],
-            "body_text": body_data["text"],
-            "attachments": attachments,
-            "raw_email": raw_email,  # ✅ added for authenticity checks
-        })
-
-    return gmails
+    Only format="raw" is fetched (batched); everything else is parsed locally.
+    `service`/`creds` can be injected, e.g. to run against a local fake Gmail API.
+    """
+    message_ids = list_inbox_message_ids(max_results, service=service)
+    return fetch_gmail_messages_by_id(message_ids, service=service, creds=creds)
 
 def extract_features(url):
     features = {}
@@ -0,0 +1,245 @@
+# backend/app/services/gmail_sync.py
+import asyncio
+import json
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+from googleapiclient.errors import HttpError
+
+from backend.app.db.database import SessionLocal
+from backend.app.db.models import AnalyzedEmail, GmailSyncState
+from backend.app.services.gmail_reader import gmail_client, list_inbox_message_ids
+from backend.app.services.gmail_pipeline import run_gmail_pipeline
+
+ACCOUNT = "me"
+# Stored analyses are read this many per query
+LOAD_CHUNK = 100
+
+
+class HistoryExpired(Exception):
+    """The saved historyId is older than Gmail's history window."""
+
+
+# ---------- CHECKPOINT + STORED RESULTS ----------
+def load_history_id(account: str = ACCOUNT):
+    db = SessionLocal()
+    try:
+        state = db.query(GmailSyncState).filter_by(account=account).first()
+        return state.history_id if state else None
+    finally:
+        db.close()
+
+
+def save_history_id(history_id: str, account: str = ACCOUNT):
+    db = SessionLocal()
+    try:
+        db.merge(GmailSyncState(account=account, history_id=str(history_id), updated_on=datetime.utcnow()))
+        db.commit()
+    finally:
+        db.close()
+
+
+def received_on(metadata: dict) -> datetime:
+    """Date header as naive UTC, falling back to now when it is missing or malformed."""
+    try:
+        date = parsedate_to_datetime(metadata.get("date", ""))
+        if date.tzinfo is not None:
+            date = date.astimezone(timezone.utc).replace(tzinfo=None)
+        return date
+    except (TypeError, ValueError):
+        return datetime.utcnow()
+
+
+def stored_message_ids(message_ids) -> set:
+    db = SessionLocal()
+    try:
+        rows = db.query(AnalyzedEmail.message_id).filter(AnalyzedEmail.message_id.in_(list(message_ids))).all()
+        return {row[0] for row in rows}
+    finally:
+        db.close()
+
+
+def load_analyses(message_ids) -> dict:
+    """{message_id: analysis} for those of message_ids that are stored, in one query."""
+    db = SessionLocal()
+    try:
+        rows = db.query(AnalyzedEmail.message_id, AnalyzedEmail.result).filter(
+            AnalyzedEmail.message_id.in_(list(message_ids))).all()
+        return {message_id: json.loads(result) for message_id, result in rows}
+    finally:
+        db.close()
+
+
+def latest_stored_ids(limit: int, exclude=()) -> list:
+    db = SessionLocal()
+    try:
+        query = db.query(AnalyzedEmail.message_id).order_by(AnalyzedEmail.received_on.desc())
+        if exclude:
+            query = query.filter(AnalyzedEmail.message_id.notin_(list(exclude)))
+        return [row[0] for row in query.limit(limit).all()]
+    finally:
+        db.close()
+
+
+async def iter_latest_stored_analyses(limit: int, exclude=()):
+    """Newest stored analyses, decoded LOAD_CHUNK rows at a time (queries run off the event loop)."""
+    if limit <= 0:
+        return
+    message_ids = await asyncio.to_thread(latest_stored_ids, limit, exclude)
+    for i in range(0, len(message_ids), LOAD_CHUNK):
+        chunk = message_ids[i:i + LOAD_CHUNK]
+        loaded = await asyncio.to_thread(load_analyses, chunk)
+        for message_id in chunk:
+            if message_id in loaded:
+                yield loaded[message_id]
+
+
+def store_analyses(results: list):
+    db = SessionLocal()
+    try:
+        for result in results:
+            db.merge(AnalyzedEmail(
+                message_id=result["id"],
+                result=json.dumps(result, default=str),
+                received_on=received_on(result["metadata"]),
+                analyzed_on=datetime.utcnow(),
+            ))
+        db.commit()
+    finally:
+        db.close()
+
+
+def forget_analyses(message_ids):
+    if not message_ids:
+        return
+    db = SessionLocal()
+    try:
+        db.query(AnalyzedEmail).filter(AnalyzedEmail.message_id.in_(list(message_ids))).delete(synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+
+# ---------- GMAIL HISTORY ----------
+def current_history_id() -> str:
+    profile = gmail_client.service().users().getProfile(userId="me").execute(http=gmail_client.http())
+    return profile["historyId"]
+
+
+def list_history_changes(start_history_id: str):
+    """
+    Inbox changes since start_history_id.
+    Returns (added_ids, removed_ids, latest_history_id); raises HistoryExpired on 404.
+    """
+    service = gmail_client.service()
+    added, removed = [], set()
+    latest = start_history_id
+    page_token = None
+
+    while True:
+        try:
+            response = service.users().history().list(
+                userId="me",
+                startHistoryId=start_history_id,
+                historyTypes=["messageAdded", "messageDeleted", "labelRemoved"],
+                labelId="INBOX",
+                pageToken=page_token,
+            ).execute(http=gmail_client.http())
+        except HttpError as e:
+            if e.resp.status == 404:
+                raise HistoryExpired(start_history_id) from e
+            raise
+
+        for record in response.get("history", []):
+            for item in record.get("messagesAdded", []):
+                message = item["message"]
+                if "INBOX" in message.get("labelIds", []) and "SENT" not in message.get("labelIds", []):
+                    added.append(message["id"])
+            for item in record.get("messagesDeleted", []):
+                removed.add(item["message"]["id"])
+            for item in record.get("labelsRemoved", []):
+                if "INBOX" in item.get("labelIds", []):
+                    removed.add(item["message"]["id"])
+
+        latest = response.get("historyId", latest)
+        page_token = response.get("nextPageToken")
+        if not page_token:
+            break
+
+    # Newest first, without messages that were added and removed again
+    added = [m for m in dict.fromkeys(reversed(added)) if m not in removed]
+    return added, removed, latest
+
+
+# ---------- SYNC ----------
+def analyze_in_order(message_ids, stored_ids):
+    """Run new messages through the analysis pipeline, serving stored ones from storage."""
+    return run_gmail_pipeline(message_ids, stored_ids, load_stored=load_analyses,
+                              store_result=lambda result: store_analyses([result]))
+
+
+async def iter_sync_gmail(max_results: int = 10, incremental: bool = True):
+    """
+    Analyze only mail that has not been analyzed before, yielding
+    ("email", result) as each message is ready and finally ("sync", info).
+
+    Incremental mode pulls changes since the saved historyId and analyzes at
+    most max_results new messages, newest first; when more arrived, the
+    checkpoint is kept so the rest are picked up by the next call. Without a
+    checkpoint, or once Gmail's history window has expired, it falls back to
+    a full listing of the newest max_results inbox messages. Either way,
+    messages already in analyzed_emails are served from storage.
+    """
+    start_history_id = await asyncio.to_thread(load_history_id) if incremental else None
+    mode = "incremental" if start_history_id else "full"
+
+    if start_history_id:
+        try:
+            added, removed, history_id = await asyncio.to_thread(list_history_changes, start_history_id)
+        except HistoryExpired:
+            mode = "full_resync"
+
+    emitted = set()
+    pending = 0
+    if mode == "incremental":
+        await asyncio.to_thread(forget_analyses, removed)
+        stored_ids = await asyncio.to_thread(stored_message_ids, added)
+        new_ids = [m for m in added if m not in stored_ids]
+        if len(new_ids) > max_results:
+            # Too many for one call: analyze the newest and keep the checkpoint, so the
+            # next call lists the same changes and finds these ones already stored
+            pending = len(new_ids) - max_results
+            new_ids = new_ids[:max_results]
+            history_id = start_history_id
+        # Every new message, then the newest stored ones, max_results in all
+        shown = set(new_ids) | set([m for m in added if m in stored_ids][:max_results - len(new_ids)])
+        added = [m for m in added if m in shown]
+        new_count = len(new_ids)
+        async for result in analyze_in_order(added, stored_ids):
+            emitted.add(result["id"])
+            yield "email", result
+        # Fill up with the newest mail that was already analyzed
+        async for result in iter_latest_stored_analyses(max_results - len(emitted), exclude=emitted):
+            yield "email", result
+    else:
+        # Take the checkpoint before listing so nothing arriving meanwhile is missed
+        history_id = await asyncio.to_thread(current_history_id)
+        message_ids = await asyncio.to_thread(list_inbox_message_ids, max_results)
+        stored_ids = await asyncio.to_thread(stored_message_ids, message_ids)
+        new_count = len(message_ids) - len(stored_ids)
+        async for result in analyze_in_order(message_ids, stored_ids):
+            yield "email", result
+
+    await asyncio.to_thread(save_history_id, history_id)
+    yield "sync", {"mode": mode, "new_messages": new_count, "pending_messages": pending, "history_id": str(history_id)}
+
+
+async def sync_gmail(max_results: int = 10, incremental: bool = True) -> dict:
+    """Collect iter_sync_gmail() into a single response."""
+    messages, sync = [], None
+    async for kind, item in iter_sync_gmail(max_results=max_results, incremental=incremental):
+        if kind == "email":
+            messages.append(item)
+        else:
+            sync = item
+    return {"gmail_messages": messages, "sync": sync}
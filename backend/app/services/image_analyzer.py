@@ -1,4 +1,33 @@
-def analyze_image(image_path: str) -> float:
-    # Dummy logic for image analysis
-    print(f"Analyzing image at {image_path}")
-    return 0.5  # Neutral risk
+from backend.app.analyzers.perceptual_hash import hash_image, hash_pixels
+from backend.app.services.image_index import find_matches, IMAGE_MATCH_RADIUS
+
+# Risk when nothing known is close: the image itself tells us nothing yet
+NEUTRAL_RISK = 0.5
+
+
+def match_risk(matches) -> float:
+    """Near-duplicates of known scam images are high risk; closer means riskier."""
+    if not matches:
+        return NEUTRAL_RISK
+    closest = min(match["phash_distance"] for match in matches)
+    return round(max(NEUTRAL_RISK, 1.0 - closest / (2 * (IMAGE_MATCH_RADIUS + 1))), 3)
+
+
+def analyze_image(image_path: str) -> dict:
+    phash, dhash = hash_image(image_path)
+    matches = find_matches(phash, dhash)
+    return {
+        "risk_score": match_risk(matches),
+        "phash": f"{phash:016x}",
+        "dhash": f"{dhash:016x}",
+        "matches": matches,
+    }
+
+
+def analyze_frames(frames) -> list:
+    """analyze_image for already-decoded pixel arrays (e.g. video frames), hashed as one batch."""
+    results = []
+    for phash, dhash in hash_pixels(frames):
+        matches = find_matches(phash, dhash)
+        results.append({"risk_score": match_risk(matches), "phash": f"{phash:016x}", "matches": matches})
+    return results
@@ -0,0 +1,169 @@
+# backend/app/services/image_index.py
+import os
+import threading
+import time
+from itertools import combinations
+
+import numpy as np
+
+from backend.app.db.database import SessionLocal
+from backend.app.db.models import KnownImage
+from backend.app.services.model_registry import register_model, get_model
+
+# Largest pHash Hamming distance reported as a match. Up to 7 a query probes
+# 17 buckets per table; from 8 to 11 it probes 137, several times slower
+IMAGE_MATCH_RADIUS = int(os.getenv("IMAGE_MATCH_RADIUS", "7"))
+IMAGE_MATCH_LIMIT = int(os.getenv("IMAGE_MATCH_LIMIT", "5"))
+# How often a query checks the database for images added by the bulk builder
+IMAGE_INDEX_REFRESH = int(os.getenv("IMAGE_INDEX_REFRESH", "60"))
+
+SUBSTRINGS = 4
+SUBSTRING_BITS = 64 // SUBSTRINGS
+SUBSTRING_MASK = (1 << SUBSTRING_BITS) - 1
+
+
+def to_signed(value: int) -> int:
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def to_unsigned(value: int) -> int:
+    return value + (1 << 64) if value < 0 else value
+
+
+def popcount64(values):
+    """Bits set in each element of a uint64 array."""
+    values = values - ((values >> np.uint64(1)) & np.uint64(0x5555555555555555))
+    values = (values & np.uint64(0x3333333333333333)) + ((values >> np.uint64(2)) & np.uint64(0x3333333333333333))
+    values = (values + (values >> np.uint64(4))) & np.uint64(0x0F0F0F0F0F0F0F0F)
+    return (values * np.uint64(0x0101010101010101)) >> np.uint64(56)
+
+
+_flip_masks = {}
+
+
+def flip_masks(radius):
+    """Every 16-bit mask with at most radius bits set."""
+    if radius not in _flip_masks:
+        masks = [0]
+        for bits in range(1, radius + 1):
+            masks.extend(sum(1 << b for b in combo) for combo in combinations(range(SUBSTRING_BITS), bits))
+        _flip_masks[radius] = np.array(masks, dtype=np.uint16)
+    return _flip_masks[radius]
+
+
+class HashIndex:
+    """
+    Multi-index hashing over 64-bit pHashes. Each hash is split into four
+    16-bit substrings with one sorted table per substring. Two hashes within
+    distance r agree to within r // 4 bits on at least one substring, so a
+    query only probes those neighbourhoods and verifies the few candidates.
+    """
+
+    def __init__(self, ids=(), phashes=(), dhashes=()):
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self.phashes = np.asarray(phashes, dtype=np.uint64)
+        self.dhashes = np.asarray(dhashes, dtype=np.uint64)
+        self.max_id = int(self.ids.max()) if len(self.ids) else 0
+        self.refreshed = time.monotonic()
+        self.lock = threading.Lock()
+        self._build()
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _build(self):
+        self.tables = []
+        for t in range(SUBSTRINGS):
+            keys = ((self.phashes >> np.uint64(t * SUBSTRING_BITS)) & np.uint64(SUBSTRING_MASK)).astype(np.uint16)
+            order = np.argsort(keys, kind="stable")
+            self.tables.append((keys[order], order))
+
+    def add(self, ids, phashes, dhashes):
+        if not len(ids):
+            return
+        self.ids = np.concatenate([self.ids, np.asarray(ids, dtype=np.int64)])
+        self.phashes = np.concatenate([self.phashes, np.asarray(phashes, dtype=np.uint64)])
+        self.dhashes = np.concatenate([self.dhashes, np.asarray(dhashes, dtype=np.uint64)])
+        self.max_id = int(self.ids.max())
+        self._build()
+
+    def query(self, phash, dhash=None, radius=IMAGE_MATCH_RADIUS, limit=IMAGE_MATCH_LIMIT):
+        """Closest indexed images within radius: [(id, phash distance, dhash distance), ...]."""
+        if not len(self.ids):
+            return []
+        masks = flip_masks(radius // SUBSTRINGS)
+        candidates = []
+        for t, (keys, order) in enumerate(self.tables):
+            probes = np.uint16((phash >> (t * SUBSTRING_BITS)) & SUBSTRING_MASK) ^ masks
+            lows = np.searchsorted(keys, probes, side="left")
+            counts = np.searchsorted(keys, probes, side="right") - lows
+            total = int(counts.sum())
+            if total:
+                # Positions lows[i] .. lows[i] + counts[i] - 1 of every probe, without a Python loop
+                starts = np.repeat(lows - np.cumsum(counts) + counts, counts)
+                candidates.append(order[starts + np.arange(total)])
+        if not candidates:
+            return []
+
+        rows = np.concatenate(candidates)
+        distances = popcount64(self.phashes[rows] ^ np.uint64(phash))
+        keep = distances <= radius
+        # A hash can be found through several substrings; deduplicate the few survivors
+        rows, first = np.unique(rows[keep], return_index=True)
+        distances = distances[keep][first]
+        best = np.argsort(distances, kind="stable")[:limit]
+        dhash_distances = popcount64(self.dhashes[rows[best]] ^ np.uint64(dhash)) if dhash is not None else [None] * len(best)
+        return [(int(self.ids[rows[i]]), int(distances[i]), None if d is None else int(d))
+                for i, d in zip(best, dhash_distances)]
+
+
+# ---------- STORAGE ----------
+def load_rows(after_id=0):
+    db = SessionLocal()
+    try:
+        rows = (db.query(KnownImage.id, KnownImage.phash, KnownImage.dhash)
+                .filter(KnownImage.id > after_id).order_by(KnownImage.id).all())
+    finally:
+        db.close()
+    ids = np.array([row[0] for row in rows], dtype=np.int64)
+    # Signed SQLite integers reinterpreted as the unsigned 64-bit hashes
+    phashes = np.array([row[1] for row in rows], dtype=np.int64).view(np.uint64)
+    dhashes = np.array([row[2] for row in rows], dtype=np.int64).view(np.uint64)
+    return ids, phashes, dhashes
+
+
+def load_index():
+    return HashIndex(*load_rows())
+
+
+register_model("image_index", load_index)
+
+
+def refresh_index(index):
+    """Pick up images added since the last load (e.g. by the bulk builder)."""
+    with index.lock:
+        if time.monotonic() - index.refreshed < IMAGE_INDEX_REFRESH:
+            return
+        index.add(*load_rows(index.max_id))
+        index.refreshed = time.monotonic()
+
+
+def describe_images(ids):
+    db = SessionLocal()
+    try:
+        rows = db.query(KnownImage).filter(KnownImage.id.in_(ids)).all()
+    finally:
+        db.close()
+    return {row.id: {"label": row.label, "source": row.source, "sha256": row.sha256} for row in rows}
+
+
+def find_matches(phash, dhash=None, radius=IMAGE_MATCH_RADIUS, limit=IMAGE_MATCH_LIMIT):
+    """Closest known images to a hash, with their label and source."""
+    index = get_model("image_index")
+    refresh_index(index)
+    found = index.query(phash, dhash, radius, limit)
+    if not found:
+        return []
+    details = describe_images([image_id for image_id, _, _ in found])
+    return [{"image_id": image_id, "phash_distance": distance, "dhash_distance": dhash_distance,
+             **details.get(image_id, {})} for image_id, distance, dhash_distance in found]
@@ -0,0 +1,227 @@
+# backend/app/services/job_queue.py
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# Jobs live in a local SQLite file shared by every API process on the host.
+# WAL lets readers (polling clients) run alongside the single writer.
+JOBS_DB_PATH = os.getenv("JOBS_DB_PATH", "jobs.db")
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "60"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_RETRY_BACKOFF = float(os.getenv("JOB_RETRY_BACKOFF", "2"))
+# Finished jobs are kept this long so repeat submissions are answered from the table
+JOB_RETENTION_SECONDS = float(os.getenv("JOB_RETENTION_SECONDS", str(7 * 24 * 3600)))
+
+ACTIVE_STATUSES = ("queued", "running")
+FINAL_STATUSES = ("done", "failed")
+
+CREATE_JOBS_SQL = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    type TEXT NOT NULL,
+    priority INTEGER NOT NULL DEFAULT 0,
+    payload TEXT NOT NULL,
+    payload_hash TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    available_at REAL NOT NULL,
+    lease_owner TEXT,
+    lease_expires REAL,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+# One live (or finished) job per type and payload; failed jobs drop out so they can be retried
+CREATE_INDEXES_SQL = (
+    "CREATE UNIQUE INDEX IF NOT EXISTS jobs_dedup ON jobs (type, payload_hash) WHERE status != 'failed'",
+    "CREATE INDEX IF NOT EXISTS jobs_claim ON jobs (status, priority DESC, id)",
+)
+
+_local = threading.local()
+
+
+def connect() -> sqlite3.Connection:
+    """One autocommit connection per thread; every statement below is its own transaction."""
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = sqlite3.connect(JOBS_DB_PATH, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        _local.conn = conn
+    return conn
+
+
+def init_jobs_db():
+    conn = connect()
+    conn.execute(CREATE_JOBS_SQL)
+    for sql in CREATE_INDEXES_SQL:
+        conn.execute(sql)
+
+
+def payload_hash(job_type: str, key) -> str:
+    encoded = json.dumps(key, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(f"{job_type}\0{encoded}".encode("utf-8")).hexdigest()
+
+
+def job_dict(row) -> dict:
+    job = dict(row)
+    job["payload"] = json.loads(job["payload"])
+    job["result"] = json.loads(job["result"]) if job["result"] is not None else None
+    return job
+
+
+# ---------- SUBMIT / READ ----------
+def submit_job(job_type: str, payload: dict, priority: int = 0, dedup_key=None,
+               max_attempts: int = JOB_MAX_ATTEMPTS, retry: bool = False) -> tuple[dict, bool]:
+    """
+    Queue a job unless an identical one (same type and dedup key, payload by
+    default) is queued, running or done. Returns (job, created). A duplicate
+    submitted with a higher priority raises the queued job's priority.
+
+    If the last identical job failed, that job is returned so callers can
+    report its error; retry=True queues a fresh one instead.
+    """
+    digest = payload_hash(job_type, payload if dedup_key is None else dedup_key)
+    now = time.time()
+    conn = connect()
+    row = live_job(conn, job_type, digest)
+    if row is not None:
+        if row["status"] == "queued" and row["priority"] < priority:
+            conn.execute("UPDATE jobs SET priority = ?, updated_at = ? WHERE id = ? AND status = 'queued'",
+                         (priority, now, row["id"]))
+            row = live_job(conn, job_type, digest) or row
+        return job_dict(row), False
+
+    if not retry:
+        failed = conn.execute(
+            "SELECT * FROM jobs WHERE type = ? AND payload_hash = ? AND status = 'failed' ORDER BY id DESC LIMIT 1",
+            (job_type, digest),
+        ).fetchone()
+        if failed is not None:
+            return job_dict(failed), False
+
+    cur = conn.execute(
+        """INSERT OR IGNORE INTO jobs (type, priority, payload, payload_hash, max_attempts, available_at, created_at, updated_at)
+           VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+        (job_type, priority, json.dumps(payload, default=str), digest, max_attempts, now, now, now),
+    )
+    # Another process may have inserted the same job in between
+    return job_dict(live_job(conn, job_type, digest)), cur.rowcount == 1
+
+
+def live_job(conn, job_type: str, digest: str):
+    return conn.execute(
+        "SELECT * FROM jobs WHERE type = ? AND payload_hash = ? AND status != 'failed'", (job_type, digest)
+    ).fetchone()
+
+
+def get_job(job_id: int):
+    row = connect().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+    return job_dict(row) if row else None
+
+
+def job_counts() -> dict:
+    """{type: {status: count}} over the whole table."""
+    counts = {}
+    for row in connect().execute("SELECT type, status, COUNT(*) FROM jobs GROUP BY type, status"):
+        counts.setdefault(row[0], {})[row[1]] = row[2]
+    return counts
+
+
+# ---------- WORKER SIDE ----------
+def claim_job(types, owner: str, lease_seconds: float = JOB_LEASE_SECONDS):
+    """
+    Atomically take the highest-priority job of the given types: one that is
+    queued and due, or one whose previous worker's lease ran out (it crashed
+    or the process restarted). Safe across threads and processes.
+    """
+    if not types:
+        return None
+    now = time.time()
+    marks = ",".join("?" * len(types))
+    row = connect().execute(
+        f"""UPDATE jobs
+            SET status = 'running', attempts = attempts + 1, lease_owner = ?, lease_expires = ?, updated_at = ?
+            WHERE id = (
+                SELECT id FROM jobs
+                WHERE type IN ({marks})
+                  AND ((status = 'queued' AND available_at <= ?)
+                       OR (status = 'running' AND lease_expires < ? AND attempts < max_attempts))
+                ORDER BY priority DESC, id
+                LIMIT 1
+            )
+            RETURNING *""",
+        (owner, now + lease_seconds, now, *types, now, now),
+    ).fetchone()
+    return job_dict(row) if row else None
+
+
+def renew_lease(job_id: int, owner: str, lease_seconds: float = JOB_LEASE_SECONDS) -> bool:
+    """Extend a running job's lease; False if another worker has taken it over."""
+    now = time.time()
+    cur = connect().execute(
+        "UPDATE jobs SET lease_expires = ?, updated_at = ? WHERE id = ? AND lease_owner = ? AND status = 'running'",
+        (now + lease_seconds, now, job_id, owner),
+    )
+    return cur.rowcount == 1
+
+
+def complete_job(job_id: int, owner: str, result) -> bool:
+    cur = connect().execute(
+        """UPDATE jobs SET status = 'done', result = ?, error = NULL, lease_owner = NULL, lease_expires = NULL, updated_at = ?
+           WHERE id = ? AND lease_owner = ? AND status = 'running'""",
+        (json.dumps(result, default=str), time.time(), job_id, owner),
+    )
+    return cur.rowcount == 1
+
+
+def fail_job(job_id: int, owner: str, error: str) -> str:
+    """Requeue with exponential backoff while attempts remain, else mark failed. Returns the new status."""
+    now = time.time()
+    row = connect().execute(
+        """UPDATE jobs
+           SET status = CASE WHEN attempts < max_attempts THEN 'queued' ELSE 'failed' END,
+               available_at = ? + ? * (1 << (attempts - 1)),
+               error = ?, lease_owner = NULL, lease_expires = NULL, updated_at = ?
+           WHERE id = ? AND lease_owner = ? AND status = 'running'
+           RETURNING status""",
+        (now, JOB_RETRY_BACKOFF, error, now, job_id, owner),
+    ).fetchone()
+    return row[0] if row else "lost"
+
+
+def release_jobs(owner_prefix: str) -> int:
+    """On shutdown: hand this process's running jobs back without counting the attempt."""
+    cur = connect().execute(
+        """UPDATE jobs SET status = 'queued', attempts = attempts - 1, lease_owner = NULL, lease_expires = NULL, updated_at = ?
+           WHERE status = 'running' AND substr(lease_owner, 1, ?) = ?""",
+        (time.time(), len(owner_prefix), owner_prefix),
+    )
+    return cur.rowcount
+
+
+def reap_jobs() -> list:
+    """
+    Fail running jobs whose lease expired on their last attempt and delete
+    finished jobs past JOB_RETENTION_SECONDS. Returns the payloads of the
+    jobs that just failed, with their type, so their files can be cleaned up.
+    """
+    now = time.time()
+    conn = connect()
+    failed = conn.execute(
+        """UPDATE jobs SET status = 'failed', error = 'lease expired', lease_owner = NULL, lease_expires = NULL, updated_at = ?
+           WHERE status = 'running' AND lease_expires < ? AND attempts >= max_attempts
+           RETURNING type, payload""",
+        (now, now),
+    ).fetchall()
+    conn.execute(
+        "DELETE FROM jobs WHERE status IN ('done', 'failed') AND updated_at < ?", (now - JOB_RETENTION_SECONDS,)
+    )
+    return [(row[0], json.loads(row[1])) for row in failed]
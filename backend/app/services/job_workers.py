@@ -0,0 +1,142 @@
+# backend/app/services/job_workers.py
+import asyncio
+import os
+import socket
+
+from backend.app.services.job_queue import (
+    JOB_LEASE_SECONDS, init_jobs_db, claim_job, renew_lease, complete_job, fail_job, release_jobs, reap_jobs,
+)
+from backend.app.services.worker_pool import run_cpu, CPU_POOL_WORKERS
+from backend.app.services.metrics import current_endpoint, stage_timer, JOBS_FINISHED
+
+# Concurrent jobs per pool in this process. I/O jobs await the network on the
+# event loop; CPU jobs run on the shared process pool, so that pool bounds them.
+JOB_POOL_SIZES = {
+    "io": int(os.getenv("JOB_IO_WORKERS", "16")),
+    "cpu": int(os.getenv("JOB_CPU_WORKERS", str(CPU_POOL_WORKERS))),
+}
+# How often an idle pool looks for jobs queued by other processes
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "0.5"))
+JOB_REAP_INTERVAL = float(os.getenv("JOB_REAP_INTERVAL", "30"))
+
+# Unique per process, so leases show which process holds a job
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+# job type -> {"handler", "pool", "public", "cleanup"}
+JOB_TYPES = {}
+_wakeups = {}
+
+
+def register_job_type(name, handler, pool="io", public=False, cleanup=None):
+    """
+    handler(payload) -> JSON-serializable result.
+    pool "io": handler is a coroutine function run on the event loop.
+    pool "cpu": handler is a picklable function run on the shared process pool.
+    public: clients may submit it through POST /jobs with their own payload.
+    cleanup(payload): called once the job has finished, successfully or not.
+    """
+    if pool not in JOB_POOL_SIZES:
+        raise ValueError(f"Unknown job pool: {pool}")
+    JOB_TYPES[name] = {"handler": handler, "pool": pool, "public": public, "cleanup": cleanup}
+
+
+def notify_job(job_type):
+    """Wake this process's pool for a job type right away instead of at its next poll."""
+    spec = JOB_TYPES.get(job_type)
+    if spec and spec["pool"] in _wakeups:
+        _wakeups[spec["pool"]].set()
+
+
+def cleanup_job(job_type, payload):
+    cleanup = JOB_TYPES.get(job_type, {}).get("cleanup")
+    if cleanup is None:
+        return
+    try:
+        cleanup(payload)
+    except Exception as e:
+        print(f"❌ Cleanup failed for {job_type} job: {e}")
+
+
+async def keep_lease(job_id, owner):
+    while True:
+        await asyncio.sleep(JOB_LEASE_SECONDS / 3)
+        if not await asyncio.to_thread(renew_lease, job_id, owner):
+            return
+
+
+async def run_job(job, spec, slots):
+    owner = job["lease_owner"]
+    # Stages timed while the job runs are labelled with its type
+    current_endpoint.set(f"job:{job['type']}")
+    heartbeat = asyncio.create_task(keep_lease(job["id"], owner))
+    try:
+        # The whole attempt is timed here, in this process. For CPU jobs it is the
+        # only timing /metrics gets: stages timed inside the pool process are not
+        # sent back.
+        with stage_timer(f"job:{job['type']}"):
+            if spec["pool"] == "cpu":
+                result = await run_cpu(spec["handler"], job["payload"])
+            else:
+                result = await spec["handler"](job["payload"])
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        print(f"❌ Job {job['id']} ({job['type']}) attempt {job['attempts']} failed: {e}")
+        status = await asyncio.to_thread(fail_job, job["id"], owner, str(e) or type(e).__name__)
+        JOBS_FINISHED.inc((job["type"], "retry" if status == "queued" else status))
+        if status == "failed":
+            cleanup_job(job["type"], job["payload"])
+    else:
+        completed = await asyncio.to_thread(complete_job, job["id"], owner, result)
+        JOBS_FINISHED.inc((job["type"], "done" if completed else "lost"))
+        if completed:
+            cleanup_job(job["type"], job["payload"])
+    finally:
+        heartbeat.cancel()
+        slots.release()
+
+
+async def job_pool(pool):
+    """Claim jobs of this pool's types while a slot is free; sleep when the queue is empty."""
+    slots = asyncio.Semaphore(JOB_POOL_SIZES[pool])
+    wakeup = _wakeups.setdefault(pool, asyncio.Event())
+    running = set()
+    sequence = 0
+    try:
+        while True:
+            await slots.acquire()
+            types = [name for name, spec in JOB_TYPES.items() if spec["pool"] == pool]
+            sequence += 1
+            wakeup.clear()
+            job = await asyncio.to_thread(claim_job, types, f"{WORKER_ID}:{pool}-{sequence}")
+            if job is None:
+                slots.release()
+                try:
+                    await asyncio.wait_for(wakeup.wait(), JOB_POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            task = asyncio.create_task(run_job(job, JOB_TYPES[job["type"]], slots))
+            running.add(task)
+            task.add_done_callback(running.discard)
+    finally:
+        for task in running:
+            task.cancel()
+
+
+async def job_reaper():
+    while True:
+        for job_type, payload in await asyncio.to_thread(reap_jobs):
+            cleanup_job(job_type, payload)
+        await asyncio.sleep(JOB_REAP_INTERVAL)
+
+
+def start_job_workers() -> list:
+    """Create the jobs table and start one task per pool plus the reaper; returns the tasks."""
+    init_jobs_db()
+    return [asyncio.create_task(job_pool(pool)) for pool in JOB_POOL_SIZES] + [asyncio.create_task(job_reaper())]
+
+
+def stop_job_workers():
+    """Put jobs this process was running back in the queue for the next worker."""
+    return release_jobs(WORKER_ID + ":")
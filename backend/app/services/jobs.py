@@ -0,0 +1,96 @@
+# backend/app/services/jobs.py
+import asyncio
+import os
+
+from backend.app.services.job_queue import submit_job
+from backend.app.services.job_workers import register_job_type, notify_job
+from backend.app.services.upload_store import stream_to_disk
+
+# Interactive checks (a user opened an email) go ahead of bulk media analysis
+AUTHENTICITY_PRIORITY = 10
+MEDIA_PRIORITY = 0
+MEDIA_JOB_TYPES = ("image", "audio", "video")
+
+
+# ---------- HANDLERS ----------
+async def check_authenticity(payload: dict) -> dict:
+    from backend.app.services.gmail_reader import fetch_gmail_raw_message
+    from backend.app.analyzers.gmail_analyzer import get_gmail_authenticity
+
+    raw_email_bytes = await asyncio.to_thread(fetch_gmail_raw_message, payload["message_id"])
+    return await get_gmail_authenticity(raw_email_bytes)
+
+
+def analyze_media(payload: dict) -> dict:
+    """Runs in a pool process; the upload stays on disk until the job is finished."""
+    if not os.path.exists(payload["path"]):
+        raise FileNotFoundError("Upload is no longer on disk")
+    if payload["kind"] == "image":
+        from backend.app.services.image_analyzer import analyze_image as analyze
+    elif payload["kind"] == "audio":
+        from backend.app.services.audio_analyzer import analyze_audio as analyze
+    else:
+        from backend.app.services.video_analyzer import analyze_video as analyze
+    return analyze(payload["path"])
+
+
+def remove_upload(payload: dict):
+    try:
+        os.remove(payload["path"])
+    except FileNotFoundError:
+        pass
+
+
+register_job_type("authenticity", check_authenticity, pool="io", public=True)
+for kind in MEDIA_JOB_TYPES:
+    register_job_type(kind, analyze_media, pool="cpu", cleanup=remove_upload)
+
+
+# ---------- SUBMIT ----------
+async def submit(job_type: str, payload: dict, priority: int = 0, dedup_key=None, retry=False) -> tuple[dict, bool]:
+    job, created = await asyncio.to_thread(submit_job, job_type, payload, priority, dedup_key, retry=retry)
+    if created:
+        notify_job(job_type)
+    return job, created
+
+
+async def submit_authenticity(message_id: str, retry: bool = False) -> dict:
+    job, _ = await submit("authenticity", {"message_id": message_id}, AUTHENTICITY_PRIORITY, retry=retry)
+    return job
+
+
+async def submit_media(file, kind: str, priority: int = MEDIA_PRIORITY, retry: bool = False) -> dict:
+    """
+    Spool the upload to disk and queue it. The same content uploaded again is
+    deduplicated by its SHA-256: the new copy is dropped and the existing job returned.
+    """
+    upload = await stream_to_disk(file, kind)
+    payload = {"kind": kind, "path": upload.path, "filename": upload.filename, "size": upload.size}
+    try:
+        job, created = await submit(kind, payload, priority, dedup_key={"sha256": upload.sha256}, retry=retry)
+    except BaseException:
+        remove_upload(payload)
+        raise
+    if not created:
+        remove_upload(payload)
+    return job
+
+
+def public_job(job: dict) -> dict:
+    """What clients see of a job: no lease details, and no server paths for media."""
+    payload = job["payload"]
+    if job["type"] in MEDIA_JOB_TYPES:
+        payload = {"filename": payload.get("filename"), "size": payload.get("size")}
+    return {
+        "id": job["id"],
+        "type": job["type"],
+        "status": job["status"],
+        "priority": job["priority"],
+        "attempts": job["attempts"],
+        "max_attempts": job["max_attempts"],
+        "payload": payload,
+        "result": job["result"],
+        "error": job["error"],
+        "created_at": job["created_at"],
+        "updated_at": job["updated_at"],
+    }
@@ -1,19 +1,195 @@
-from transformers import pipeline
+import asyncio
+import math
+import os
+from backend.app.services.model_registry import register_model, get_model
+from backend.app.services.metrics import instrumented
+from backend.app.analyzers.lexicon_matcher import match_lexicon
 
-# Load model once when the service starts
-classifier = pipeline("text-classification", model="distilbert-base-uncased")
+MESSAGE_MODEL_NAME = "distilbert-base-uncased"
+# "fp32", or "int8" for dynamically quantized Linear layers (faster on CPU)
+MESSAGE_MODEL_MODE = os.getenv("MESSAGE_MODEL_MODE", "fp32")
+# torch intra-op threads; 0 splits the cores between the API worker processes
+MESSAGE_MODEL_THREADS = int(os.getenv("MESSAGE_MODEL_THREADS", "0"))
+# The quantized model is saved here so later starts skip quantization
+QUANTIZED_MODEL_DIR = os.getenv("QUANTIZED_MODEL_DIR", "backend/app/ML/message_classifier")
+# Weighted lexicon score at which a message is flagged as a likely honeytrap
+HONEYTRAP_RISK_SCORE = float(os.getenv("HONEYTRAP_RISK_SCORE", "2.0"))
+# Classifier label that means "risky"
+MESSAGE_RISK_LABEL = os.getenv("MESSAGE_RISK_LABEL", "LABEL_1")
 
-def analyze_message(message: str):
-    result = classifier(message)[0]
+# Long inputs are scored as overlapping windows of at most MESSAGE_MAX_TOKENS
+# (special tokens included), capped at MESSAGE_MAX_CHUNKS so cost stays bounded
+MESSAGE_MAX_TOKENS = int(os.getenv("MESSAGE_MAX_TOKENS", "512"))
+MESSAGE_CHUNK_OVERLAP = int(os.getenv("MESSAGE_CHUNK_OVERLAP", "64"))
+MESSAGE_MAX_CHUNKS = int(os.getenv("MESSAGE_MAX_CHUNKS", "16"))
+# How window scores combine: "max" (riskiest window), "attention" or "mean"
+MESSAGE_CHUNK_POOLING = os.getenv("MESSAGE_CHUNK_POOLING", "max")
+# Softmax temperature over window risk for attention pooling; lower leans towards max
+MESSAGE_CHUNK_TEMPERATURE = float(os.getenv("MESSAGE_CHUNK_TEMPERATURE", "0.1"))
+
+
+def inference_threads():
+    if MESSAGE_MODEL_THREADS > 0:
+        return MESSAGE_MODEL_THREADS
+    workers = int(os.getenv("WEB_CONCURRENCY", "1"))
+    return max(1, (os.cpu_count() or 1) // max(workers, 1))
+
+
+def quantized_model_path():
+    import torch
+    name = MESSAGE_MODEL_NAME.replace("/", "_")
+    return os.path.join(QUANTIZED_MODEL_DIR, f"{name}-int8-torch{torch.__version__}.pt")
+
+
+def load_quantized_model():
+    """int8 dynamic quantization of the fp32 model, cached on disk per torch version."""
+    import torch
+    from transformers import AutoModelForSequenceClassification
+
+    path = quantized_model_path()
+    if os.path.exists(path):
+        return torch.load(path, weights_only=False)
+
+    model = AutoModelForSequenceClassification.from_pretrained(MESSAGE_MODEL_NAME).eval()
+    quantized = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    os.makedirs(QUANTIZED_MODEL_DIR, exist_ok=True)
+    tmp_path = path + ".tmp"
+    torch.save(quantized, tmp_path)
+    os.replace(tmp_path, path)
+    return quantized
+
+
+def build_message_classifier(mode=MESSAGE_MODEL_MODE):
+    # transformers pulls in torch; import it only when the model is first needed
+    import torch
+    from transformers import pipeline, AutoTokenizer, AutoModelForSequenceClassification
+
+    torch.set_num_threads(inference_threads())
+    if mode == "int8":
+        model = load_quantized_model()
+    elif mode == "fp32":
+        model = AutoModelForSequenceClassification.from_pretrained(MESSAGE_MODEL_NAME)
+    else:
+        raise ValueError(f"MESSAGE_MODEL_MODE must be 'fp32' or 'int8', not {mode!r}")
+    tokenizer = AutoTokenizer.from_pretrained(MESSAGE_MODEL_NAME)
+    return pipeline("text-classification", model=model.eval(), tokenizer=tokenizer)
+
+
+def load_message_classifier():
+    return build_message_classifier(MESSAGE_MODEL_MODE)
+
+
+register_model("message_classifier", load_message_classifier)
+
+
+# ---------- CLASSIFIER ----------
+def tokenize_messages(texts):
+    """Token ids for each message, without special tokens and not truncated."""
+    tokenizer = get_model("message_classifier").tokenizer
+    return tokenizer(list(texts), add_special_tokens=False, verbose=False)["input_ids"]
+
+
+def window_size(classifier=None):
+    """Content tokens that fit in one forward pass next to [CLS]/[SEP]."""
+    classifier = classifier or get_model("message_classifier")
+    return MESSAGE_MAX_TOKENS - classifier.tokenizer.num_special_tokens_to_add()
 
-    # Simple honeytrap keyword detection
-    keywords = ["alone", "private", "meet", "trust me", "secret"]
-    keyword_hits = [word for word in keywords if word in message.lower()]
+
+@instrumented("transformer")
+def forward_probs(batch_ids, classifier=None):
+    """One padded forward pass over token id lists: class probabilities per row."""
+    import torch
+
+    classifier = classifier or get_model("message_classifier")
+    tokenizer = classifier.tokenizer
+    inputs = [tokenizer.build_inputs_with_special_tokens(ids) for ids in batch_ids]
+    encoded = tokenizer.pad({"input_ids": inputs}, return_tensors="pt")
+    with torch.inference_mode():
+        logits = classifier.model(**encoded).logits
+    return logits.softmax(dim=-1).tolist()
+
+
+def prediction(probs, classifier):
+    best = max(range(len(probs)), key=probs.__getitem__)
+    return {"label": classifier.model.config.id2label[best], "score": float(probs[best])}
+
+
+def classify_token_batch(batch_ids, classifier=None):
+    """One forward pass over a batch of tokenized messages that each fit in a window."""
+    classifier = classifier or get_model("message_classifier")
+    return [prediction(probs, classifier) for probs in forward_probs(batch_ids, classifier)]
+
+
+def split_windows(ids, size, overlap=MESSAGE_CHUNK_OVERLAP, max_chunks=MESSAGE_MAX_CHUNKS):
+    """Overlapping windows covering ids; past max_chunks, evenly spaced ones (first and last kept)."""
+    if len(ids) <= size:
+        return [ids]
+    step = max(size - overlap, 1)
+    starts = list(range(0, len(ids) - size, step)) + [len(ids) - size]
+    if len(starts) > max_chunks:
+        starts = [starts[round(i * (len(starts) - 1) / (max_chunks - 1))] for i in range(max_chunks)] \
+            if max_chunks > 1 else starts[:1]
+    return [ids[start:start + size] for start in starts]
+
+
+def pool_windows(window_probs, risk_index, pooling=MESSAGE_CHUNK_POOLING):
+    """Combine per-window class probabilities into one distribution."""
+    if pooling == "max":
+        return max(window_probs, key=lambda probs: probs[risk_index])
+    if pooling == "attention":
+        top = max(probs[risk_index] for probs in window_probs)
+        weights = [math.exp((probs[risk_index] - top) / MESSAGE_CHUNK_TEMPERATURE) for probs in window_probs]
+    elif pooling == "mean":
+        weights = [1.0] * len(window_probs)
+    else:
+        raise ValueError(f"MESSAGE_CHUNK_POOLING must be 'max', 'attention' or 'mean', not {pooling!r}")
+    total = sum(weights)
+    return [sum(w * probs[i] for w, probs in zip(weights, window_probs)) / total
+            for i in range(len(window_probs[0]))]
+
+
+def classify_long(ids, classifier=None, pooling=MESSAGE_CHUNK_POOLING):
+    """Score an input longer than one window: every window in one batched pass, then pooled."""
+    classifier = classifier or get_model("message_classifier")
+    windows = split_windows(ids, window_size(classifier))
+    window_probs = forward_probs(windows, classifier)
+    risk_index = classifier.model.config.label2id.get(MESSAGE_RISK_LABEL, len(window_probs[0]) - 1)
+    result = prediction(pool_windows(window_probs, risk_index, pooling), classifier)
+    result.update(chunks=len(windows), pooling=pooling)
+    return result
+
+
+def classify_messages(texts):
+    classifier = get_model("message_classifier")
+    token_ids = tokenize_messages(texts)
+    size = window_size(classifier)
+    short = [ids for ids in token_ids if len(ids) <= size]
+    short_results = iter(classify_token_batch(short, classifier) if short else [])
+    return [next(short_results) if len(ids) <= size else classify_long(ids, classifier) for ids in token_ids]
+
+
+# ---------- ANALYSIS ----------
+def message_result(message: str, result: dict):
+    # Honeytrap phrase detection against the lexicon (one pass over the message)
+    lexicon = match_lexicon(message)
+    keyword_hits = [hit["phrase"] for hit in lexicon["hits"]]
 
     return {
         "label": result['label'],
         "score": result['score'],
         "keywords_detected": keyword_hits,
-        "honeytrap_risk": len(keyword_hits) > 1
-    } //updated basic logic in message analyzer 
+        "lexicon": lexicon,
+        "honeytrap_risk": lexicon["score"] >= HONEYTRAP_RISK_SCORE
+    }
+
+
+def analyze_message(message: str):
+    return message_result(message, classify_messages([message])[0])
+
 
+async def analyze_message_async(message: str):
+    """Same as analyze_message, but the forward pass is shared with concurrent requests."""
+    from backend.app.services.message_batcher import message_batcher
+    result = await message_batcher.classify(message)
+    # The lexicon may still be loading (get_model blocks on its lock): keep that off the event loop
+    return await asyncio.to_thread(message_result, message, result)
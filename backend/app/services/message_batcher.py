@@ -0,0 +1,114 @@
+# backend/app/services/message_batcher.py
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from backend.app.services.message_analyzer import tokenize_messages, classify_token_batch, classify_long, window_size
+
+# Most messages scored in one forward pass
+MESSAGE_BATCH_SIZE = int(os.getenv("MESSAGE_BATCH_SIZE", "16"))
+# How long the first queued message waits for others to join its batch
+MESSAGE_BATCH_WAIT_MS = float(os.getenv("MESSAGE_BATCH_WAIT_MS", "10"))
+# A batch is split when its longest message is this many times its shortest,
+# so short chat lines are not padded to the length of a pasted essay
+MESSAGE_BATCH_PADDING_RATIO = float(os.getenv("MESSAGE_BATCH_PADDING_RATIO", "2.0"))
+# Messages taken off the queue per round, then regrouped by length
+MESSAGE_BATCH_DRAIN = MESSAGE_BATCH_SIZE * 4
+
+
+def group_by_length(items, lengths, max_batch=MESSAGE_BATCH_SIZE, padding_ratio=MESSAGE_BATCH_PADDING_RATIO):
+    """Split items into batches of similar token length: [[item, ...], ...]."""
+    batches, batch, shortest = [], [], 0
+    for length, item in sorted(zip(lengths, items), key=lambda pair: pair[0]):
+        if batch and (len(batch) >= max_batch or length > shortest * padding_ratio):
+            batches.append(batch)
+            batch = []
+        if not batch:
+            shortest = max(length, 1)
+        batch.append(item)
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+class MessageBatcher:
+    """
+    Queue of messages waiting for the classifier. A single worker task drains
+    the queue, groups messages by token length and runs one forward pass per
+    group on a dedicated thread; each caller awaits its own future.
+    """
+
+    def __init__(self, max_batch=MESSAGE_BATCH_SIZE, max_wait_ms=MESSAGE_BATCH_WAIT_MS):
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.queue = None
+        self.worker = None
+        # torch already uses every core inside a forward pass; run passes one at a time
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="message-batcher")
+
+    def start(self):
+        if self.worker is None or self.worker.done():
+            self.queue = asyncio.Queue()
+            self.worker = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self.worker is not None:
+            self.worker.cancel()
+            try:
+                await self.worker
+            except asyncio.CancelledError:
+                pass
+            self.worker = None
+
+    async def classify(self, text: str) -> dict:
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((text, future))
+        return await future
+
+    async def collect(self):
+        """Wait for one message, then up to max_wait for more to arrive."""
+        pending = [await self.queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.max_wait
+        while len(pending) < MESSAGE_BATCH_DRAIN:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                pending.append(await asyncio.wait_for(self.queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return [(text, future) for text, future in pending if not future.cancelled()]
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            pending = await self.collect()
+            if not pending:
+                continue
+            try:
+                token_ids = await loop.run_in_executor(self.executor, tokenize_messages, [text for text, _ in pending])
+                size = window_size()
+                items, long_items = [], []
+                for ids, (_, future) in zip(token_ids, pending):
+                    (items if len(ids) <= size else long_items).append((ids, future))
+
+                # Inputs over the model's limit are scored in windows, one batched pass each
+                for ids, future in long_items:
+                    result = await loop.run_in_executor(self.executor, classify_long, ids)
+                    if not future.done():
+                        future.set_result(result)
+
+                for batch in group_by_length(items, [len(ids) for ids, _ in items], self.max_batch):
+                    results = await loop.run_in_executor(self.executor, classify_token_batch, [ids for ids, _ in batch])
+                    for (_, future), result in zip(batch, results):
+                        if not future.done():
+                            future.set_result(result)
+            except Exception as e:
+                for _, future in pending:
+                    if not future.done():
+                        future.set_exception(e)
+
+
+message_batcher = MessageBatcher()
@@ -0,0 +1,216 @@
+# backend/app/services/metrics.py
+import functools
+import inspect
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+# Counters and histograms in Prometheus text format, without a client library.
+# Recording a value is a bisect and a locked list update (about a microsecond);
+# with METRICS_ENABLED=0 the stage decorators return the function untouched.
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Route template of the request being served (set by the router dependency) or
+# "job:<type>" in job workers. Work shared between requests, such as batched
+# transformer calls, single-flight WHOIS lookups and background workers, runs
+# outside any request and is labelled "background".
+current_endpoint = ContextVar("metrics_endpoint", default="background")
+
+REGISTRY = []
+
+
+def escape_label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def format_labels(names, values, extra="") -> str:
+    pairs = [f'{name}="{escape_label(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def format_value(value) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, help, label_names=()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(label_names)
+        self._values = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def inc(self, labels=(), amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = sorted(self._values.items())
+        for labels, value in values:
+            lines.append(f"{self.name}{format_labels(self.label_names, labels)} {format_value(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help, label_names=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        # labels -> [count per bucket..., count above the last bucket, sum]
+        self._series = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def observe(self, value, labels=()):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = sorted((labels, list(series)) for labels, series in self._series.items())
+        for labels, series in snapshot:
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), series[:-1]):
+                cumulative += count
+                le = f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{format_labels(self.label_names, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{format_labels(self.label_names, labels)} {format_value(series[-1])}")
+            lines.append(f"{self.name}_count{format_labels(self.label_names, labels)} {cumulative}")
+        return lines
+
+
+def render_metrics() -> str:
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# ---------- METRICS ----------
+STAGE_SECONDS = Histogram(
+    "honeysentinel_stage_duration_seconds",
+    "Time spent in an instrumented stage (Gmail fetch, URL scans, DNS, DKIM, WHOIS, SQLite writes, transformer).",
+    ("stage", "endpoint", "outcome"),
+)
+HTTP_REQUESTS = Counter(
+    "honeysentinel_http_requests_total",
+    "HTTP requests by route template, method and status code.",
+    ("endpoint", "method", "status"),
+)
+HTTP_SECONDS = Histogram(
+    "honeysentinel_http_request_duration_seconds",
+    "Time from receiving a request to sending the last byte of its response.",
+    ("endpoint", "outcome"),
+)
+JOBS_FINISHED = Counter(
+    "honeysentinel_jobs_total",
+    "Job attempts run by this process, by job type and outcome.",
+    ("type", "outcome"),
+)
+
+
+# ---------- STAGES ----------
+class stage_timer:
+    """
+    with stage_timer("dkim.verify") as timer:
+        timer.outcome = "pass" if dkim.verify(raw) else "fail"
+
+    The outcome defaults to "ok", or "error" if the block raises.
+    """
+    __slots__ = ("stage", "outcome", "started")
+
+    def __init__(self, stage):
+        self.stage = stage
+        self.outcome = "ok"
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.outcome = "error"
+        STAGE_SECONDS.observe(time.perf_counter() - self.started, (self.stage, current_endpoint.get(), self.outcome))
+        return False
+
+
+def instrumented(stage, outcome=None):
+    """
+    Time every call of a function (sync or async) as a stage.
+    outcome(result) -> label for results that carry their own success flag;
+    otherwise "ok", and "error" when the call raises.
+    """
+    def decorate(fn):
+        if not METRICS_ENABLED:
+            return fn
+
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def timed_async(*args, **kwargs):
+                label = "error"
+                started = time.perf_counter()
+                try:
+                    result = await fn(*args, **kwargs)
+                    label = outcome(result) if outcome else "ok"
+                    return result
+                finally:
+                    STAGE_SECONDS.observe(time.perf_counter() - started, (stage, current_endpoint.get(), label))
+            return timed_async
+
+        @functools.wraps(fn)
+        def timed(*args, **kwargs):
+            label = "error"
+            started = time.perf_counter()
+            try:
+                result = fn(*args, **kwargs)
+                label = outcome(result) if outcome else "ok"
+                return result
+            finally:
+                STAGE_SECONDS.observe(time.perf_counter() - started, (stage, current_endpoint.get(), label))
+        return timed
+
+    return decorate
+
+
+# ---------- HTTP ----------
+class MetricsMiddleware:
+    """ASGI middleware counting and timing requests by route template (never the raw path)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        status = [500]
+
+        async def send_and_record(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_and_record)
+        finally:
+            route = scope.get("route")
+            endpoint = getattr(route, "path", None) or "unmatched"
+            HTTP_REQUESTS.inc((endpoint, scope["method"], str(status[0])))
+            HTTP_SECONDS.observe(time.perf_counter() - started, (endpoint, f"{status[0] // 100}xx"))
@@ -0,0 +1,84 @@
+# backend/app/services/model_registry.py
+import os
+import threading
+import time
+from datetime import datetime
+
+# Models loaded in the background at startup: comma-separated names, "all" or "none"
+MODEL_WARMUP = os.getenv("MODEL_WARMUP", "all")
+
+_loaders = {}     # name -> function that loads and returns the model
+_models = {}      # name -> loaded model
+_state = {}       # name -> load state reported by /healthz
+_load_locks = {}  # name -> lock so concurrent first calls load only once
+_warmed = set()   # names the warm-up has tried, whether they loaded or failed
+_lock = threading.Lock()
+
+
+class ModelUnavailable(RuntimeError):
+    """A model could not be loaded (missing file, missing dependency, ...)."""
+
+
+def register_model(name, loader):
+    """Register a loader; nothing is imported or read until the model is first needed."""
+    with _lock:
+        _loaders[name] = loader
+        _load_locks.setdefault(name, threading.Lock())
+        _state.setdefault(name, {"status": "not_loaded", "load_seconds": None, "loaded_at": None, "error": None})
+
+
+def get_model(name):
+    """Return the model, loading it on first use. Raises ModelUnavailable if loading fails."""
+    model = _models.get(name)
+    if model is not None:
+        return model
+
+    with _load_locks[name]:
+        if name in _models:
+            return _models[name]
+
+        state = _state[name]
+        state.update(status="loading", error=None)
+        start = time.perf_counter()
+        try:
+            model = _loaders[name]()
+        except Exception as e:
+            state.update(status="error", load_seconds=round(time.perf_counter() - start, 3),
+                         error=f"{type(e).__name__}: {e}")
+            raise ModelUnavailable(f"{name}: {e}") from e
+
+        _models[name] = model
+        state.update(status="ready", load_seconds=round(time.perf_counter() - start, 3),
+                     loaded_at=datetime.utcnow().isoformat())
+        return model
+
+
+def warmup_names():
+    if MODEL_WARMUP.strip().lower() == "none":
+        return []
+    if MODEL_WARMUP.strip().lower() == "all":
+        return sorted(_loaders)
+    return [name.strip() for name in MODEL_WARMUP.split(",") if name.strip() in _loaders]
+
+
+def warm_models(names=None):
+    """Load models one after the other; failures are recorded in the state, not raised."""
+    for name in warmup_names() if names is None else names:
+        try:
+            get_model(name)
+        except ModelUnavailable:
+            pass
+        _warmed.add(name)
+
+
+def model_status():
+    return {name: dict(state) for name, state in _state.items()}
+
+
+def models_ready(names=None):
+    """
+    True once the warm-up has tried every model. A model that failed to load does not
+    hold readiness back: it is unavailable (its routes answer 503) and /healthz shows why.
+    """
+    names = warmup_names() if names is None else names
+    return all(name in _warmed for name in names)
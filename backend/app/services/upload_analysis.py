@@ -0,0 +1,46 @@
+# backend/app/services/upload_analysis.py
+import asyncio
+
+from backend.app.analyzers.gmail_analyzer import extract_links, get_gmail_authenticity
+from backend.app.services.analysis_cache import get_cached_analysis, put_cached_analysis
+from backend.app.services.email_reader import extract_email_file, extract_msg_content_async, EmailTooLarge, EML_MAX_BYTES
+from backend.app.services.gmail_analysis import scan_links
+from backend.app.services.upload_store import saved_upload, UploadTooLarge
+
+
+def read_file(path) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+async def analyze_email_file(file) -> dict:
+    """
+    Parse, link-scan and (for .eml) authenticity-check an uploaded email.
+    The upload is spooled to disk once, hashing it on the way; results are
+    cached by that SHA-256, so the same email uploaded again is answered
+    without parsing or scanning anything.
+    """
+    try:
+        async with saved_upload(file, "email", max_bytes=EML_MAX_BYTES) as upload:
+            cached = await asyncio.to_thread(get_cached_analysis, upload.sha256)
+            if cached is not None:
+                cached["cache"] = {"hit": True, "sha256": upload.sha256}
+                return cached
+
+            if file.filename.lower().endswith(".msg"):
+                # extract_msg needs the whole OLE file
+                parsed = await extract_msg_content_async(await asyncio.to_thread(read_file, upload.path), store_attachments=True)
+            else:
+                parsed = await asyncio.to_thread(extract_email_file, upload.path, True)
+                # DKIM needs the exact raw bytes: verify them from the spooled file through a memory map
+                with upload.mapped() as raw:
+                    parsed["authenticity"] = await get_gmail_authenticity(raw)
+    except UploadTooLarge as e:
+        raise EmailTooLarge(str(e))
+
+    links = extract_links(parsed.get("html"), parsed.get("text"))
+    parsed["links"] = await scan_links(links)
+
+    await asyncio.to_thread(put_cached_analysis, upload.sha256, parsed)
+    parsed["cache"] = {"hit": False, "sha256": upload.sha256}
+    return parsed
@@ -0,0 +1,90 @@
+# backend/app/services/upload_store.py
+import asyncio
+import hashlib
+import mmap
+import os
+import tempfile
+from contextlib import asynccontextmanager, contextmanager
+
+# Uploads are streamed to unique files here and removed once analyzed
+UPLOAD_DIR = os.getenv("UPLOAD_DIR", "temp")
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+UPLOAD_LIMITS = {
+    "image": int(os.getenv("IMAGE_MAX_BYTES", str(20 * 1024 * 1024))),
+    "audio": int(os.getenv("AUDIO_MAX_BYTES", str(200 * 1024 * 1024))),
+    "video": int(os.getenv("VIDEO_MAX_BYTES", str(2 * 1024 * 1024 * 1024))),
+}
+
+
+class UploadTooLarge(ValueError):
+    """The upload exceeds the size limit for its media type."""
+
+
+class SavedUpload:
+    """An upload on disk: path, size and SHA-256 computed while it was written."""
+
+    def __init__(self, path, filename, content_type, size, sha256):
+        self.path = path
+        self.filename = filename
+        self.content_type = content_type
+        self.size = size
+        self.sha256 = sha256
+
+    @contextmanager
+    def mapped(self):
+        """Read-only memory map of the file; pages are loaded on access, not up front."""
+        with open(self.path, "rb") as f:
+            if self.size == 0:
+                yield memoryview(b"")
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                view = memoryview(mapped)
+                try:
+                    yield view
+                finally:
+                    view.release()
+
+
+def file_suffix(filename):
+    """Keep the extension (analyzers and decoders rely on it), never the client's name."""
+    _, ext = os.path.splitext(os.path.basename(filename or ""))
+    return ext.lower() if ext.isascii() and ext[1:].isalnum() else ""
+
+
+async def stream_to_disk(file, kind, chunk_size=UPLOAD_CHUNK_SIZE, max_bytes=None) -> SavedUpload:
+    """Copy an UploadFile to a unique temp file chunk by chunk; writes run off the event loop."""
+    max_bytes = max_bytes or UPLOAD_LIMITS[kind]
+    os.makedirs(UPLOAD_DIR, exist_ok=True)
+    fd, path = tempfile.mkstemp(dir=UPLOAD_DIR, prefix=f"{kind}-", suffix=file_suffix(file.filename))
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while chunk := await file.read(chunk_size):
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLarge(f"{kind.capitalize()} upload is larger than {max_bytes} bytes")
+                digest.update(chunk)
+                await asyncio.to_thread(out.write, chunk)
+    except BaseException:
+        os.remove(path)
+        raise
+    return SavedUpload(path, file.filename, file.content_type, size, digest.hexdigest())
+
+
+@asynccontextmanager
+async def saved_upload(file, kind, max_bytes=None):
+    """
+    async with saved_upload(file, "video") as upload:
+        analyze_video(upload.path)
+
+    The file is deleted when the block exits, whatever happens inside it.
+    """
+    upload = await stream_to_disk(file, kind, max_bytes=max_bytes)
+    try:
+        yield upload
+    finally:
+        try:
+            os.remove(upload.path)
+        except FileNotFoundError:
+            pass
@@ -1,4 +1,162 @@
-def analyze_video(video_path: str) -> float:
-    # Dummy logic for video analysis
-    print(f"Analyzing video at {video_path}")
-    return 0.7  # Medium-high risk
+# backend/app/services/video_analyzer.py
+import os
+import queue
+import threading
+import time
+
+import numpy as np
+
+from backend.app.services.image_analyzer import analyze_frames, NEUTRAL_RISK
+
+# Frames are examined at this rate for scene changes; the rest are skipped without decoding
+VIDEO_PROBE_FPS = float(os.getenv("VIDEO_PROBE_FPS", "2"))
+# Mean absolute difference (0-255) between probe thumbnails that counts as a new scene
+VIDEO_SCENE_THRESHOLD = float(os.getenv("VIDEO_SCENE_THRESHOLD", "18"))
+# A keyframe is taken at least this often even without a scene change
+VIDEO_MAX_GAP_SECONDS = float(os.getenv("VIDEO_MAX_GAP_SECONDS", "10"))
+# Budget: at most this many keyframes and this much wall time per video
+VIDEO_MAX_KEYFRAMES = int(os.getenv("VIDEO_MAX_KEYFRAMES", "120"))
+VIDEO_TIME_BUDGET = float(os.getenv("VIDEO_TIME_BUDGET", "60"))
+# Keyframes are downscaled to this longest side before they are queued
+VIDEO_FRAME_MAX_SIDE = int(os.getenv("VIDEO_FRAME_MAX_SIDE", "256"))
+# Queue depth bounds memory: at most this many frames wait for analysis
+VIDEO_QUEUE_FRAMES = int(os.getenv("VIDEO_QUEUE_FRAMES", "8"))
+VIDEO_WORKERS = int(os.getenv("VIDEO_WORKERS", "2"))
+VIDEO_BATCH = int(os.getenv("VIDEO_BATCH", "4"))
+# Stop once a keyframe is this close to a known scam image
+VIDEO_STOP_DISTANCE = int(os.getenv("VIDEO_STOP_DISTANCE", "3"))
+
+THUMB_SIZE = 32
+
+
+def downscale(gray, max_side=VIDEO_FRAME_MAX_SIDE):
+    """Area-average down to max_side; hashing only needs a small image."""
+    import cv2
+
+    scale = max_side / max(gray.shape)
+    if scale >= 1:
+        return gray
+    size = (max(1, round(gray.shape[1] * scale)), max(1, round(gray.shape[0] * scale)))
+    return cv2.resize(gray, size, interpolation=cv2.INTER_AREA)
+
+
+def iter_keyframes(video_path, stop, deadline, stats):
+    """
+    Yield (timestamp, grayscale frame) for scene changes, plus one frame every
+    VIDEO_MAX_GAP_SECONDS. Only probe frames are converted to pixels; the
+    number of frames read is kept in stats["frames"].
+    """
+    import cv2
+
+    capture = cv2.VideoCapture(video_path)
+    if not capture.isOpened():
+        raise ValueError("Could not open video")
+    try:
+        fps = capture.get(cv2.CAP_PROP_FPS) or 25.0
+        probe_every = max(1, round(fps / VIDEO_PROBE_FPS))
+        index, kept, last_thumb, last_kept_at = 0, 0, None, None
+        while kept < VIDEO_MAX_KEYFRAMES and not stop.is_set() and time.monotonic() < deadline:
+            if not capture.grab():
+                break
+            index += 1
+            stats["frames"] = index
+            if (index - 1) % probe_every:
+                continue
+            ok, frame = capture.retrieve()
+            if not ok:
+                break
+            gray = downscale(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY))
+            del frame
+            timestamp = (index - 1) / fps
+            thumb = cv2.resize(gray, (THUMB_SIZE, THUMB_SIZE), interpolation=cv2.INTER_AREA).astype(np.int16)
+            scene_change = last_thumb is None or np.abs(thumb - last_thumb).mean() > VIDEO_SCENE_THRESHOLD
+            overdue = last_kept_at is None or timestamp - last_kept_at >= VIDEO_MAX_GAP_SECONDS
+            if scene_change or overdue:
+                last_thumb, last_kept_at = thumb, timestamp
+                kept += 1
+                yield timestamp, gray
+    finally:
+        capture.release()
+
+
+def analyze_video(video_path: str) -> dict:
+    """
+    Sample keyframes on a decoder thread and feed them through a bounded queue
+    to workers that hash and match them in batches against the known-image
+    index. Stops early on a near-exact match. Memory stays at a few frames.
+    """
+    frames = queue.Queue(maxsize=VIDEO_QUEUE_FRAMES)
+    stop = threading.Event()
+    results, errors, decoded = [], [], {"frames": 0}
+    lock = threading.Lock()
+    started = time.monotonic()
+
+    def decode():
+        try:
+            for item in iter_keyframes(video_path, stop, started + VIDEO_TIME_BUDGET, decoded):
+                while not stop.is_set():
+                    try:
+                        frames.put(item, timeout=0.1)
+                        break
+                    except queue.Full:
+                        continue
+        except Exception as e:
+            errors.append(str(e))
+        finally:
+            for _ in range(VIDEO_WORKERS):
+                frames.put(None)
+
+    def work():
+        done = False
+        while not done:
+            batch = [frames.get()]
+            while batch[-1] is not None and len(batch) < VIDEO_BATCH:
+                try:
+                    batch.append(frames.get_nowait())
+                except queue.Empty:
+                    break
+            if batch[-1] is None:
+                batch.pop()
+                done = True
+            if not batch or stop.is_set():
+                continue
+            try:
+                analyzed = analyze_frames([gray for _, gray in batch])
+            except Exception as e:
+                errors.append(str(e))
+                stop.set()
+                continue
+            with lock:
+                for (timestamp, _), result in zip(batch, analyzed):
+                    results.append((timestamp, result))
+                    if any(m["phash_distance"] <= VIDEO_STOP_DISTANCE for m in result["matches"]):
+                        stop.set()
+
+    threads = [threading.Thread(target=decode, name="video-decode")]
+    threads += [threading.Thread(target=work, name=f"video-worker-{i}") for i in range(VIDEO_WORKERS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    if errors and not results:
+        raise ValueError(errors[0])
+    return video_result(results, decoded["frames"], time.monotonic() - started, stop.is_set())
+
+
+def video_result(results, frames_decoded, seconds, stopped_early):
+    best = {}
+    for timestamp, result in results:
+        for match in result["matches"]:
+            previous = best.get(match["image_id"])
+            if previous is None or match["phash_distance"] < previous["phash_distance"]:
+                best[match["image_id"]] = {**match, "timestamp": round(timestamp, 2)}
+    return {
+        "risk_score": max((result["risk_score"] for _, result in results), default=NEUTRAL_RISK),
+        "matches": sorted(best.values(), key=lambda match: match["phash_distance"]),
+        "keyframes": len(results),
+        "frames_decoded": frames_decoded,
+        "seconds": round(seconds, 3),
+        "fps": round(frames_decoded / seconds, 1) if seconds else None,
+        "stopped_early": stopped_early,
+    }
@@ -0,0 +1,120 @@
+# backend/app/services/whois_service.py
+import asyncio
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from backend.app.db.database import SessionLocal
+from backend.app.db.models import WhoisRecord
+from backend.app.analyzers.gmail_analyzer1 import get_whois_info
+
+# Lookups are blocking socket calls, so they run on a small dedicated pool
+WHOIS_MAX_WORKERS = int(os.getenv("WHOIS_MAX_WORKERS", "4"))
+WHOIS_TIMEOUT = float(os.getenv("WHOIS_TIMEOUT", "10"))
+# Creation dates rarely change, so successful results are kept for a long time
+WHOIS_CACHE_TTL = timedelta(days=int(os.getenv("WHOIS_CACHE_TTL_DAYS", "30")))
+WHOIS_ERROR_TTL = timedelta(minutes=int(os.getenv("WHOIS_ERROR_TTL_MINUTES", "60")))
+# Minimum gap between two queries sent to the same registry server
+WHOIS_MIN_INTERVAL = float(os.getenv("WHOIS_MIN_INTERVAL", "1.0"))
+
+_executor = ThreadPoolExecutor(max_workers=WHOIS_MAX_WORKERS, thread_name_prefix="whois")
+
+# domain -> task of the lookup currently running for it
+_inflight = {}
+# registry key -> (lock, monotonic time of the last query)
+_registry_locks = {}
+_registry_last_query = {}
+
+
+def registry_key(domain: str) -> str:
+    """Each TLD is served by one registry WHOIS server, so rate-limit per TLD."""
+    return domain.rsplit(".", 1)[-1]
+
+
+# ---------- PERSISTENT CACHE ----------
+def read_cached_whois(domain: str):
+    """Return the cached result for a domain, or None if missing or expired."""
+    db = SessionLocal()
+    try:
+        row = db.query(WhoisRecord).filter_by(domain_name=domain).first()
+        if row is None:
+            return None
+        ttl = WHOIS_CACHE_TTL if row.success else WHOIS_ERROR_TTL
+        if row.fetched_on + ttl < datetime.utcnow():
+            return None
+        result = json.loads(row.result)
+        result["cached"] = True
+        result["fetched_on"] = row.fetched_on.isoformat()
+        return result
+    finally:
+        db.close()
+
+
+def write_cached_whois(domain: str, result: dict):
+    db = SessionLocal()
+    try:
+        db.merge(WhoisRecord(
+            domain_name=domain,
+            result=json.dumps(result, default=str),
+            success=bool(result.get("success")),
+            fetched_on=datetime.utcnow(),
+        ))
+        db.commit()
+    finally:
+        db.close()
+
+
+# ---------- LIVE LOOKUP ----------
+async def _wait_for_registry_slot(domain: str):
+    key = registry_key(domain)
+    lock = _registry_locks.setdefault(key, asyncio.Lock())
+    async with lock:
+        elapsed = time.monotonic() - _registry_last_query.get(key, 0.0)
+        if elapsed < WHOIS_MIN_INTERVAL:
+            await asyncio.sleep(WHOIS_MIN_INTERVAL - elapsed)
+        _registry_last_query[key] = time.monotonic()
+
+
+async def _fetch_whois(domain: str) -> dict:
+    await _wait_for_registry_slot(domain)
+    loop = asyncio.get_running_loop()
+    try:
+        return await asyncio.wait_for(
+            loop.run_in_executor(_executor, get_whois_info, domain, WHOIS_TIMEOUT),
+            timeout=WHOIS_TIMEOUT + 1,
+        )
+    except asyncio.TimeoutError:
+        return {"success": False, "data": None, "error": "WHOIS lookup timed out"}
+
+
+async def lookup_whois(domain: str) -> dict:
+    """
+    Cached WHOIS lookup. Concurrent callers asking for the same domain share a
+    single registry query.
+    """
+    domain = domain.strip().lower()
+
+    cached = read_cached_whois(domain)
+    if cached is not None:
+        return cached
+
+    # The lookup runs as its own task and every caller awaits it through a
+    # shield, so a caller that is cancelled leaves the others waiting on it
+    task = _inflight.get(domain)
+    if task is None:
+        task = _inflight[domain] = asyncio.create_task(_lookup_and_cache(domain))
+        task.add_done_callback(lambda _: _inflight.pop(domain, None))
+    return dict(await asyncio.shield(task))
+
+
+async def _lookup_and_cache(domain: str) -> dict:
+    result = await _fetch_whois(domain)
+    write_cached_whois(domain, result)
+    result["cached"] = False
+    return result
+
+
+def shutdown_whois_executor():
+    _executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,43 @@
+# backend/app/services/worker_pool.py
+import asyncio
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+# One warm process pool for CPU-heavy parsing, shared for the app's lifetime
+CPU_POOL_WORKERS = int(os.getenv("CPU_POOL_WORKERS", str(os.cpu_count() or 2)))
+
+_pool = None
+_lock = threading.Lock()
+
+
+def get_cpu_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=CPU_POOL_WORKERS)
+        return _pool
+
+
+def _ping():
+    return os.getpid()
+
+
+def warm_cpu_pool():
+    """Start every worker process now instead of on the first upload."""
+    pool = get_cpu_pool()
+    for future in [pool.submit(_ping) for _ in range(CPU_POOL_WORKERS)]:
+        future.result()
+
+
+def shutdown_cpu_pool():
+    global _pool
+    with _lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+async def run_cpu(fn, *args):
+    """Run a picklable function on the shared pool without blocking the event loop."""
+    return await asyncio.get_running_loop().run_in_executor(get_cpu_pool(), fn, *args)
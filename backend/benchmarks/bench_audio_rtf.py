@@ -0,0 +1,62 @@
+# Real-time factor of streaming audio analysis (processing time / audio duration) and peak
+# RSS, on a synthetic one-hour 16 kHz voice-like WAV unless a file is given.
+#
+#   python -m backend.benchmarks.bench_audio_rtf
+#   python -m backend.benchmarks.bench_audio_rtf --file recordings/call_1h.wav
+
+import argparse
+import os
+import resource
+import tempfile
+import time
+import wave
+
+import numpy as np
+
+from backend.app.services.audio_analyzer import analyze_audio, SAMPLE_RATE
+
+
+def write_synthetic_wav(path, seconds, rng):
+    """Harmonic 'voiced' bursts with pauses and noise, written one second at a time."""
+    t = np.arange(SAMPLE_RATE) / SAMPLE_RATE
+    with wave.open(path, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(SAMPLE_RATE)
+        for second in range(seconds):
+            pitch = rng.uniform(90, 250)
+            voiced = sum(np.sin(2 * np.pi * pitch * k * t) / k for k in range(1, 8))
+            envelope = (np.sin(2 * np.pi * rng.uniform(2, 5) * t) > -0.3) * (second % 7 != 6)
+            signal = 0.2 * voiced * envelope + 0.01 * rng.standard_normal(SAMPLE_RATE)
+            wav.writeframes((np.clip(signal, -1, 1) * 32767).astype("<i2").tobytes())
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--file")
+    parser.add_argument("--seconds", type=int, default=3600)
+    args = parser.parse_args()
+
+    path = args.file
+    if path is None:
+        path = os.path.join(tempfile.gettempdir(), f"bench_audio_{args.seconds}s.wav")
+        if not os.path.exists(path):
+            print(f"writing {args.seconds} s of synthetic audio to {path}")
+            write_synthetic_wav(path, args.seconds, np.random.default_rng(1))
+
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    start = time.perf_counter()
+    result = analyze_audio(path)
+    elapsed = time.perf_counter() - start
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+    duration = result["duration_seconds"]
+    print(f"audio {duration:.0f} s, {result['segments']} segments, voiced ratio {result['voiced_ratio']}")
+    print(f"processed in {elapsed:.1f} s: real-time factor {elapsed / duration:.4f} "
+          f"({duration / elapsed:.0f}x faster than real time)")
+    print(f"peak RSS {rss_after:.1f} MB ({rss_after - rss_before:+.1f} MB during analysis; "
+          f"file size {os.path.getsize(path) / 1e6:.0f} MB)")
+
+
+if __name__ == "__main__":
+    main()
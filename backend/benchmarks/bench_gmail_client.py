@@ -0,0 +1,58 @@
+# Cold vs warm latency of getting a Gmail service and making one API call.
+# Needs a valid token.json in the working directory.
+#
+#   python -m backend.benchmarks.bench_gmail_client --runs 20
+
+import argparse
+import statistics
+import time
+
+from googleapiclient.discovery import build
+
+from backend.app.services.gmail_reader import GmailClient, SCOPES, load_gmail_credentials
+
+
+def timed(fn):
+    start = time.perf_counter()
+    fn()
+    return (time.perf_counter() - start) * 1000
+
+
+def report(name, samples):
+    print(f"{name:<38} median {statistics.median(samples):8.2f} ms   max {max(samples):8.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    # Old behaviour: read token.json and run dynamic discovery on every call
+    def uncached_call():
+        creds = load_gmail_credentials()
+        service = build("gmail", "v1", credentials=creds)
+        service.users().getProfile(userId="me").execute()
+
+    old = [timed(uncached_call) for _ in range(args.runs)]
+
+    cold, warm = [], []
+    for _ in range(args.runs):
+        client = GmailClient()
+        cold.append(timed(lambda: client.service().users().getProfile(userId="me").execute(http=client.http())))
+        warm.append(timed(lambda: client.service().users().getProfile(userId="me").execute(http=client.http())))
+
+    warm_service_only = []
+    client = GmailClient()
+    client.service()
+    for _ in range(args.runs):
+        warm_service_only.append(timed(client.service))
+
+    print(f"Gmail client latency over {args.runs} runs (scopes: {', '.join(SCOPES)})")
+    report("uncached (token + discovery + call)", old)
+    report("cold holder (static discovery + call)", cold)
+    report("warm holder (call only)", warm)
+    report("warm holder service() lookup", warm_service_only)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+# Near-duplicate lookups in the pHash index vs a linear scan, on random 64-bit hashes.
+# Queries are indexed hashes with a few bits flipped, so each has a known true match.
+#
+#   python -m backend.benchmarks.bench_image_index --size 1000000 --radius 6,10
+
+import argparse
+import time
+
+import numpy as np
+
+from backend.app.services.image_index import HashIndex, popcount64
+
+
+def flip_bits(value, count, rng):
+    for bit in rng.choice(64, count, replace=False):
+        value ^= 1 << int(bit)
+    return value
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--radius", default="4,6,10")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(5)
+    hashes = rng.integers(0, 1 << 62, args.size, dtype=np.int64).view(np.uint64) * np.uint64(4) \
+        + rng.integers(0, 4, args.size).astype(np.uint64)
+
+    start = time.perf_counter()
+    index = HashIndex(np.arange(args.size), hashes, hashes)
+    print(f"{args.size:,} hashes, index built in {time.perf_counter() - start:.2f} s")
+
+    print(f"{'radius':>6} {'recall':>7} {'p50 ms':>8} {'p99 ms':>8} {'linear ms':>10}")
+    for radius in (int(r) for r in args.radius.split(",")):
+        timings, found = [], 0
+        for _ in range(args.queries):
+            target = int(rng.integers(args.size))
+            query = flip_bits(int(hashes[target]), int(rng.integers(0, radius + 1)), rng)
+            start = time.perf_counter()
+            matches = index.query(query, radius=radius, limit=args.size)
+            timings.append(time.perf_counter() - start)
+            found += any(image_id == target for image_id, _, _ in matches)
+
+        start = time.perf_counter()
+        for _ in range(10):
+            np.flatnonzero(popcount64(hashes ^ np.uint64(query)) <= radius)
+        linear = (time.perf_counter() - start) / 10
+
+        timings.sort()
+        print(f"{radius:6d} {found / args.queries:7.3f} {timings[len(timings) // 2] * 1000:8.3f} "
+              f"{timings[int(len(timings) * 0.99)] * 1000:8.3f} {linear * 1000:10.2f}")
+
+
+if __name__ == "__main__":
+    main()
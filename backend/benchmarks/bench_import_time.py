@@ -0,0 +1,57 @@
+# Cold-start profile: how long importing the API takes, and which modules cost the most.
+# Runs each import in a fresh interpreter with -X importtime.
+#
+#   python -m backend.benchmarks.bench_import_time
+#   python -m backend.benchmarks.bench_import_time --module backend.app.routes.analyze --top 25
+
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+
+
+def import_profile(module):
+    """(wall seconds, {module: cumulative microseconds}) for importing module in a new process."""
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True,
+    )
+    wall = time.perf_counter() - start
+    if result.returncode != 0:
+        sys.exit(result.stderr.strip().splitlines()[-1])
+
+    cumulative = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cum_us, name = line.split("|", 2)
+        cumulative[name.strip()] = int(cum_us)
+    return wall, cumulative
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--module", default="backend.app.main")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    runs = [import_profile(args.module) for _ in range(args.runs)]
+    walls = [wall for wall, _ in runs]
+    cumulative = runs[-1][1]
+
+    print(f"import {args.module}: median {statistics.median(walls):.2f} s over {args.runs} runs "
+          f"(min {min(walls):.2f} s, max {max(walls):.2f} s)")
+    print(f"{'module':60} {'cumulative':>12}")
+    for name, us in sorted(cumulative.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"{name:60} {us / 1e6:10.3f} s")
+
+    heavy = [name for name in ("transformers", "torch", "pandas", "sklearn", "joblib", "googleapiclient.discovery")
+             if name in cumulative]
+    print("heavy modules imported eagerly:", ", ".join(heavy) or "none")
+
+
+if __name__ == "__main__":
+    main()
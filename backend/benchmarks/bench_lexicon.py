@@ -0,0 +1,67 @@
+# Lexicon matching cost: one substring scan per phrase (old) vs the Aho-Corasick automaton,
+# across lexicon sizes and message lengths.
+#
+#   python -m backend.benchmarks.bench_lexicon
+
+import argparse
+import random
+import time
+
+from backend.app.analyzers.lexicon_matcher import Lexicon, words
+
+SYLLABLES = ("ka", "lo", "mi", "ne", "su", "ta", "ri", "vo", "de", "an", "el", "um")
+
+
+def word(rng):
+    return "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(1, 4)))
+
+
+def synthetic_lexicon(size, rng):
+    phrases = {" ".join(word(rng) for _ in range(rng.randint(1, 4))) for _ in range(size * 2)}
+    phrases = sorted(phrases)[:size]
+    return Lexicon("bench", [(" ".join(words(p)), f"c{i % 8}", 1.0) for i, p in enumerate(phrases)])
+
+
+def synthetic_message(length, rng):
+    words = []
+    while sum(len(w) + 1 for w in words) < length:
+        words.append(word(rng))
+    return " ".join(words)[:length]
+
+
+def substring_scan(lexicon, message):
+    lowered = message.lower()
+    return [phrase for phrase, _, _ in lexicon.phrases if phrase in lowered]
+
+
+def best_of(fn, runs):
+    best = float("inf")
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--lexicon-sizes", default="5,100,1000,10000")
+    parser.add_argument("--message-lengths", default="100,1000,10000,100000")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(11)
+    print(f"{'phrases':>8} {'chars':>8} {'build ms':>9} {'substring ms':>13} {'automaton ms':>13}")
+    for size in (int(s) for s in args.lexicon_sizes.split(",")):
+        start = time.perf_counter()
+        lexicon = synthetic_lexicon(size, rng)
+        build = time.perf_counter() - start
+        for length in (int(n) for n in args.message_lengths.split(",")):
+            message = synthetic_message(length, rng)
+            old = best_of(lambda: substring_scan(lexicon, message), args.runs)
+            new = best_of(lambda: lexicon.match(message), args.runs)
+            print(f"{size:8d} {length:8d} {build * 1000:9.1f} {old * 1000:13.3f} {new * 1000:13.3f}")
+
+
+if __name__ == "__main__":
+    main()
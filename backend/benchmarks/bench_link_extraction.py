@@ -0,0 +1,106 @@
+# Old <a href> regex vs the link extractor on large marketing emails.
+# Uses the .eml/.html files in --corpus if given, otherwise generates a synthetic corpus.
+#
+# Not a like-for-like race: the extractor also reads the text body, decodes
+# entities, unwraps redirects and canonicalizes, so it costs more per body.
+# What it saves is downstream: one scan per distinct link instead of one per <a>.
+#
+#   python -m backend.benchmarks.bench_link_extraction --corpus samples/marketing/
+
+import argparse
+import os
+import random
+import re
+import time
+from email import message_from_bytes, policy
+from urllib.parse import urlparse
+
+from backend.app.analyzers.link_extractor import extract_all_links
+
+
+def old_extract_links(html_content):
+    """The previous extract_links(), kept verbatim for comparison."""
+    if not html_content:
+        return []
+    link_pattern = re.compile(r'<a\s+(?:[^>]*?\s+)?href=(["\'])(.*?)\1', re.IGNORECASE | re.MULTILINE)
+    links = []
+    for match in link_pattern.finditer(html_content):
+        url = match.group(2)
+        if url.startswith(("javascript:", "data:", "vbscript:")):
+            continue
+        try:
+            parsed = urlparse(url)
+            if parsed.scheme in ("http", "https", "mailto", "ftp"):
+                links.append({"url": url, "domain": parsed.netloc, "is_external": bool(parsed.netloc),
+                              "scheme": parsed.scheme, "path": parsed.path, "query": parsed.query,
+                              "fragment": parsed.fragment})
+        except Exception:
+            continue
+    return links
+
+
+def synthetic_email(rng, links=400, size_kb=300):
+    hosts = [f"shop{i}.example.com" for i in range(40)]
+    blocks = []
+    for i in range(links):
+        url = f"https://{rng.choice(hosts)}/p/{rng.randint(1, 60)}?utm_source=news&amp;utm_campaign=c{i % 7}"
+        if i % 10 == 0:
+            url = f"https://www.google.com/url?q=https://{rng.choice(hosts)}/deal&amp;sa=D"
+        blocks.append(f'<td style="padding:4px"><a class="btn" href="{url}"><img src="https://cdn.example.com/{i}.png"></a></td>')
+    filler = "<p>" + "Limited offer on everything you love. " * 20 + "</p>"
+    html = "<html><body><table>" + "".join(blocks) + "</table>"
+    while len(html) < size_kb * 1024:
+        html += filler
+    text = "View online: https://shop1.example.com/view\n" + "Great deals https://shop2.example.com/x\n" * 50
+    return html + "</body></html>", text
+
+
+def load_corpus(path):
+    for root, _, names in os.walk(path):
+        for name in names:
+            full = os.path.join(root, name)
+            if name.lower().endswith(".html"):
+                with open(full, encoding="utf-8", errors="ignore") as f:
+                    yield f.read(), None
+            elif name.lower().endswith(".eml"):
+                with open(full, "rb") as f:
+                    msg = message_from_bytes(f.read(), policy=policy.default)
+                html = msg.get_body(preferencelist=("html",))
+                text = msg.get_body(preferencelist=("plain",))
+                yield (html.get_content() if html else None), (text.get_content() if text else None)
+
+
+def bench(fn, corpus, runs):
+    best = float("inf")
+    for _ in range(runs):
+        start = time.perf_counter()
+        total = sum(len(fn(html, text)) for html, text in corpus)
+        best = min(best, time.perf_counter() - start)
+    return best, total
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--corpus")
+    parser.add_argument("--emails", type=int, default=50)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.corpus:
+        corpus = list(load_corpus(args.corpus))
+    else:
+        rng = random.Random(7)
+        corpus = [synthetic_email(rng) for _ in range(args.emails)]
+    megabytes = sum(len(h or "") + len(t or "") for h, t in corpus) / 1e6
+
+    old_time, old_links = bench(lambda h, t: old_extract_links(h), corpus, args.runs)
+    new_time, new_links = bench(extract_all_links, corpus, args.runs)
+
+    print(f"{len(corpus)} emails, {megabytes:.1f} MB of bodies")
+    print(f"old regex:      {old_time * 1000:8.1f} ms  {megabytes / old_time:6.1f} MB/s  {old_links} links (duplicates included)")
+    print(f"link extractor: {new_time * 1000:8.1f} ms  {megabytes / new_time:6.1f} MB/s  {new_links} distinct links (html + text)")
+    print(f"extraction cost vs old regex: {new_time / old_time:.2f}x; link scans per run: {old_links} -> {new_links}")
+
+
+if __name__ == "__main__":
+    main()
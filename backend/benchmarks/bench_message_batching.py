@@ -0,0 +1,72 @@
+# Message classifier throughput: one pipeline call per message (old) vs the batching worker
+# at several max batch sizes, with many concurrent requests. Needs transformers and torch.
+#
+#   python -m backend.benchmarks.bench_message_batching --messages 512 --concurrency 64
+
+import argparse
+import asyncio
+import random
+import time
+
+from backend.app.services.model_registry import get_model
+from backend.app.services.message_batcher import MessageBatcher
+
+WORDS = ("hey are you alone tonight i trust you keep this our secret send me a picture "
+         "meeting moved to thursday lunch invoice attached please review the report").split()
+
+
+def synthetic_messages(count, rng):
+    # Mostly short chat lines with the occasional long pasted message
+    return [" ".join(rng.choice(WORDS) for _ in range(rng.choice((4, 8, 12, 20, 60, 200))))
+            for _ in range(count)]
+
+
+def bench_unbatched(messages):
+    classifier = get_model("message_classifier")
+    start = time.perf_counter()
+    for message in messages:
+        classifier(message, truncation=True)
+    return time.perf_counter() - start
+
+
+async def bench_batched(messages, max_batch, max_wait_ms, concurrency):
+    batcher = MessageBatcher(max_batch=max_batch, max_wait_ms=max_wait_ms)
+    slots = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(message):
+        async with slots:
+            start = time.perf_counter()
+            await batcher.classify(message)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(message) for message in messages))
+    elapsed = time.perf_counter() - start
+    await batcher.stop()
+    latencies.sort()
+    return elapsed, latencies[len(latencies) // 2], latencies[int(len(latencies) * 0.95)]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=256)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--max-wait-ms", type=float, default=10)
+    parser.add_argument("--batch-sizes", default="1,2,4,8,16,32")
+    args = parser.parse_args()
+
+    messages = synthetic_messages(args.messages, random.Random(3))
+    get_model("message_classifier")   # load before timing
+    bench_unbatched(messages[:8])     # warm up
+
+    elapsed = bench_unbatched(messages)
+    print(f"{'mode':>16} {'msg/s':>8} {'p50 ms':>8} {'p95 ms':>8}")
+    print(f"{'per-message':>16} {len(messages) / elapsed:8.1f} {'-':>8} {'-':>8}")
+    for max_batch in (int(size) for size in args.batch_sizes.split(",")):
+        elapsed, p50, p95 = asyncio.run(bench_batched(messages, max_batch, args.max_wait_ms, args.concurrency))
+        print(f"{f'batch {max_batch}':>16} {len(messages) / elapsed:8.1f} {p50 * 1000:8.1f} {p95 * 1000:8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+# fp32 vs int8 message classifier: accuracy on a labeled sample set, agreement between the
+# two, latency and model size. Needs transformers and torch.
+#
+#   python -m backend.benchmarks.bench_message_quantization samples/messages.csv
+#
+# The CSV needs a "text" column; a "label" column (the model's label names) enables accuracy.
+
+import argparse
+import csv
+import io
+import statistics
+import time
+
+from backend.app.services.message_analyzer import build_message_classifier, classify_token_batch, window_size
+
+
+def load_samples(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    return [row["text"] for row in rows], [row.get("label") for row in rows]
+
+
+def model_megabytes(model):
+    import torch
+    buffer = io.BytesIO()
+    torch.save(model.state_dict(), buffer)
+    return buffer.tell() / 1e6
+
+
+def run(classifier, texts, batch_size):
+    size = window_size(classifier)
+    token_ids = [ids[:size] for ids in classifier.tokenizer(texts, add_special_tokens=False)["input_ids"]]
+
+    latencies = []
+    for ids in token_ids:
+        start = time.perf_counter()
+        classify_token_batch([ids], classifier)
+        latencies.append(time.perf_counter() - start)
+
+    results = []
+    start = time.perf_counter()
+    for i in range(0, len(token_ids), batch_size):
+        results.extend(classify_token_batch(token_ids[i:i + batch_size], classifier))
+    throughput = len(token_ids) / (time.perf_counter() - start)
+
+    latencies.sort()
+    return results, statistics.median(latencies), latencies[int(len(latencies) * 0.95)], throughput
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("samples")
+    parser.add_argument("--batch-size", type=int, default=16)
+    args = parser.parse_args()
+
+    texts, labels = load_samples(args.samples)
+    outputs = {}
+    print(f"{'mode':>5} {'load s':>7} {'MB':>7} {'p50 ms':>8} {'p95 ms':>8} {'msg/s':>8} {'accuracy':>9}")
+    for mode in ("fp32", "int8"):
+        start = time.perf_counter()
+        classifier = build_message_classifier(mode)
+        load_time = time.perf_counter() - start
+        run(classifier, texts[:4], args.batch_size)  # warm up
+
+        results, p50, p95, throughput = run(classifier, texts, args.batch_size)
+        outputs[mode] = results
+        scored = [(r["label"], label) for r, label in zip(results, labels) if label]
+        accuracy = f"{sum(p == l for p, l in scored) / len(scored):9.3f}" if scored else f"{'-':>9}"
+        print(f"{mode:>5} {load_time:7.1f} {model_megabytes(classifier.model):7.1f} "
+              f"{p50 * 1000:8.1f} {p95 * 1000:8.1f} {throughput:8.1f} {accuracy}")
+
+    pairs = list(zip(outputs["fp32"], outputs["int8"]))
+    agreement = sum(a["label"] == b["label"] for a, b in pairs) / len(pairs)
+    score_drift = statistics.mean(abs(a["score"] - b["score"]) for a, b in pairs)
+    print(f"int8 agrees with fp32 on {agreement:.1%} of {len(pairs)} messages; mean |score diff| {score_drift:.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+# Cost of the metrics layer: a timed stage call vs the bare function (sync and async),
+# from one thread and from several, plus how long rendering /metrics takes.
+#
+#   python -m backend.benchmarks.bench_metrics_overhead
+
+import argparse
+import asyncio
+import threading
+import time
+
+from backend.app.services.metrics import instrumented, stage_timer, render_metrics, STAGE_SECONDS
+
+
+def bare(x):
+    return x + 1
+
+
+timed = instrumented("bench_sync")(bare)
+
+
+async def bare_async(x):
+    return x + 1
+
+
+timed_async = instrumented("bench_async")(bare_async)
+
+
+def per_call_ns(fn, calls):
+    start = time.perf_counter()
+    for i in range(calls):
+        fn(i)
+    return (time.perf_counter() - start) / calls * 1e9
+
+
+async def per_await_ns(fn, calls):
+    start = time.perf_counter()
+    for i in range(calls):
+        await fn(i)
+    return (time.perf_counter() - start) / calls * 1e9
+
+
+def with_timer(i):
+    with stage_timer("bench_block"):
+        return i + 1
+
+
+def threaded_ns(fn, calls, threads):
+    workers = [threading.Thread(target=per_call_ns, args=(fn, calls)) for _ in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return (time.perf_counter() - start) / (calls * threads) * 1e9
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=200_000)
+    parser.add_argument("--threads", type=int, default=8)
+    args = parser.parse_args()
+
+    base = per_call_ns(bare, args.calls)
+    print(f"{'case':<28} {'ns/call':>9} {'overhead ns':>12}")
+    for name, fn in (("bare function", bare), ("instrumented", timed), ("stage_timer block", with_timer)):
+        ns = per_call_ns(fn, args.calls)
+        print(f"{name:<28} {ns:>9.0f} {ns - base:>12.0f}")
+
+    async_base = asyncio.run(per_await_ns(bare_async, args.calls))
+    async_ns = asyncio.run(per_await_ns(timed_async, args.calls))
+    print(f"{'bare coroutine':<28} {async_base:>9.0f} {0:>12.0f}")
+    print(f"{'instrumented coroutine':<28} {async_ns:>9.0f} {async_ns - async_base:>12.0f}")
+
+    thread_base = threaded_ns(bare, args.calls // args.threads, args.threads)
+    thread_ns = threaded_ns(timed, args.calls // args.threads, args.threads)
+    print(f"{f'instrumented, {args.threads} threads':<28} {thread_ns:>9.0f} {thread_ns - thread_base:>12.0f}")
+
+    # A realistic label set: 12 stages x 15 endpoints x 3 outcomes
+    for stage in range(12):
+        for endpoint in range(15):
+            for outcome in ("ok", "error", "fail"):
+                STAGE_SECONDS.observe(0.01, (f"stage{stage}", f"/endpoint/{endpoint}", outcome))
+    start = time.perf_counter()
+    text = render_metrics()
+    print(f"render /metrics: {(time.perf_counter() - start) * 1000:.1f} ms for {text.count(chr(10))} lines")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+# Latency of .msg parsing: per-upload ProcessPoolExecutor (old) vs inline vs warm shared pool.
+# Pass sample .msg files, e.g. ones with 0, 5 and 50 attachments:
+#
+#   python -m backend.benchmarks.bench_msg_parsing samples/0.msg samples/5.msg samples/50.msg
+
+import argparse
+import asyncio
+import io
+import statistics
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import extract_msg
+
+from backend.app.services.email_reader import extract_msg_content_fast
+from backend.app.services.worker_pool import run_cpu, warm_cpu_pool, shutdown_cpu_pool
+
+
+def _old_process_attachment(attachment):
+    data = attachment.data
+    return {"filename": attachment.longFilename or attachment.shortFilename, "size": len(data), "data": data}
+
+
+def old_extract(msg_bytes):
+    """The previous implementation: a fresh pool per upload, attachments pickled to children."""
+    msg = extract_msg.Message(io.BytesIO(msg_bytes))
+    attachments = msg.attachments
+    if attachments:
+        with ProcessPoolExecutor() as executor:
+            list(executor.map(_old_process_attachment, attachments))
+    return msg
+
+
+def median_ms(fn, runs):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("files", nargs="+")
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    warm_cpu_pool()
+    loop = asyncio.new_event_loop()
+
+    print(f"{'file':<30} {'attach':>6} {'old ms':>10} {'inline ms':>10} {'warm pool ms':>13}")
+    for path in args.files:
+        with open(path, "rb") as f:
+            msg_bytes = f.read()
+        attachments = len(extract_msg_content_fast(msg_bytes)["attachments"])
+
+        try:
+            old = f"{median_ms(lambda: old_extract(msg_bytes), args.runs):10.1f}"
+        except Exception as e:  # the old code pickles attachment objects, which can fail
+            old = f"{'failed':>10}"
+            print(f"  old path failed for {path}: {e}")
+        inline = median_ms(lambda: extract_msg_content_fast(msg_bytes), args.runs)
+        pooled = median_ms(lambda: loop.run_until_complete(run_cpu(extract_msg_content_fast, msg_bytes)), args.runs)
+        print(f"{path:<30} {attachments:>6} {old} {inline:10.1f} {pooled:13.1f}")
+
+    loop.close()
+    shutdown_cpu_pool()
+
+
+if __name__ == "__main__":
+    main()
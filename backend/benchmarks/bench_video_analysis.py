@@ -0,0 +1,26 @@
+# Keyframe video analysis: frames per second read, keyframes analyzed and peak RSS.
+# Peak memory should stay flat as the video gets longer.
+#
+#   python -m backend.benchmarks.bench_video_analysis recordings/call_10min.mp4 recordings/call_1h.mp4
+
+import argparse
+import resource
+
+from backend.app.services.video_analyzer import analyze_video
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("videos", nargs="+")
+    args = parser.parse_args()
+
+    print(f"{'video':40} {'frames':>8} {'keyframes':>10} {'seconds':>8} {'fps':>9} {'peak RSS MB':>12} {'early stop':>10}")
+    for path in args.videos:
+        result = analyze_video(path)
+        peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        print(f"{path[-40:]:40} {result['frames_decoded']:8d} {result['keyframes']:10d} {result['seconds']:8.2f} "
+              f"{result['fps']:9.1f} {peak_mb:12.1f} {str(result['stopped_early']):>10}")
+
+
+if __name__ == "__main__":
+    main()
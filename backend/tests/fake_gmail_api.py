@@ -0,0 +1,150 @@
+# Local stand-in for the Gmail batch endpoint, for tests and for running the
+# Gmail ingestion without a Google account:
+#
+#   python backend/tests/fake_gmail_api.py --port 8089 --messages 500
+#   GMAIL_API_ENDPOINT=http://localhost:8089/ ...
+#
+# Only what fetch_raw_messages uses is served: POST /batch/gmail/v1 with
+# GET users/me/messages/<id>?format=raw parts. Per-message and per-batch
+# failures can be scripted to exercise the retry paths.
+
+import argparse
+import base64
+import json
+import re
+import threading
+from email.parser import BytesParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+BATCH_PATH = "/batch/gmail/v1"
+MESSAGE_PATH = re.compile(r"^/gmail/v1/users/me/messages/([^/?]+)")
+BOUNDARY = "fake_gmail_batch"
+REASONS = {200: "OK", 404: "Not Found", 429: "Too Many Requests", 500: "Internal Server Error", 503: "Service Unavailable"}
+
+
+def error_body(status):
+    return {"error": {"code": status, "message": REASONS.get(status, "Error"), "status": REASONS.get(status, "Error")}}
+
+
+class FakeGmailAPI:
+    """
+    messages: {message_id: raw RFC822 bytes}; ids not in it answer 404.
+    message_script: {message_id: [status, ...]} answered (in order) before the message is served.
+    batch_script: [status, ...] answered to whole batch requests before they are served.
+    batches records the message ids of every batch that reached the parts, in arrival order.
+    """
+
+    def __init__(self, messages=None, message_script=None, batch_script=None):
+        self.messages = dict(messages or {})
+        self.message_script = {k: list(v) for k, v in (message_script or {}).items()}
+        self.batch_script = list(batch_script or [])
+        self.batches = []
+        self._lock = threading.Lock()
+        self._server = None
+
+    @property
+    def endpoint(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def start(self, port=0):
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def answer(self, message_id):
+        """(status, json body) for one get, consuming the script for that id."""
+        with self._lock:
+            script = self.message_script.get(message_id)
+            if script:
+                status = script.pop(0)
+                return status, error_body(status)
+        if message_id not in self.messages:
+            return 404, error_body(404)
+        raw = base64.urlsafe_b64encode(self.messages[message_id]).decode("ascii")
+        return 200, {"id": message_id, "threadId": message_id, "raw": raw}
+
+    def batch(self, content_type, body):
+        """Status and multipart body for one batch POST."""
+        with self._lock:
+            if self.batch_script:
+                status = self.batch_script.pop(0)
+                return status, "application/json", json.dumps(error_body(status)).encode()
+
+        request = BytesParser().parsebytes(b"Content-Type: " + content_type.encode() + b"\r\n\r\n" + body)
+        ids, parts = [], []
+        for part in request.get_payload():
+            content_id = part["Content-ID"].strip("<>")
+            request_line = part.get_payload().split("\r\n", 1)[0]
+            match = MESSAGE_PATH.match(request_line.split(" ")[1])
+            message_id = match.group(1) if match else ""
+            ids.append(message_id)
+            status, payload = self.answer(message_id) if match else (404, error_body(404))
+            parts.append(
+                f"--{BOUNDARY}\r\n"
+                f"Content-Type: application/http\r\n"
+                f"Content-ID: <response-{content_id}>\r\n\r\n"
+                f"HTTP/1.1 {status} {REASONS.get(status, 'Error')}\r\n"
+                f"Content-Type: application/json; charset=UTF-8\r\n\r\n"
+                f"{json.dumps(payload)}\r\n"
+            )
+        with self._lock:
+            self.batches.append(ids)
+        return 200, f"multipart/mixed; boundary={BOUNDARY}", ("".join(parts) + f"--{BOUNDARY}--\r\n").encode()
+
+    def _handler(self):
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                if self.path.split("?")[0] != BATCH_PATH:
+                    status, content_type, content = 404, "application/json", json.dumps(error_body(404)).encode()
+                else:
+                    status, content_type, content = api.batch(self.headers["Content-Type"], body)
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+def synthetic_message(index):
+    return (
+        f"From: sender{index}@example.com\r\nTo: me@example.com\r\nSubject: Message {index}\r\n"
+        f"Content-Type: text/plain; charset=utf-8\r\n\r\nHello {index}, see https://example.com/{index}\r\n"
+    ).encode()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a fake Gmail batch endpoint.")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--messages", type=int, default=100, help="serve ids m0 .. m<N-1>")
+    args = parser.parse_args()
+
+    api = FakeGmailAPI({f"m{i}": synthetic_message(i) for i in range(args.messages)}).start(args.port)
+    print(f"Fake Gmail API on {api.endpoint} ({args.messages} messages); Ctrl+C to stop")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        api.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+import wave
+
+import numpy as np
+import pytest
+
+from backend.app.services import audio_analyzer
+from backend.app.services.audio_analyzer import StreamingAudioFeatures, SAMPLE_RATE, AUDIO_DEFAULT_RISK, DecoderUnavailable
+
+
+def synthetic_clip(seconds=18, seed=3):
+    """Quiet room noise, then tone bursts at varying loudness with the loudest one late."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    clip = rng.normal(0, 10 ** (-70 / 20), len(t))
+    for start, level_db in ((2.0, -30), (4.5, -12), (7.0, -40), (9.5, -25), (12.0, -3), (15.0, -35)):
+        burst = (t >= start) & (t < start + 1.5)
+        clip[burst] += 10 ** (level_db / 20) * np.sin(2 * np.pi * 220 * t[burst]) * np.hanning(burst.sum())
+    return clip.astype(np.float32)
+
+
+def run(clip, block_samples):
+    features = StreamingAudioFeatures(lambda summary: summary["voiced_ratio"])
+    for start in range(0, len(clip), block_samples):
+        features.feed(clip[start:start + block_samples])
+    return features.finish()
+
+
+def test_features_do_not_depend_on_block_size():
+    clip = synthetic_clip()
+    reference = run(clip, 64000)
+    for block_samples in (1234, 399, 160, 17):
+        result = run(clip, block_samples)
+        assert result["voiced_ratio"] == reference["voiced_ratio"]
+        assert result["segments"] == reference["segments"]
+        assert result["risk_score"] == pytest.approx(reference["risk_score"])
+        assert result["max_segment_score"] == pytest.approx(reference["max_segment_score"])
+
+
+def test_quiet_opening_is_not_voiced():
+    clip = synthetic_clip()[: 2 * SAMPLE_RATE]  # room noise only
+    result = run(clip, 64000)
+    assert result["voiced_ratio"] == 0.0
+
+
+def test_empty_audio_gets_default_risk():
+    assert run(np.zeros(0, dtype=np.float32), 1000)["risk_score"] == AUDIO_DEFAULT_RISK
+
+
+def test_missing_ffmpeg_is_not_blamed_on_the_file(tmp_path, monkeypatch):
+    path = tmp_path / "call.wav"
+    with wave.open(str(path), "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(8000)   # not 16 kHz, so it needs ffmpeg to resample
+        wav.writeframes(np.zeros(8000, dtype="<i2").tobytes())
+    monkeypatch.setattr(audio_analyzer.shutil, "which", lambda name: None)
+    with pytest.raises(DecoderUnavailable):
+        audio_analyzer.analyze_audio(str(path))
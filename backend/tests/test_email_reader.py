@@ -0,0 +1,28 @@
+import pytest
+
+from backend.app.services.email_reader import StreamingEmailParser, EmailTooLarge, extract_email_content
+
+
+def multipart_email(parts):
+    body = "".join(f"--b\r\nContent-Type: text/plain\r\n\r\npart {i}\r\n" for i in range(parts))
+    return (
+        "From: a@example.com\r\nTo: b@example.com\r\nSubject: parts\r\n"
+        'Content-Type: multipart/mixed; boundary="b"\r\n\r\n' + body + "--b--\r\n"
+    ).encode()
+
+
+def test_part_limit_stops_the_parse_before_close():
+    content = multipart_email(1000)
+    fed = 0
+    with pytest.raises(EmailTooLarge):
+        with StreamingEmailParser(max_parts=50) as parser:
+            for start in range(0, len(content), 512):
+                parser.feed(content[start:start + 512])
+                fed = start + 512
+    assert fed < len(content) // 2
+
+
+def test_email_within_part_limit_parses():
+    parsed = extract_email_content(multipart_email(3))
+    assert parsed["subject"] == "parts"
+    assert parsed["text"].startswith("part ")
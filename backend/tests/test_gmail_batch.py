@@ -0,0 +1,65 @@
+import pytest
+
+pytest.importorskip("googleapiclient.discovery")
+
+import httplib2
+from googleapiclient.discovery import build
+
+from backend.app.services import gmail_reader
+from fake_gmail_api import FakeGmailAPI, synthetic_message
+
+
+def messages(count):
+    return {f"m{i}": synthetic_message(i) for i in range(count)}
+
+
+@pytest.fixture
+def fetch(monkeypatch):
+    """fetch(api, ids) runs fetch_raw_messages against a started FakeGmailAPI."""
+    monkeypatch.setattr(gmail_reader, "GMAIL_RETRY_BACKOFF", 0.0)
+    monkeypatch.setattr(gmail_reader, "GMAIL_BATCH_SIZE", 10)
+
+    def run(api, ids):
+        monkeypatch.setattr(gmail_reader, "GMAIL_API_ENDPOINT", api.endpoint)
+        service = build("gmail", "v1", http=httplib2.Http(), static_discovery=True,
+                        client_options={"api_endpoint": api.endpoint})
+        return gmail_reader.fetch_raw_messages(service, None, ids)
+
+    return run
+
+
+def test_messages_are_fetched_in_batches(fetch):
+    with FakeGmailAPI(messages(25)) as api:
+        raw = fetch(api, list(messages(25)))
+    assert raw == messages(25)
+    assert sorted(len(batch) for batch in api.batches) == [5, 10, 10]
+
+
+def test_missing_message_does_not_fail_the_batch(fetch, capsys):
+    with FakeGmailAPI(messages(3)) as api:
+        raw = fetch(api, ["m0", "gone", "m2"])
+    assert sorted(raw) == ["m0", "m2"]
+    assert len(api.batches) == 1
+    assert "Failed to fetch Gmail message gone" in capsys.readouterr().out
+
+
+def test_rate_limited_messages_are_rebatched(fetch):
+    with FakeGmailAPI(messages(12), message_script={"m3": [429, 503], "m11": [429]}) as api:
+        raw = fetch(api, list(messages(12)))
+    assert raw == messages(12)
+    # Only the throttled messages go out again
+    assert [sorted(batch) for batch in api.batches[2:]] == [["m11", "m3"], ["m3"]]
+
+
+def test_throttled_batch_is_retried_whole(fetch):
+    with FakeGmailAPI(messages(4), batch_script=[429]) as api:
+        raw = fetch(api, list(messages(4)))
+    assert raw == messages(4)
+
+
+def test_messages_given_up_on_are_logged(fetch, capsys):
+    attempts = gmail_reader.GMAIL_BATCH_ATTEMPTS
+    with FakeGmailAPI(messages(3), message_script={"m1": [429] * attempts}) as api:
+        raw = fetch(api, list(messages(3)))
+    assert sorted(raw) == ["m0", "m2"]
+    assert f"Gave up on 1 Gmail messages after {attempts} attempts: m1" in capsys.readouterr().out
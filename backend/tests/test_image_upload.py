@@ -0,0 +1,37 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+from backend.app.analyzers.perceptual_hash import load_pixels, PHASH_SIZE
+
+GARBAGE = b"this is not an image\x00\xff" * 64
+
+
+def test_garbage_bytes_raise_value_error(tmp_path):
+    path = tmp_path / "upload.png"
+    path.write_bytes(GARBAGE)
+    with pytest.raises(ValueError):
+        load_pixels(str(path))
+
+
+def test_large_jpeg_is_drafted_then_rotated(tmp_path):
+    path = tmp_path / "photo.jpg"
+    image = Image.fromarray(np.zeros((1200, 1600), dtype=np.uint8))
+    exif = image.getexif()
+    exif[0x0112] = 6   # Orientation: rotate 90 degrees clockwise
+    image.save(path, exif=exif)
+    rows, cols = load_pixels(str(path)).shape
+    assert rows > cols   # EXIF rotation applied
+    assert PHASH_SIZE * 4 <= cols < 1200   # decoded at reduced size
+
+
+def test_garbage_upload_is_rejected_with_400():
+    pytest.importorskip("fastapi.testclient")
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    analyze = pytest.importorskip("backend.app.routes.analyze")
+    app = FastAPI()
+    app.include_router(analyze.router)
+    response = TestClient(app).post("/analyze/image", files={"file": ("photo.jpg", GARBAGE, "image/jpeg")})
+    assert response.status_code == 400
@@ -0,0 +1,54 @@
+import threading
+
+import pytest
+
+from backend.app.services import job_queue
+
+
+@pytest.fixture
+def queue(tmp_path, monkeypatch):
+    monkeypatch.setattr(job_queue, "JOBS_DB_PATH", str(tmp_path / "jobs.db"))
+    monkeypatch.setattr(job_queue, "JOB_RETRY_BACKOFF", 0)
+    monkeypatch.setattr(job_queue, "_local", threading.local())
+    job_queue.init_jobs_db()
+    return job_queue
+
+
+def fail_until_final(queue, job_type):
+    while (job := queue.claim_job([job_type], "worker")) is not None:
+        queue.fail_job(job["id"], "worker", "message not found")
+
+
+def test_failed_job_is_returned_to_pollers(queue):
+    job, created = queue.submit_job("authenticity", {"message_id": "bad"}, max_attempts=3)
+    assert created
+    fail_until_final(queue, "authenticity")
+
+    polled, created = queue.submit_job("authenticity", {"message_id": "bad"})
+    assert not created
+    assert polled["id"] == job["id"]
+    assert polled["status"] == "failed"
+    assert polled["attempts"] == 3
+    assert polled["error"] == "message not found"
+    # Polling again does not queue more work
+    assert queue.claim_job(["authenticity"], "worker") is None
+
+
+def test_retry_queues_a_new_job_after_failure(queue):
+    job, _ = queue.submit_job("authenticity", {"message_id": "bad"}, max_attempts=1)
+    fail_until_final(queue, "authenticity")
+
+    retried, created = queue.submit_job("authenticity", {"message_id": "bad"}, retry=True)
+    assert created
+    assert retried["id"] != job["id"]
+    assert retried["status"] == "queued"
+    # Later polls see the new job, not the old failure
+    assert queue.submit_job("authenticity", {"message_id": "bad"})[0]["id"] == retried["id"]
+
+
+def test_duplicate_submission_returns_live_job(queue):
+    job, _ = queue.submit_job("authenticity", {"message_id": "m1"})
+    duplicate, created = queue.submit_job("authenticity", {"message_id": "m1"}, priority=5)
+    assert not created
+    assert duplicate["id"] == job["id"]
+    assert duplicate["priority"] == 5
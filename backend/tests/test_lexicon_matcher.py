@@ -0,0 +1,30 @@
+import pytest
+
+from backend.app.analyzers.lexicon_matcher import load_lexicon
+
+
+@pytest.fixture(scope="module")
+def lexicon():
+    return load_lexicon()
+
+
+@pytest.mark.parametrize("message, phrase", [
+    ("let's meet", "let's meet"),
+    ("Are you alone?", "are you alone"),
+    ("This is our little secret", "our little secret"),
+])
+def test_nested_phrase_scores_once(lexicon, message, phrase):
+    result = lexicon.match(message)
+    assert [hit["phrase"] for hit in result["hits"]] == [phrase]
+    assert result["score"] == 1.0
+
+
+def test_separate_phrases_all_count(lexicon):
+    result = lexicon.match("meet me tonight, it's our secret")
+    assert sorted(hit["phrase"] for hit in result["hits"]) == ["meet me", "secret"]
+    assert result["score"] == 2.0
+
+
+def test_repeated_phrase_counts_each_time(lexicon):
+    result = lexicon.match("meet. meet. meeting")
+    assert result["hits"] == [{"phrase": "meet", "category": "meeting_request", "count": 2, "weight": 1.0}]
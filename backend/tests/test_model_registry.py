@@ -0,0 +1,20 @@
+import pytest
+
+from backend.app.services.model_registry import register_model, get_model, warm_models, models_ready, model_status, ModelUnavailable
+
+
+def broken_loader():
+    raise FileNotFoundError("model file missing")
+
+
+def test_failed_model_does_not_block_readiness():
+    register_model("test_ok_model", lambda: "model")
+    register_model("test_broken_model", broken_loader)
+    names = ["test_ok_model", "test_broken_model"]
+    assert not models_ready(names)
+
+    warm_models(names)
+    assert models_ready(names)
+    assert model_status()["test_broken_model"]["status"] == "error"
+    with pytest.raises(ModelUnavailable):
+        get_model("test_broken_model")
@@ -24,20 +24,48 @@ function GmailAnalyzer() {
   const loadEmails = async () => {
     setLoading(true);
     setError(null);
-    
+    setEmails([]);
+    setCurrentIndex(0);
+    setProcessingStatus({});
+
+    // Emails are streamed as NDJSON, one line per analyzed email, so the first
+    // one can be shown while the rest of the inbox is still being scanned.
+    let received = 0;
+    const handleLine = (line) => {
+      if (!line.trim()) return;
+      const event = JSON.parse(line);
+      if (event.type === "email") {
+        const email = event.email;
+        setEmails(prev => [...prev, email]);
+        setProcessingStatus(prev => ({ ...prev, [email.id]: "pending" }));
+        if (received === 0) {
+          fetchAuthenticityData(email.id);
+          setLoading(false);
+        }
+        received += 1;
+      } else if (event.type === "error") {
+        throw new Error(event.error.detail);
+      }
+    };
+
     try {
-      const response = await axios.get(`http://localhost:8000/analyze/gmail?max_results=10`);
-      setEmails(response.data.gmail_messages || []);
-      
-      const initialStatus = {};
-      response.data.gmail_messages.forEach(email => {
-        initialStatus[email.id] = "pending";
-      });
-      setProcessingStatus(initialStatus);
-      
-      if (response.data.gmail_messages && response.data.gmail_messages.length > 0) {
-        fetchAuthenticityData(response.data.gmail_messages[0].id);
+      const response = await fetch(`http://localhost:8000/analyze/gmail/stream?max_results=10`);
+      if (!response.ok || !response.body) {
+        throw new Error(`HTTP ${response.status}`);
+      }
+
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = "";
+      while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        const lines = buffer.split("\n");
+        buffer = lines.pop();
+        lines.forEach(handleLine);
       }
+      handleLine(buffer);
     } catch (err) {
       console.error(err);
       setError("Failed to load emails.");